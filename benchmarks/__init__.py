@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+'''
+    benchmarks
+    ~~~~~~~~~~
+
+    Micro-benchmarks of minimongo's hot paths, run them with::
+
+        python benchmarks/run.py -o results.json
+
+    See :mod:`benchmarks.run` for details.
+'''
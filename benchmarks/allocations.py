@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+    benchmarks.allocations
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Allocations and garbage collections of cursor iteration, creating a
+    model per document vs. reusing instances (``Cursor.reuse()``)::
+
+        python benchmarks/allocations.py -n 50000 -o allocations.json
+
+    Every mode iterates over an in-memory cursor, keeping a reference to
+    the current document only, as a read-only scan would. The report
+    lists wall time along with garbage collections (and time spent in
+    them) during that run, and peak memory as traced by
+    :mod:`tracemalloc` in a separate, shorter run.
+'''
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from benchmarks.common import SHAPES, Context, memory_cursor  # noqa: E402
+
+#: (name, function) pairs; the function turns a preloaded cursor into
+#: the one to iterate over.
+MODES = (
+    ('model', lambda cursor: cursor),
+    ('reuse', lambda cursor: cursor.reuse()),
+    ('reuse.ring4', lambda cursor: cursor.reuse(ring=4)),
+)
+
+
+class GCMonitor(object):
+    """Counts garbage collections and the time spent in them."""
+
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.seconds = 0.0
+        self._start = None
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self._start = time.time()
+        else:
+            self.collections[info['generation']] += 1
+            self.seconds += time.time() - self._start
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        gc.callbacks.remove(self)
+
+
+def prepare(model, document, mode, count):
+    documents = [dict(document) for _ in range(count)]
+    cursor = mode(memory_cursor(model, documents))
+    gc.collect()
+    return cursor
+
+
+def iterate(cursor):
+    start = time.time()
+    for _ in cursor:
+        pass
+    return time.time() - start
+
+
+def measure(model, document, mode, count):
+    cursor = prepare(model, document, mode, count)
+    with GCMonitor() as monitor:
+        seconds = iterate(cursor)
+
+    cursor = prepare(model, document, mode, max(1, count // 10))
+    tracemalloc.start()
+    iterate(cursor)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'seconds': seconds,
+        'gc_collections': monitor.collections,
+        'gc_seconds': monitor.seconds,
+        'peak_bytes': peak,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('-n', '--count', type=int, default=20000,
+                        help='number of documents iterated over')
+    parser.add_argument('-o', '--output', help='write JSON results here')
+    args = parser.parse_args(argv)
+
+    model = Context().model('AllocationsModel')
+    results = {}
+    print('%-12s %-6s %10s %14s %10s %12s' % ('mode', 'shape', 'seconds',
+                                              'collections', 'gc seconds',
+                                              'peak bytes'))
+    for name, mode in MODES:
+        for shape, document in sorted(SHAPES.items()):
+            result = measure(model, document, mode, args.count)
+            results.setdefault(name, {})[shape] = result
+            print('%-12s %-6s %10.3f %14s %10.4f %12d' % (
+                name, shape, result['seconds'],
+                '/'.join(str(count) for count in result['gc_collections']),
+                result['gc_seconds'], result['peak_bytes']))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'count': args.count, 'results': results}, output,
+                      indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+'''
+    benchmarks.bench_attrdict
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    :class:`~minimongo.AttrDict` construction for flat, wide and deep
+    documents, against plain :class:`dict` as a baseline.
+'''
+from __future__ import absolute_import
+
+from minimongo import AttrDict
+
+from .common import SHAPES, benchmark
+
+
+def _register(shape, document):
+    @benchmark('dict.%s' % shape)
+    def bench_dict(context):
+        return lambda: dict(document)
+
+    @benchmark('attrdict.%s' % shape)
+    def bench_attrdict(context):
+        return lambda: AttrDict(document)
+
+
+for shape, document in sorted(SHAPES.items()):
+    _register(shape, document)
+
+
+@benchmark('attrdict.getattr')
+def bench_getattr(context):
+    document = AttrDict(SHAPES['flat'])
+    return lambda: document.field_10
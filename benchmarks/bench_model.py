@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+'''
+    benchmarks.bench_model
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    :class:`~minimongo.Model` hot paths: ``__setitem__`` with and without
+    ``field_map``, cursor iteration and wrapping throughput (with and
+    without reusing instances, and of ``Meta.fields`` models), and -- with
+    a server -- ``save``, ``mongo_update``, ``get`` and ``from_dbref``
+    latency.
+'''
+from __future__ import absolute_import
+
+from .common import SHAPES, benchmark, memory_cursor
+
+CURSOR_SIZE = 1000
+
+FIELD_MAP = (
+    (lambda key, value: key == 'field_0' and isinstance(value, int), str),
+    (lambda key, value: key == 'missing', str),
+)
+
+
+@benchmark('model.setitem')
+def bench_setitem(context):
+    document = context.model('BenchSetItem')()
+    return lambda: document.__setitem__('x', 1)
+
+
+@benchmark('model.setitem.field_map')
+def bench_setitem_field_map(context):
+    document = context.model('BenchFieldMap', field_map=FIELD_MAP)()
+    return lambda: document.__setitem__('x', 1)
+
+
+def _register_cursor(shape, document):
+    @benchmark('cursor.iterate.%s' % shape, units=CURSOR_SIZE)
+    def bench_cursor(context):
+        model = context.model('BenchCursor')
+        documents = [dict(document) for _ in range(CURSOR_SIZE)]
+
+        def iterate():
+            for _ in memory_cursor(model, documents):
+                pass
+        return iterate
+
+    @benchmark('cursor.iterate.%s.reuse' % shape, units=CURSOR_SIZE)
+    def bench_cursor_reuse(context):
+        model = context.model('BenchCursor')
+        documents = [dict(document) for _ in range(CURSOR_SIZE)]
+
+        def iterate():
+            for _ in memory_cursor(model, documents).reuse():
+                pass
+        return iterate
+
+    @benchmark('cursor.iterate.%s.compiled' % shape, units=CURSOR_SIZE)
+    def bench_cursor_compiled(context):
+        model = context.model('BenchCursorCompiled', fields=sorted(document))
+        documents = [dict(document) for _ in range(CURSOR_SIZE)]
+
+        def iterate():
+            for _ in memory_cursor(model, documents):
+                pass
+        return iterate
+
+
+for shape, document in sorted(SHAPES.items()):
+    _register_cursor(shape, document)
+
+
+@benchmark('model.save', server=True)
+def bench_save(context):
+    model = context.model('BenchSave')
+    return lambda: model(SHAPES['flat']).save()
+
+
+@benchmark('model.mongo_update', server=True)
+def bench_mongo_update(context):
+    document = context.model('BenchUpdate')(SHAPES['flat']).save()
+    return document.mongo_update
+
+
+@benchmark('model.get', server=True)
+def bench_get(context):
+    model = context.model('BenchGet')
+    document = model(SHAPES['flat']).save()
+    return lambda: model.get(_id=document._id)
+
+
+@benchmark('collection.find.flat', server=True, units=CURSOR_SIZE)
+def bench_find(context):
+    model = context.model('BenchFind')
+    model.collection.drop()
+    model.collection.insert([dict(SHAPES['flat']) for _ in range(CURSOR_SIZE)])
+
+    def iterate():
+        for _ in model.collection.find():
+            pass
+    return iterate
+
+
+@benchmark('collection.from_dbref', server=True)
+def bench_from_dbref(context):
+    model = context.model('BenchDBRef')
+    dbref = model(SHAPES['flat']).save().dbref()
+    return lambda: model.collection.from_dbref(dbref)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+'''
+    benchmarks.common
+    ~~~~~~~~~~~~~~~~~
+
+    Benchmark registry, timing and document / model factories shared by
+    all the ``bench_*`` modules.
+'''
+from __future__ import absolute_import
+
+import gc
+import time
+
+from minimongo import Model
+from minimongo.collection import Cursor
+
+clock = getattr(time, 'perf_counter', time.time)
+
+DATABASE = 'minimongo_bench'
+
+#: All registered :class:`Benchmark` instances, in definition order.
+registry = []
+
+
+class Benchmark(object):
+    """A single benchmark: `setup` is called with a :class:`Context` and
+    returns a callable to be timed, which processes `units` items (for
+    example, documents) per call."""
+
+    def __init__(self, name, setup, server=False, units=1):
+        self.name = name
+        self.setup = setup
+        self.server = server
+        self.units = units
+
+    def run(self, context, min_time=0.2, repeat=5):
+        """Returns timings of the benchmark in seconds per unit."""
+        func = self.setup(context)
+
+        # Calibrate the number of calls per repeat, so a single repeat
+        # takes at least `min_time`.
+        number = 1
+        while True:
+            elapsed = _time(func, number)
+            if elapsed >= min_time / 10 or number >= 10 ** 7:
+                break
+            number *= 10
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+        timings = sorted(_time(func, number) / (number * self.units)
+                         for _ in range(repeat))
+        return {
+            'best': timings[0],
+            'median': timings[len(timings) // 2],
+            'worst': timings[-1],
+            'units_per_second': 1.0 / timings[len(timings) // 2],
+            'calls': number * repeat,
+            'units': self.units,
+        }
+
+
+def _time(func, number):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = clock()
+        for _ in range(number):
+            func()
+        return clock() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def benchmark(name, server=False, units=1):
+    """Registers the decorated setup function as a :class:`Benchmark`."""
+    def decorator(setup):
+        registry.append(Benchmark(name, setup, server=server, units=units))
+        return setup
+    return decorator
+
+
+class Context(object):
+    """What benchmarks get to set themselves up: server address (`None`
+    if there's no server to run against) and a model factory."""
+
+    def __init__(self, host='localhost', port=27017, server=False):
+        self.host = host
+        self.port = port
+        self.server = server
+
+    def model(self, name, **meta):
+        """Creates a new :class:`~minimongo.Model` subclass; indices are
+        never created at class creation time."""
+        attrs = dict(database=DATABASE, collection=name.lower(),
+                     host=self.host, port=self.port, auto_index=False)
+        attrs.update(meta)
+        return type(name, (Model, ), {'Meta': type('Meta', (), attrs)})
+
+
+def flat_document(fields=20):
+    """A document with `fields` scalar fields of mixed types."""
+    document = {}
+    for index in range(fields):
+        key = 'field_%d' % index
+        if index % 3 == 0:
+            document[key] = index
+        elif index % 3 == 1:
+            document[key] = 'value %d' % index
+        else:
+            document[key] = index * 1.5
+    return document
+
+
+def deep_document(depth=10, fields=3):
+    """A document nested `depth` levels deep, with `fields` scalars and
+    a single subdocument on every level."""
+    document = flat_document(fields)
+    current = document
+    for _ in range(depth):
+        current['child'] = flat_document(fields)
+        current = current['child']
+    return document
+
+
+SHAPES = {
+    'flat': flat_document(20),
+    'wide': flat_document(500),
+    'deep': deep_document(10),
+}
+
+
+def memory_cursor(model, documents):
+    """Returns a minimongo :class:`~minimongo.collection.Cursor` over
+    `model`'s collection, preloaded with already decoded `documents`, so
+    that iterating over it exercises the whole wrapping path without
+    talking to a server."""
+    cursor = Cursor(model.collection, wrap=model)
+    cursor._Cursor__data.extend(documents)
+    # A killed cursor never goes back to the server for more data.
+    cursor._Cursor__killed = True
+    return cursor
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+    benchmarks.compare
+    ~~~~~~~~~~~~~~~~~~
+
+    Compares two JSON files written by ``benchmarks/run.py``::
+
+        python benchmarks/compare.py before.json after.json
+
+    Exits with a non-zero status if any benchmark got slower than
+    ``--threshold`` (a ratio, 1.1 by default).
+'''
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=1.1,
+                        help='slowdown ratio to fail on (default: 1.1)')
+    args = parser.parse_args(argv)
+
+    with open(args.before) as before, open(args.after) as after:
+        before, after = json.load(before), json.load(after)
+
+    print('%-32s %12s %12s %8s' % ('benchmark', 'before (us)', 'after (us)',
+                                   'ratio'))
+    regressions = 0
+    for name in sorted(set(before['results']) & set(after['results'])):
+        old = before['results'][name]['median']
+        new = after['results'][name]['median']
+        ratio = new / old
+        marker = ''
+        if ratio > args.threshold:
+            regressions += 1
+            marker = '  SLOWER'
+        elif ratio < 1 / args.threshold:
+            marker = '  faster'
+        print('%-32s %12.3f %12.3f %8.2f%s' % (name, old * 1e6, new * 1e6,
+                                               ratio, marker))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
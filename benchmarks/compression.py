@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+    benchmarks.compression
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    CPU cost of ``Meta.compressed_fields`` against the bytes it saves,
+    per codec and kind of value::
+
+        python benchmarks/compression.py -o compression.json
+
+    For every payload, the report lists its size before and after
+    compression, and microseconds spent compressing (as on save) and
+    decompressing (on first access) it.
+'''
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bson import BSON  # noqa: E402
+
+from minimongo.compression import (_CODECS, Compression,  # noqa: E402
+                                   decompress)
+
+from benchmarks.common import _time, flat_document  # noqa: E402
+
+
+def text_payload(size):
+    """Log-like text, about `size` characters long."""
+    lines = []
+    length = 0
+    while length < size:
+        line = u'2024-01-%02d 12:%02d:%02d INFO request /api/items/%d ' \
+            u'served in %d ms\n' % (len(lines) % 28 + 1, len(lines) % 60,
+                                    len(lines) * 7 % 60, len(lines),
+                                    len(lines) * 13 % 500)
+        lines.append(line)
+        length += len(line)
+    return u''.join(lines)
+
+
+def json_payload(size):
+    """A list of small documents, as a JSON blob field would hold."""
+    documents = []
+    while len(json.dumps(documents)) < size:
+        documents.append(flat_document(10))
+    return documents
+
+
+PAYLOADS = {
+    'text.1k': text_payload(1024),
+    'text.64k': text_payload(64 * 1024),
+    'json.1k': json_payload(1024),
+    'json.64k': json_payload(64 * 1024),
+}
+
+
+def raw_size(payload):
+    """Bytes `payload` takes stored uncompressed."""
+    if isinstance(payload, list):
+        return len(BSON.encode({'v': payload}))
+    return len(payload.encode('utf-8'))
+
+
+def per_call(func, min_time=0.1):
+    number = 1
+    while _time(func, number) < min_time:
+        number *= 4
+    return min(_time(func, number) for _ in range(3)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('-o', '--output', help='write JSON results here')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print('%-6s %-10s %10s %10s %7s %14s %14s' % (
+        'codec', 'payload', 'raw', 'stored', 'ratio', 'compress us',
+        'decompress us'))
+    for codec in sorted(_CODECS):
+        compression = Compression(['payload'], codec, threshold=0)
+        for name, payload in sorted(PAYLOADS.items()):
+            raw = raw_size(payload)
+            stored = compression.compress(payload)
+            result = {
+                'raw': raw,
+                'stored': len(stored),
+                'ratio': raw / len(stored),
+                'compress': per_call(lambda: compression.compress(payload)),
+                'decompress': per_call(lambda: decompress(stored)),
+            }
+            results.setdefault(codec, {})[name] = result
+            print('%-6s %-10s %10d %10d %7.1f %14.1f %14.1f' % (
+                codec, name, raw, result['stored'], result['ratio'],
+                result['compress'] * 1e6, result['decompress'] * 1e6))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'results': results}, output, indent=2,
+                      sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
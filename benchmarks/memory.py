@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+    benchmarks.memory
+    ~~~~~~~~~~~~~~~~~
+
+    Memory footprint of resident documents, per representation and
+    document shape::
+
+        python benchmarks/memory.py -n 20000 -o memory.json
+
+    Every document is decoded from BSON (as it would be coming from the
+    server) and converted into each representation; the report lists
+    bytes per document as seen by :mod:`tracemalloc` and by RSS sampling,
+    along with :func:`minimongo.deep_sizeof` of a single document.
+'''
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bson import BSON  # noqa: E402
+
+from minimongo import AttrDict, deep_sizeof  # noqa: E402
+from minimongo.rows import row_class  # noqa: E402
+
+from benchmarks.common import SHAPES, Context  # noqa: E402
+
+#: (name, setup) pairs; `setup` is called with a :class:`Context` and
+#: returns a function converting a decoded document into the
+#: representation being measured.
+representations = []
+
+
+def representation(name):
+    def decorator(setup):
+        representations.append((name, setup))
+        return setup
+    return decorator
+
+
+@representation('dict')
+def dict_representation(context):
+    return lambda document: document
+
+
+@representation('attrdict')
+def attrdict_representation(context):
+    return AttrDict
+
+
+@representation('model')
+def model_representation(context):
+    return context.model('MemoryModel')
+
+
+@representation('model.interned')
+def interned_model_representation(context):
+    # Keys shared out of the model's key table, see minimongo.interning.
+    return context.model('MemoryInternedModel', intern_keys=True)
+
+
+@representation('rows')
+def rows_representation(context):
+    # A row class covering all the fields of the document, as with
+    # ``find().rows(fields)``.
+    model = context.model('MemoryRowModel')
+    return lambda document: row_class(model, sorted(document)) \
+        .from_document(document)
+
+
+@representation('compiled')
+def compiled_representation(context):
+    # A Meta.fields model declaring all the fields of the document.
+    models = {}
+
+    def convert(document):
+        fields = tuple(sorted(document))
+        model = models.get(fields)
+        if model is None:
+            model = models[fields] = context.model('MemoryCompiledModel',
+                                                   fields=fields)
+        return model(document)
+    return convert
+
+
+def rss():
+    """Returns resident set size of this process in bytes, or ``None``
+    if it can't be sampled on this platform."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def measure(convert, raw, count):
+    gc.collect()
+    rss_before = rss()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    documents = [convert(BSON(raw).decode()) for _ in range(count)]
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    rss_after = rss()
+    result = {
+        'tracemalloc': traced / count,
+        'rss': None if rss_before is None else
+        (rss_after - rss_before) / count,
+        'deep_sizeof': deep_sizeof(documents[0]),
+    }
+    del documents
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('-n', '--count', type=int, default=10000,
+                        help='number of documents kept resident')
+    parser.add_argument('-o', '--output', help='write JSON results here')
+    args = parser.parse_args(argv)
+
+    context = Context()
+    results = {}
+    print('%-24s %-6s %14s %14s %14s' % ('representation', 'shape',
+                                         'tracemalloc', 'rss',
+                                         'deep_sizeof'))
+    for name, setup in representations:
+        convert = setup(context)
+        for shape, document in sorted(SHAPES.items()):
+            result = measure(convert, BSON.encode(document), args.count)
+            results.setdefault(name, {})[shape] = result
+            print('%-24s %-6s %14.0f %14s %14d' % (
+                name, shape, result['tracemalloc'],
+                '-' if result['rss'] is None else '%.0f' % result['rss'],
+                result['deep_sizeof']))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'count': args.count, 'results': results}, output,
+                      indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+    benchmarks.run
+    ~~~~~~~~~~~~~~
+
+    Runs all the ``bench_*`` modules and writes results as JSON, so runs
+    on different commits can be compared with ``benchmarks/compare.py``::
+
+        python benchmarks/run.py -o before.json
+        git checkout feature
+        python benchmarks/run.py -o after.json
+        python benchmarks/compare.py before.json after.json
+
+    Benchmarks needing a MongoDB server (``save``, ``get``, ...) only run
+    if one is reachable at ``--host``/``--port``; everything else runs
+    in-process, with cursors preloaded with decoded documents.
+'''
+from __future__ import absolute_import, print_function
+
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pymongo  # noqa: E402
+
+from benchmarks import common  # noqa: E402
+
+MODULES = sorted(name[:-3] for name in os.listdir(HERE)
+                 if name.startswith('bench_') and name.endswith('.py'))
+
+
+def server_available(host, port):
+    try:
+        client = pymongo.MongoClient(host, port,
+                                     serverSelectionTimeoutMS=500,
+                                     connectTimeoutMS=500)
+        client.server_info()
+        return True
+    except Exception:
+        return False
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=HERE,
+            stderr=subprocess.STDOUT).decode('ascii').strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('-o', '--output', help='write JSON results here')
+    parser.add_argument('-k', '--filter', default='',
+                        help='only run benchmarks whose name contains this')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    parser.add_argument('--no-server', action='store_true',
+                        help="don't run benchmarks that need a server")
+    parser.add_argument('--quick', action='store_true',
+                        help='fewer, shorter repeats -- for smoke testing')
+    args = parser.parse_args(argv)
+
+    server = not args.no_server and server_available(args.host, args.port)
+    context = common.Context(args.host, args.port, server=server)
+    for name in MODULES:
+        importlib.import_module('benchmarks.' + name)
+
+    results = {}
+    for bench in common.registry:
+        if args.filter not in bench.name:
+            continue
+        if bench.server and not server:
+            print('%-32s skipped (no server)' % bench.name)
+            continue
+        if args.quick:
+            result = bench.run(context, min_time=0.02, repeat=3)
+        else:
+            result = bench.run(context)
+        results[bench.name] = result
+        print('%-32s %12.3f us %14.0f /s' % (
+            bench.name, result['median'] * 1e6, result['units_per_second']))
+
+    if server:
+        pymongo.MongoClient(args.host, args.port).drop_database(
+            common.DATABASE)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'revision': git_revision(),
+                'date': datetime.datetime.utcnow().isoformat(),
+                'python': platform.python_version(),
+                'pymongo': pymongo.version,
+                'server': server,
+                'results': results,
+            }, output, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+    benchmarks.startup
+    ~~~~~~~~~~~~~~~~~~
+
+    Import time and model class creation overhead for large model
+    registries::
+
+        python benchmarks/startup.py -n 400 -o startup.json
+
+    Reports:
+
+    * ``-X importtime`` breakdown of ``minimongo``, ``pymongo``, ``bson``,
+      ``six``, ``numpy`` and any other third-party package, and of a
+      generated module defining N models;
+    * total import time of light (``AttrDict``, ``configure``) and heavy
+      (``Model``) public names, which are loaded lazily;
+    * time to create N models in-process, with and (if a server is
+      reachable) without ``auto_index = False``, and a profile of where
+      :class:`~minimongo.model.ModelBase` spends it: ``_Options``
+      construction, ``to_underscore``, client creation / lookup,
+      collection creation and ``auto_index``.
+'''
+from __future__ import absolute_import, print_function
+
+import argparse
+import cProfile
+import importlib.util
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+from benchmarks.common import DATABASE, Context, clock  # noqa: E402
+from benchmarks.run import server_available  # noqa: E402
+
+# Always reported; other third-party packages are if they get imported.
+PACKAGES = ('minimongo', 'pymongo', 'bson', 'six', 'numpy',
+            'generated_models')
+
+IMPORT_STATEMENTS = (
+    'import minimongo',
+    'from minimongo import AttrDict, configure',
+    'from minimongo import Model',
+)
+
+MODEL_TEMPLATE = '''
+class Model%(index)d(Model):
+    class Meta:
+        database = %(database)r
+        auto_index = False
+        indices = (Index('field_%(index)d'), )
+'''
+
+# Profiled functions to report, by (file suffix, function name).
+PROFILED = (
+    ('minimongo/options.py', '__init__', '_Options'),
+    ('minimongo/model.py', 'to_underscore', 'to_underscore'),
+    ('pymongo/mongo_client.py', '__init__', 'client'),
+    ('minimongo/collection.py', '__init__', 'collection'),
+    ('minimongo/model.py', 'auto_index', 'auto_index'),
+    ('minimongo/model.py', '__new__', 'ModelBase.__new__'),
+)
+
+
+def generate_models(directory, count):
+    """Writes a module defining `count` models into `directory`."""
+    path = os.path.join(directory, 'generated_models.py')
+    with open(path, 'w') as module:
+        module.write('from minimongo import Index, Model\n')
+        for index in range(count):
+            module.write(MODEL_TEMPLATE % {'index': index,
+                                           'database': DATABASE})
+    return path
+
+
+def _importtime(statement, directory=None):
+    """Runs `statement` in a fresh interpreter with ``-X importtime`` and
+    returns ``(self_us, cumulative_us, name)`` for every imported module."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [directory, ROOT]))
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        env=env, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    _, stderr = process.communicate()
+
+    rows = []
+    for line in stderr.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), name))
+    return rows
+
+
+def statement_times():
+    """Returns total import time (in microseconds) of every statement in
+    `IMPORT_STATEMENTS`, on top of what the interpreter imports anyway,
+    and whether pymongo got imported."""
+    baseline = set(name.strip() for _, _, name in _importtime('pass'))
+    result = {}
+    for statement in IMPORT_STATEMENTS:
+        rows = _importtime(statement)
+        result[statement] = {
+            # Top-level (not indented) imports include their children.
+            'total_us': sum(cumulative for _, cumulative, name in rows
+                            if name.strip() not in baseline and
+                            name.lstrip() == name[1:]),
+            'imports_pymongo': any(name.strip() == 'pymongo'
+                                   for _, _, name in rows),
+        }
+    return result
+
+
+def _is_third_party(package):
+    """Is `package` installed in site-packages, rather than part of the
+    standard library?"""
+    try:
+        spec = importlib.util.find_spec(package)
+    except (ImportError, ValueError):
+        return False
+    origin = (spec and (spec.origin or
+                        ''.join(spec.submodule_search_locations or ()))
+              or '')
+    return 'site-packages' in origin or 'dist-packages' in origin
+
+
+def import_times(directory):
+    """Imports the generated module in a fresh interpreter with
+    ``-X importtime`` and sums up self / cumulative microseconds per
+    top-level package, for `PACKAGES` and every third-party package that
+    got imported."""
+    rows = _importtime('import generated_models', directory)
+    result = dict((package, {'self_us': 0, 'cumulative_us': 0})
+                  for package in PACKAGES)
+    # Modules are listed once imported, after the ones they import, which
+    # are indented one more level. Walking the list backwards, every
+    # module comes after its importers.
+    importers = []
+    for self_us, cumulative_us, name in reversed(rows):
+        depth = len(name) - len(name.lstrip())
+        package = name.strip().split('.')[0]
+        while importers and importers[-1][0] >= depth:
+            importers.pop()
+        if package in result or _is_third_party(package):
+            totals = result.setdefault(package, {'self_us': 0,
+                                                 'cumulative_us': 0})
+            totals['self_us'] += self_us
+            # Cumulative time is summed over the outermost modules of the
+            # package only, not to count nested ones twice.
+            if all(outer != package for _, outer in importers):
+                totals['cumulative_us'] += cumulative_us
+        importers.append((depth, package))
+    return result
+
+
+def create_models(context, count, auto_index):
+    """Creates `count` models and returns the time it took along with a
+    profile of the interesting functions."""
+    profile = cProfile.Profile()
+    start = clock()
+    profile.enable()
+    for index in range(count):
+        # No explicit collection name, so that to_underscore() runs.
+        context.model('StartupModel%d' % index, auto_index=auto_index,
+                      collection=None, indices=())
+    profile.disable()
+    elapsed = clock() - start
+
+    stats = pstats.Stats(profile).stats
+    breakdown = {}
+    for (filename, _, function), row in stats.items():
+        for suffix, name, label in PROFILED:
+            if function == name and filename.replace(os.sep, '/').endswith(
+                    suffix):
+                # row: (primitive calls, calls, total time, cumulative time)
+                breakdown[label] = {'calls': row[1], 'cumulative_s': row[3]}
+    return {'seconds': elapsed, 'per_model_us': elapsed / count * 1e6,
+            'breakdown': breakdown}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('-n', '--count', type=int, default=400,
+                        help='number of models to create')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    parser.add_argument('-o', '--output', help='write JSON results here')
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    try:
+        generate_models(directory, args.count)
+        imports = import_times(directory)
+    finally:
+        shutil.rmtree(directory)
+
+    print('-X importtime (%d generated models)' % args.count)
+    for package in sorted(imports):
+        print('  %-18s self %10d us   cumulative %10d us' % (
+            package, imports[package]['self_us'],
+            imports[package]['cumulative_us']))
+
+    statements = statement_times()
+    for statement in IMPORT_STATEMENTS:
+        print('%-44s %10d us%s' % (
+            statement, statements[statement]['total_us'],
+            ' (imports pymongo)' if statements[statement]['imports_pymongo']
+            else ''))
+
+    server = server_available(args.host, args.port)
+    context = Context(args.host, args.port, server=server)
+    creation = {'no_auto_index': create_models(context, args.count, False)}
+    if server:
+        creation['auto_index'] = create_models(context, args.count, True)
+
+    for mode, result in sorted(creation.items()):
+        print('class creation, %s: %.1f us per model' % (
+            mode, result['per_model_us']))
+        for label, row in sorted(result['breakdown'].items()):
+            print('  %-18s %6d calls %10.1f us per model' % (
+                label, row['calls'], row['cumulative_s'] / args.count * 1e6))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'count': args.count, 'server': server,
+                       'imports': imports, 'statements': statements,
+                       'creation': creation}, output,
+                      indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
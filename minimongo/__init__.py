@@ -6,11 +6,41 @@
     Minimongo is a lightweight, schemaless, Pythonic Object-Oriented
     interface to MongoDB.
 '''
-from minimongo.index import Index
-from minimongo.collection import Collection
-from minimongo.model import Model, AttrDict
-from minimongo.options import configure
+import importlib
+import sys
 
-__all__ = ('Collection', 'Index', 'Model', 'configure', 'AttrDict')
+__all__ = ('Collection', 'Index', 'Model', 'configure', 'AttrDict',
+           'deep_sizeof')
 
+# Where public names live. Submodules are imported on first access, so
+# that tools needing only AttrDict or configure() don't pay for importing
+# pymongo and bson.
+_exports = {
+    'AttrDict': 'minimongo.attrdict',
+    'Collection': 'minimongo.collection',
+    'Index': 'minimongo.index',
+    'Model': 'minimongo.model',
+    'configure': 'minimongo.options',
+    'deep_sizeof': 'minimongo.model',
+}
 
+
+def __getattr__(name):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError('module %r has no attribute %r' % (__name__,
+                                                                 name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
+
+
+if sys.version_info < (3, 7):
+    # No module level __getattr__ (PEP 562), import everything up front.
+    for _name in __all__:
+        globals()[_name] = __getattr__(_name)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.aliases
+    ~~~~~~~~~~~~~~~~~
+
+    Short stored keys for long field names, declared with
+    ``Meta.aliases``::
+
+        class Event(Model):
+            class Meta:
+                database = 'test'
+                aliases = {'created_at': 'c', 'description': 'd'}
+
+    Models, queries, sorts, projections, updates and indices all use
+    the logical names; documents are stored under the short keys.
+    Aliases apply to top-level fields (and thus to the first part of
+    dotted paths), not to keys of subdocuments.
+'''
+from __future__ import absolute_import
+
+import six
+
+# Query operators whose values are lists of queries.
+_LOGICAL_OPERATORS = ('$and', '$or', '$nor')
+
+
+class Aliases(object):
+    """Translates between logical field names and the keys documents
+    are stored under, given a mapping of the former to the latter.
+
+    >>> aliases = Aliases({'name': 'n'})
+    >>> aliases.query({'name': 'foo', 'name.first': 'bar', 'other': 1})
+    {'n': 'foo', 'n.first': 'bar', 'other': 1}
+    """
+
+    def __init__(self, aliases):
+        self.stored = dict(aliases)
+        self.logical = dict((key, name)
+                            for name, key in six.iteritems(self.stored))
+        for name, key in six.iteritems(self.stored):
+            for value in (name, key):
+                if not isinstance(value, six.string_types) or not value or \
+                        '.' in value or value.startswith('$') or \
+                        value == '_id':
+                    raise ValueError('%r is not a valid alias' % (value, ))
+        if len(self.logical) != len(self.stored):
+            raise ValueError('Duplicate stored keys in %r' % (self.stored, ))
+
+    def field(self, name):
+        """Returns the stored key (or dotted path) of field `name`."""
+        head, dot, tail = name.partition('.')
+        return self.stored.get(head, head) + dot + tail
+
+    def _logical_field(self, key):
+        head, dot, tail = key.partition('.')
+        return self.logical.get(head, head) + dot + tail
+
+    def _translated(self, fields, translate):
+        # Builds the dict of `fields` with translated keys, refusing keys
+        # which would end up the same -- a field and its stored key, for
+        # instance.
+        result = {}
+        for key, value in six.iteritems(fields):
+            stored = translate(key)
+            if stored in result:
+                raise ValueError('Both %r and another field are stored as '
+                                 '%r' % (key, stored))
+            result[stored] = value
+        return result
+
+    def encode(self, document):
+        """Returns a copy of `document`, keyed by stored keys. Raises
+        :exc:`ValueError` if `document` has both a field and a key equal
+        to its alias.
+
+        >>> Aliases({'name': 'n'}).encode({'name': 'x', 'n': 'y'})
+        Traceback (most recent call last):
+        ...
+        ValueError: Both 'n' and another field are stored as 'n'
+        """
+        stored = self.stored
+        return self._translated(document, lambda key: stored.get(key, key))
+
+    def rename(self, document):
+        """Renames stored keys of a freshly decoded `document` to field
+        names in place, and returns it."""
+        pop = document.pop
+        for key, name in six.iteritems(self.logical):
+            if key in document:
+                value = pop(key)
+                if name in document:
+                    # Not aliased when stored; keep both, unrenamed.
+                    document[key] = value
+                else:
+                    document[name] = value
+        return document
+
+    def query(self, spec):
+        """Translates field names of a query `spec`."""
+        if not isinstance(spec, dict):
+            return spec
+        query = {}
+        for key, value in six.iteritems(spec):
+            if key in _LOGICAL_OPERATORS:
+                value = [self.query(clause) for clause in value]
+            elif not key.startswith('$'):
+                key = self.field(key)
+            query[key] = value
+        return query
+
+    def update(self, document):
+        """Translates field names of an update `document`: either the
+        fields of every update operator, or a whole replacement
+        document."""
+        if not any(key.startswith('$') for key in document):
+            return self.encode(document)
+        update = {}
+        for operator, fields in six.iteritems(document):
+            fields = self._translated(fields, self.field)
+            if operator == '$rename':
+                fields = dict((key, self.field(new))
+                              for key, new in six.iteritems(fields))
+            update[operator] = fields
+        return update
+
+    def sort(self, key_or_list):
+        """Translates a sort (or index) specification: a field name, or a
+        list of ``(name, direction)`` pairs."""
+        if isinstance(key_or_list, six.string_types):
+            return self.field(key_or_list)
+        return [(self.field(key), direction)
+                for key, direction in key_or_list]
+
+    def projection(self, projection, logical=False):
+        """Translates a `projection` dict or list to stored keys, or back
+        to field names if `logical` is true."""
+        field = self._logical_field if logical else self.field
+        if isinstance(projection, dict):
+            return dict((field(key), value)
+                        for key, value in six.iteritems(projection))
+        return [field(key) for key in projection]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import six
+
+from . import metrics
+
+
+class AttrDict(dict):
+    # KeyTable of models interning keys, see minimongo.interning.
+    _keys = None
+
+    def __init__(self, initial=None, **kwargs):
+        # Make sure that during initialization, that we recursively apply
+        # AttrDict.  Maybe this could be better done with the builtin
+        # defaultdict?
+        if initial:
+            for key, value in six.iteritems(initial):
+                # Can't just say self[k] = v here b/c of recursion.
+                self.__setitem__(key, value)
+
+        # Process the other arguments (assume they are also default values).
+        # This is the same behavior as the regular dict constructor.
+        for key, value in six.iteritems(kwargs):
+            self.__setitem__(key, value)
+
+        super(AttrDict, self).__init__()
+
+    # These lines make this object behave both like a dict (x['y']) and like
+    # an object (x.y).  We have to translate from KeyError to AttributeError
+    # since model.undefined raises a KeyError and model['undefined'] raises
+    # a KeyError.  we don't ever want __getattr__ to raise a KeyError, so we
+    # 'translate' them below:
+    def __getattr__(self, attr):
+        try:
+            return super(AttrDict, self).__getitem__(attr)
+        except KeyError as excn:
+            raise AttributeError(excn)
+
+    def __setattr__(self, attr, value):
+        try:
+            # Okay to set directly here, because we're not recursing.
+            self[attr] = value
+        except KeyError as excn:
+            raise AttributeError(excn)
+
+    def __delattr__(self, key):
+        try:
+            return super(AttrDict, self).__delitem__(key)
+        except KeyError as excn:
+            raise AttributeError(excn)
+
+    def __setitem__(self, key, value):
+        keys = self._keys
+        if keys is not None:
+            key = keys.intern(key)
+        return super(AttrDict, self).__setitem__(key,
+                                                 self._convert_value(value))
+
+    def _convert_value(self, value):
+        # Coerce all nested dict-valued fields into AttrDicts
+        if isinstance(value, dict):
+            if metrics.hot_path_enabled:
+                return metrics.convert(type(self), AttrDict, value)
+            if self._keys is not None:
+                return self._keys.attrdict(value)
+            return AttrDict(value)
+        return value
+
+    def _refill(self, document):
+        """Replaces all the contents with `document`'s, as if the object
+        was created out of it; used by :meth:`Cursor.reuse()
+        <minimongo.collection.Cursor.reuse>`."""
+        dict.clear(self)
+        self.__init__(document)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.batching
+    ~~~~~~~~~~~~~~~~~~
+
+    Adaptive cursor batch sizes, see
+    :meth:`minimongo.collection.Cursor.adaptive_batch_size`.
+'''
+from __future__ import absolute_import
+
+from collections import deque
+from itertools import islice
+
+from bson import BSON
+
+from . import metrics
+
+#: Weight of the latest batch in the moving averages.
+SMOOTHING = 0.5
+
+#: How many documents of a batch are encoded to estimate document size.
+SIZE_SAMPLES = 5
+
+
+def _average(previous, value):
+    if previous is None:
+        return value
+    return previous + SMOOTHING * (value - previous)
+
+
+class BatchSizer(object):
+    """Picks the size of every next batch of a cursor, so that a batch
+    is about `target_bytes` large and takes no more than `latency_ms` to
+    fetch and process, but has between `min_size` and `max_size`
+    documents.
+
+    Average document size, fetch time and the consumer's processing time
+    per document are tracked as moving averages; the attributes double
+    as per-cursor stats, and :attr:`history` keeps the latest decisions.
+    """
+
+    def __init__(self, target_bytes=1024 * 1024, latency_ms=100,
+                 min_size=10, max_size=10000, initial_size=101,
+                 clock=metrics.clock):
+        self.target_bytes = target_bytes
+        self.latency_ms = latency_ms
+        self.min_size = min_size
+        self.max_size = max_size
+        self.clock = clock
+
+        #: Size of the next batch, and why it was picked -- one of
+        #: ``'initial'``, ``'bytes'``, ``'latency'``, ``'min'`` or
+        #: ``'max'``.
+        self.batch_size = initial_size
+        self.reason = 'initial'
+        self.batches = 0
+        self.documents = 0
+        self.document_bytes = None
+        self.fetch_seconds = None
+        self.process_seconds = None
+        self.history = deque(maxlen=20)
+        self._fetched_at = None
+        self._fetched = 0
+
+    def fetched(self, documents, seconds):
+        """Accounts for a batch of `documents` fetched in `seconds`."""
+        count = len(documents)
+        self._fetched_at = self.clock()
+        self._fetched = count
+        if not count:
+            return
+        self.batches += 1
+        self.documents += count
+        samples = [len(BSON.encode(document))
+                   for document in islice(documents, SIZE_SAMPLES)]
+        self.document_bytes = _average(self.document_bytes,
+                                       float(sum(samples)) / len(samples))
+        self.fetch_seconds = _average(self.fetch_seconds,
+                                      float(seconds) / count)
+
+    def next_size(self):
+        """Returns the size of the next batch, once the previous one was
+        consumed."""
+        if self._fetched_at is not None and self._fetched:
+            elapsed = self.clock() - self._fetched_at
+            self.process_seconds = _average(self.process_seconds,
+                                            elapsed / self._fetched)
+        self._fetched_at = None
+
+        candidates = []
+        if self.document_bytes:
+            candidates.append((self.target_bytes / self.document_bytes,
+                               'bytes'))
+        per_document = (self.fetch_seconds or 0) + (self.process_seconds or 0)
+        if per_document:
+            candidates.append((self.latency_ms / 1000.0 / per_document,
+                               'latency'))
+        if not candidates:
+            return self.batch_size
+
+        size, reason = min(candidates)
+        if size < self.min_size:
+            size, reason = self.min_size, 'min'
+        elif size > self.max_size:
+            size, reason = self.max_size, 'max'
+        self.batch_size = int(size)
+        self.reason = reason
+        self.history.append((self.batch_size, reason))
+        return self.batch_size
+
+    def as_dict(self):
+        return {
+            'batch_size': self.batch_size,
+            'reason': self.reason,
+            'batches': self.batches,
+            'documents': self.documents,
+            'document_bytes': self.document_bytes,
+            'fetch_seconds': self.fetch_seconds,
+            'process_seconds': self.process_seconds,
+        }
+
+    def __repr__(self):
+        return '<BatchSizer %d (%s) after %d batches>' % (
+            self.batch_size, self.reason, self.batches)
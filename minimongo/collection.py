@@ -1,22 +1,438 @@
 # -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from collections import deque
 
 from pymongo.collection import Collection as PyMongoCollection
 from pymongo.cursor import Cursor as PyMongoCursor
+from pymongo.cursor import RawBatchCursor
+
+from . import compiled, metrics, tracing
+from .aliases import Aliases
+from .batching import BatchSizer
+from .columns import build_columns
+from .compression import Compression, inflate
+from .parallel import ParallelScan, decode_batches, map_reduce_local
+from .prefetch import Prefetcher
+from .resultset import ResultSet
+from .rows import row_class
+from .slow_query import SlowQueryLog
 
 
 class Cursor(PyMongoCursor):
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, collection, *args, **kwargs):
         self._wrapper_class = kwargs.pop('wrap')
-        super(Cursor, self).__init__(*args, **kwargs)
+        # Creates models out of documents; specialized for the projection
+        # once the query runs, see minimongo.compiled.
+        self._decode = self._wrapper_class
+        self._slow_query_log = collection.slow_query_log
+        self._aliases = collection.aliases
+        self._span = None
+        self._prefetch = None
+        self._prefetcher = None
+        self._batch_sizer = None
+        self._ring = None
+        self._ring_position = 0
+        super(Cursor, self).__init__(collection, *args, **kwargs)
+
+    def reuse(self, ring=1):
+        """Makes iteration refill a ring of `ring` model instances in
+        place, rather than create a new instance per document, which saves
+        allocations and garbage collection in read-only scans.
+
+        A model returned by :meth:`next` is only valid until `ring` more
+        documents are read: don't keep references to it, or modify it,
+        past that point -- copy it if needed. Like other cursor modifiers,
+        this has to be called before iterating.
+        """
+        self._Cursor__check_okay_to_chain()
+        self._ring = [None] * ring
+        return self
+
+    def _refill(self, document):
+        ring = self._ring
+        position = self._ring_position = (self._ring_position + 1) % len(ring)
+        instance = ring[position]
+        if instance is None:
+            instance = ring[position] = self._wrapper_class(document)
+        else:
+            instance._refill(document)
+        return instance
+
+    def adaptive_batch_size(self, target_bytes=1024 * 1024, latency_ms=100,
+                            min_size=10, max_size=10000):
+        """Adjusts the size of every batch fetched from the server, aiming
+        at `target_bytes` per batch and at most `latency_ms` spent
+        fetching and processing a batch. Average document size, fetch
+        time and the time the caller spends per document are measured as
+        results come in; :attr:`batch_stats` shows them along with the
+        size picked and why.
+
+        Like other cursor modifiers, this has to be called before
+        iterating.
+        """
+        self._Cursor__check_okay_to_chain()
+        self._batch_sizer = BatchSizer(
+            target_bytes, latency_ms, min_size, max_size,
+            initial_size=self._Cursor__batch_size or 101)
+        return self
+
+    @property
+    def batch_stats(self):
+        """:class:`~minimongo.batching.BatchSizer` of this cursor, if
+        :meth:`adaptive_batch_size` was called."""
+        return self._batch_sizer
+
+    def prefetch(self, depth=2, wrap=True):
+        """Makes a background thread fetch and decode up to `depth`
+        batches ahead, so that the server round trip of the next batch
+        overlaps with processing of the current one. If `wrap` is
+        ``True``, documents are wrapped into models by that thread as
+        well.
+
+        Like other cursor modifiers, this has to be called before
+        iterating. The thread stops on :meth:`close`, once results run
+        out, or when the cursor is garbage collected. Prefetched batches
+        aren't traced or checked against the slow query log.
+        """
+        self._Cursor__check_okay_to_chain()
+        self._prefetch = (depth, wrap)
+        return self
+
+    def iter_batches(self, size=None, raw=False):
+        """Iterates over results a server batch at a time, yielding lists
+        of models, which saves chunked consumers from going through
+        :meth:`next` for every single document. If `size` is given, it's
+        used as :meth:`batch_size`, so batches have at most `size`
+        documents.
+
+        If `raw` is ``True``, batches aren't decoded at all: every one is
+        yielded as :class:`bytes` of concatenated BSON documents, as
+        returned by :meth:`pymongo.collection.Collection.find_raw_batches`,
+        to be decoded with :func:`bson.decode_all` or
+        handed over as is.
+        """
+        if size is not None:
+            self.batch_size(size)
+        if raw:
+            return self._iter_raw_batches()
+        return self._iter_batches()
+
+    def _iter_documents(self):
+        """Yields batches of documents as they come from the server, or
+        the prefetcher, which might have wrapped them already."""
+        if self._prefetch is not None:
+            while True:
+                try:
+                    yield self._prefetching().next_batch()
+                except StopIteration:
+                    return
+
+        if getattr(self, '_Cursor__empty', False):
+            return
+        while len(self._Cursor__data) or self._refresh():
+            batch = self._Cursor__data
+            self._Cursor__data = deque()
+            if self._aliases is not None:
+                for document in batch:
+                    self._aliases.rename(document)
+            yield batch
+
+    def _decoder(self):
+        """Returns the function creating models out of documents returned
+        by this cursor."""
+        if issubclass(self._wrapper_class, compiled.CompiledModel):
+            projection = self._query_parts()[2]
+            if projection and self._aliases is not None:
+                projection = self._aliases.projection(projection,
+                                                      logical=True)
+            return compiled.decoder(self._wrapper_class, projection)
+        return self._wrapper_class
+
+    def _iter_batches(self):
+        wrap = self._decoder()
+        if self._prefetch is not None and self._prefetch_wraps():
+            for batch in self._iter_documents():
+                yield list(batch)
+            return
+
+        for batch in self._iter_documents():
+            start = metrics.clock() if metrics.enabled else None
+            models = [wrap(document) for document in batch]
+            if start is not None:
+                metrics.record(self._wrapper_class, 'wrap', start,
+                               documents=len(models))
+            yield models
+
+    def _iter_raw_batches(self):
+        cursor = self._clone(True, RawBatchCursor(self.collection))
+        try:
+            for batch in cursor:
+                yield batch
+        finally:
+            cursor.close()
+
+    def to_columns(self, fields, dtypes=None, use_numpy=None):
+        """Returns results as :class:`~minimongo.columns.Columns`, one
+        typed column per field of `fields`, filled straight from decoded
+        batches without creating any models, for vectorized aggregation
+        over lots of documents::
+
+            columns = Foo.collection.find().to_columns(['price', 'day'])
+            columns['price'].sum()
+
+        Fields may be dotted paths. `dtypes` maps fields to ``'int64'``,
+        ``'float64'``, ``'bool'``, ``'datetime'`` or ``'objectid'``;
+        other fields get the type of their first non-null value. Missing
+        and ``None`` values are zero, and true in the column's
+        :meth:`~minimongo.columns.Columns.mask`.
+
+        Columns are NumPy arrays, if NumPy is installed and `use_numpy`
+        isn't ``False``, :class:`array.array` otherwise. Unless the
+        cursor has a projection already, only `fields` are fetched.
+        """
+        self._project(fields)
+        return build_columns(self._iter_documents(), fields, dtypes,
+                             use_numpy)
+
+    def _project(self, fields):
+        """Fetches only `fields`, unless the query was sent already or
+        there's a projection."""
+        if self._Cursor__id is not None or self._prefetch is not None or \
+                self._query_parts()[2]:
+            return
+        projection = dict((field, 1) for field in fields)
+        if '_id' not in projection:
+            projection['_id'] = 0
+        if self._aliases is not None:
+            projection = self._aliases.projection(projection)
+        if hasattr(self, '_Cursor__projection'):
+            self._Cursor__projection = projection
+        else:
+            # Called `__fields` before pymongo 3.0.
+            self._Cursor__fields = projection
+
+    def rows(self, fields):
+        """Iterates over results as rows of `fields` only, instead of
+        models. Rows are instances of a class generated (and cached) per
+        model and set of fields, storing values in ``__slots__``, which
+        takes far less memory than a dict per document; otherwise they
+        have the same attribute and item access, and ``row.to_model()``
+        converts one into a model::
+
+            for row in Foo.collection.find().rows(['name', 'score']):
+                print(row.name, row.score)
+
+        Fields have to be valid identifiers. Unless the cursor has a
+        projection already, only `fields` are fetched.
+        """
+        cls = row_class(self._wrapper_class, fields)
+        self._project(fields)
+        return self._iter_rows(cls)
+
+    def _iter_rows(self, cls):
+        from_document = cls.from_document
+        for batch in self._iter_documents():
+            for document in batch:
+                yield from_document(document)
+
+    def to_result_set(self):
+        """Returns all the results in a :class:`~minimongo.resultset.
+        ResultSet`, which stores them column by column rather than as a
+        model per document, for keeping lots of them in memory."""
+        results = ResultSet(model=self._wrapper_class)
+        for batch in self._iter_documents():
+            results.extend(batch)
+        return results
+
+    def decode_parallel(self, workers=None, ordered=True, transform=None,
+                        shared=True):
+        """Iterates over results fetched as raw batches (see
+        :meth:`iter_batches`), which are decoded and wrapped into models
+        by a pool of `workers` processes, one per CPU by default, taking
+        BSON decoding off this process' single core.
+
+        Documents come in order, unless `ordered` is ``False``, in which
+        case batches come as soon as any worker is done with them. Since
+        models are pickled on the way back, passing a `transform`
+        function (defined at a module level) that keeps only what's
+        needed out of every model makes results cheaper to send. On
+        Python 3.8+ raw batches are passed to workers in shared memory,
+        unless `shared` is ``False``.
+        """
+        return decode_batches(self._iter_raw_batches(), self._wrapper_class,
+                              workers=workers, ordered=ordered,
+                              transform=transform, shared=shared)
+
+    def _plain_clone(self):
+        """Returns a plain pymongo cursor with the same query and
+        options."""
+        try:
+            return self._clone(True, PyMongoCursor(self.collection))
+        except TypeError:
+            # pymongo < 3.0 always clones into a plain cursor.
+            return self._clone(True)
+
+    def _prefetch_wraps(self):
+        # Reused instances are refilled from plain documents instead, not
+        # to build every model twice.
+        return self._prefetch[1] and self._ring is None
+
+    def _prefetching(self):
+        """Returns the :class:`~minimongo.prefetch.Prefetcher` of this
+        cursor, starting it on first use."""
+        if self._prefetcher is None:
+            depth, wrap = self._prefetch[0], self._prefetch_wraps()
+            if getattr(self, '_Cursor__empty', False):
+                raise StopIteration
+            self._decode = decode = self._decoder()
+            aliases = self._aliases
+            if aliases is None:
+                prepare = decode if wrap else None
+            elif wrap:
+                def prepare(document):
+                    return decode(aliases.rename(document))
+            else:
+                prepare = aliases.rename
+            self._prefetcher = Prefetcher(self._plain_clone(), depth,
+                                          wrap=prepare,
+                                          model=self._wrapper_class)
+        return self._prefetcher
+
+    def _next_prefetched(self):
+        document = self._prefetching().next()
+        if self._ring is not None:
+            return self._refill(document)
+        if self._prefetch_wraps():
+            return document
+        return self._decode(document)
+
+    def _query_parts(self):
+        """Returns query, sort and projection of this cursor."""
+        ordering = self._Cursor__ordering
+        # Called `__fields` before pymongo 3.0.
+        projection = getattr(self, '_Cursor__projection',
+                             getattr(self, '_Cursor__fields', None))
+        return (self._Cursor__spec,
+                list(ordering.items()) if ordering else None,
+                projection)
+
+    def _explain(self):
+        query, sort, projection = self._query_parts()
+        # A plain pymongo cursor, so that the explain output isn't
+        # wrapped or instrumented.
+        cursor = PyMongoCollection.find(self.collection, query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        return cursor.explain()
+
+    def _refresh(self):
+        # Called by pymongo whenever the current batch is drained; the
+        # very first call runs the query itself.
+        if self._Cursor__id is None:
+            self._decode = self._decoder()
+        sizer = self._batch_sizer
+        if sizer is None or len(self._Cursor__data) or \
+                self._Cursor__killed:
+            return self._fetch()
+
+        if self._Cursor__id is None:
+            self._Cursor__batch_size = sizer.batch_size
+        else:
+            self._Cursor__batch_size = sizer.next_size()
+        start = metrics.clock()
+        count = self._fetch()
+        sizer.fetched(self._Cursor__data, metrics.clock() - start)
+        return count
+
+    def _fetch(self):
+        slow_query_log = self._slow_query_log
+        query = self._Cursor__id is None
+        if not (metrics.enabled or tracing.enabled or
+                self._span is not None or
+                query and slow_query_log is not None):
+            return super(Cursor, self)._refresh()
+
+        if query and tracing.enabled:
+            self._span = tracing.Span('minimongo.find',
+                                      model=self._wrapper_class,
+                                      query=self._Cursor__spec)
+        start = metrics.clock()
+        if metrics.enabled:
+            with metrics.attributed(self._wrapper_class):
+                count = super(Cursor, self)._refresh()
+        else:
+            count = super(Cursor, self)._refresh()
+        if self._span is not None:
+            if count:
+                self._span.add_documents(self._Cursor__data)
+            else:
+                self._span.finish()
+                self._span = None
+        if metrics.enabled:
+            nbytes = 0
+            if metrics.measure_bytes:
+                nbytes = sum(metrics.document_size(document)
+                             for document in self._Cursor__data)
+            # The query itself, along with its first batch, or a later
+            # batch.
+            metrics.record(self._wrapper_class,
+                           'find' if query else 'batch', start,
+                           documents=count, nbytes=nbytes)
+        if query and slow_query_log is not None:
+            spec, sort, projection = self._query_parts()
+            slow_query_log.observe('find', start, spec, sort, projection,
+                                   explain=self._explain)
+        return count
+
+    def _finish_span(self):
+        span, self._span = getattr(self, '_span', None), None
+        if span is not None:
+            span.finish()
+
+    def close(self):
+        self._finish_span()
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+        super(Cursor, self).close()
+
+    def __del__(self):
+        # pymongo kills abandoned cursors without going through close().
+        self._finish_span()
+        super(Cursor, self).__del__()
+
+    def _timed_wrap(self, document):
+        start = metrics.clock()
+        wrapped = self._decode(document)
+        metrics.record(self._wrapper_class, 'wrap', start, documents=1)
+        return wrapped
 
     def next(self):
-        return self._wrapper_class(super(Cursor, self).next())
+        if self._prefetch is not None:
+            return self._next_prefetched()
+        document = super(Cursor, self).next()
+        if self._aliases is not None:
+            self._aliases.rename(document)
+        if self._ring is not None:
+            return self._refill(document)
+        if metrics.enabled:
+            return self._timed_wrap(document)
+        return self._decode(document)
 
     # XXX simple alias won't work here because of the super call.
 
     def __next__(self):
-        return self._wrapper_class(super(Cursor, self).__next__())
+        if self._prefetch is not None:
+            return self._next_prefetched()
+        document = super(Cursor, self).__next__()
+        if self._aliases is not None:
+            self._aliases.rename(document)
+        if self._ring is not None:
+            return self._refill(document)
+        if metrics.enabled:
+            return self._timed_wrap(document)
+        return self._decode(document)
 
     def __getitem__(self, index):
         if isinstance(index, slice):
@@ -24,6 +440,13 @@ class Cursor(PyMongoCursor):
         else:
             return self._wrapper_class(super(Cursor, self).__getitem__(index))
 
+    def sort(self, key_or_list, direction=None):
+        """Same as :meth:`pymongo.cursor.Cursor.sort`, translating field
+        names if the model has ``Meta.aliases``."""
+        if self._aliases is not None:
+            key_or_list = self._aliases.sort(key_or_list)
+        return super(Cursor, self).sort(key_or_list, direction)
+
 
 class Collection(PyMongoCollection):
     """A wrapper around :class:`pymongo.collection.Collection` that
@@ -37,25 +460,415 @@ class Collection(PyMongoCollection):
     #: A reference to the model class, which uses this collection.
     document_class = None
 
+    #: :class:`~minimongo.slow_query.SlowQueryLog` of this collection, if
+    #: ``Meta.slow_query_ms`` is set.
+    slow_query_log = None
+
+    #: :class:`~minimongo.aliases.Aliases` of this collection, if
+    #: ``Meta.aliases`` is set.
+    aliases = None
+
+    #: :class:`~minimongo.compression.Compression` of this collection, if
+    #: ``Meta.compressed_fields`` is set.
+    compression = None
+
+    # Are documents encoded (aliased or compressed) before being written?
+    _encodes = False
+
     def __init__(self, *args, **kwargs):
         self.document_class = kwargs.pop('document_class')
         super(Collection, self).__init__(*args, **kwargs)
 
+        meta = getattr(self.document_class, '_meta', None)
+        if meta is not None and meta.slow_query_ms is not None:
+            self.slow_query_log = SlowQueryLog(
+                self, meta.slow_query_ms,
+                explain_rate=meta.slow_query_explain_rate,
+                rate_limit=meta.slow_query_rate_limit)
+        if meta is not None and meta.aliases:
+            self.aliases = Aliases(meta.aliases)
+        if meta is not None and meta.compressed_fields:
+            self.compression = Compression(
+                meta.compressed_fields, meta.compression,
+                meta.compression_threshold)
+        self._encodes = self.aliases is not None or \
+            self.compression is not None
+
+    def _aliased(self, args, kwargs, *translations):
+        # Translates field names in arguments of a pymongo method:
+        # `translations` are (position, names, translate) triples, position
+        # being None for keyword only arguments, and translate the function
+        # translating the argument.
+        args = list(args)
+        for position, names, translate in translations:
+            if position is not None and len(args) > position:
+                if args[position] is not None:
+                    args[position] = translate(args[position])
+                continue
+            for name in names:
+                if kwargs.get(name) is not None:
+                    kwargs[name] = translate(kwargs[name])
+        return args, kwargs
+
+    def _aliased_find(self, args, kwargs):
+        # Query, projection and sort of find() and alike (`spec` and
+        # `fields` before pymongo 3.0).
+        aliases = self.aliases
+        return self._aliased(args, kwargs,
+                             (0, ('filter', 'spec'), aliases.query),
+                             (1, ('projection', 'fields'),
+                              aliases.projection),
+                             (None, ('sort', ), aliases.sort))
+
+    def _query(self, spec):
+        if self.aliases is None:
+            return spec
+        return self.aliases.query(spec)
+
+    def _encode(self, document):
+        # Returns `document` as stored: compressed, under stored keys.
+        if self.compression is not None:
+            document = self.compression.encode(document)
+        if self.aliases is not None:
+            document = self.aliases.encode(document)
+        return document
+
+    def _encode_update(self, document):
+        if self.compression is not None:
+            document = self.compression.update(document)
+        if self.aliases is not None:
+            document = self.aliases.update(document)
+        return document
+
+    def _encoded(self, documents, insert):
+        # Inserts encoded `documents`; ids pymongo generates are set on
+        # the originals as well.
+        encoded = [self._encode(document) for document in documents]
+        result = insert(encoded)
+        for document, stored in zip(documents, encoded):
+            if '_id' in stored:
+                document['_id'] = stored['_id']
+        return result
+
+    def _refuse_aliases(self, name):
+        if self.aliases is not None:
+            raise NotImplementedError(
+                '%s() with Meta.aliases: field names in pipelines are not '
+                'translated, call pymongo.collection.Collection.%s() with '
+                'stored keys instead' % (name, name))
+
     def find(self, *args, **kwargs):
         """Same as :meth:`pymongo.collection.Collection.find`, except
         it returns the right document class.
         """
+        if self.aliases is not None:
+            args, kwargs = self._aliased_find(args, kwargs)
+        # Latency is recorded by the cursor, once it runs the query.
         return Cursor(self, *args, wrap=self.document_class, **kwargs)
 
     def find_one(self, *args, **kwargs):
         """Same as :meth:`pymongo.collection.Collection.find_one`, except
         it returns the right document class.
         """
+        start = metrics.clock() if metrics.enabled else None
+        # Goes through find(), so the document is a model already.
         data = super(Collection, self).find_one(*args, **kwargs)
-        if data:
-            return self.document_class(data)
-        return None
+        if not data:
+            data = None
+        if start is not None:
+            metrics.record(self.document_class, 'find_one', start,
+                           documents=int(data is not None),
+                           nbytes=metrics.document_size(data))
+        return data
+
+    def save(self, to_save, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.save`."""
+        if self._encodes:
+            return self._encoded([to_save], lambda documents: self._save(
+                documents[0], *args, **kwargs))
+        return self._save(to_save, *args, **kwargs)
+
+    def _save(self, to_save, *args, **kwargs):
+        if not metrics.enabled:
+            return super(Collection, self).save(to_save, *args, **kwargs)
+
+        start = metrics.clock()
+        with metrics.attributed(self.document_class):
+            result = super(Collection, self).save(to_save, *args, **kwargs)
+        metrics.record(self.document_class, 'save', start, documents=1,
+                       nbytes=metrics.document_size(to_save))
+        return result
+
+    def update(self, spec, document, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.update`."""
+        if self._encodes:
+            spec = self._query(spec)
+            document = self._encode_update(document)
+        if not metrics.enabled and self.slow_query_log is None:
+            return super(Collection, self).update(spec, document,
+                                                  *args, **kwargs)
+
+        start = metrics.clock()
+        with metrics.attributed(self.document_class):
+            result = super(Collection, self).update(spec, document,
+                                                    *args, **kwargs)
+        if metrics.enabled:
+            documents = result.get('n', 0) if isinstance(result, dict) else 0
+            metrics.record(self.document_class, 'update', start,
+                           documents=documents,
+                           nbytes=metrics.document_size(document))
+        if self.slow_query_log is not None:
+            self.slow_query_log.observe(
+                'update', start, spec,
+                explain=lambda: PyMongoCollection.find(self, spec).explain())
+        return result
+
+    def remove(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.remove`."""
+        if args and self.aliases is not None:
+            args = (self.aliases.query(args[0]), ) + args[1:]
+        if not metrics.enabled:
+            return super(Collection, self).remove(*args, **kwargs)
+
+        start = metrics.clock()
+        with metrics.attributed(self.document_class):
+            result = super(Collection, self).remove(*args, **kwargs)
+        documents = result.get('n', 0) if isinstance(result, dict) else 0
+        metrics.record(self.document_class, 'remove', start,
+                       documents=documents)
+        return result
+
+    # The rest of pymongo's CRUD methods, translating field names with
+    # Meta.aliases and compressing Meta.compressed_fields.
+
+    def insert(self, doc_or_docs, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.insert`."""
+        insert = super(Collection, self).insert
+        if not self._encodes:
+            return insert(doc_or_docs, *args, **kwargs)
+        if isinstance(doc_or_docs, dict):
+            return self._encoded([doc_or_docs], lambda documents: insert(
+                documents[0], *args, **kwargs))
+        return self._encoded(list(doc_or_docs), lambda documents: insert(
+            documents, *args, **kwargs))
+
+    def insert_one(self, document, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.insert_one`."""
+        insert_one = super(Collection, self).insert_one
+        if not self._encodes:
+            return insert_one(document, *args, **kwargs)
+        return self._encoded([document], lambda documents: insert_one(
+            documents[0], *args, **kwargs))
+
+    def insert_many(self, documents, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.insert_many`."""
+        insert_many = super(Collection, self).insert_many
+        if not self._encodes:
+            return insert_many(documents, *args, **kwargs)
+        return self._encoded(list(documents), lambda encoded: insert_many(
+            encoded, *args, **kwargs))
+
+    def update_one(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.update_one`."""
+        if self._encodes:
+            args, kwargs = self._aliased(args, kwargs,
+                                         (0, ('filter', ), self._query),
+                                         (1, ('update', ),
+                                          self._encode_update))
+        return super(Collection, self).update_one(*args, **kwargs)
+
+    def update_many(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.update_many`."""
+        if self._encodes:
+            args, kwargs = self._aliased(args, kwargs,
+                                         (0, ('filter', ), self._query),
+                                         (1, ('update', ),
+                                          self._encode_update))
+        return super(Collection, self).update_many(*args, **kwargs)
+
+    def replace_one(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.replace_one`."""
+        if self._encodes:
+            args, kwargs = self._aliased(args, kwargs,
+                                         (0, ('filter', ), self._query),
+                                         (1, ('replacement', ),
+                                          self._encode))
+        return super(Collection, self).replace_one(*args, **kwargs)
+
+    def delete_one(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.delete_one`."""
+        if self.aliases is not None:
+            args, kwargs = self._aliased(args, kwargs,
+                                         (0, ('filter', ), self._query))
+        return super(Collection, self).delete_one(*args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.delete_many`."""
+        if self.aliases is not None:
+            args, kwargs = self._aliased(args, kwargs,
+                                         (0, ('filter', ), self._query))
+        return super(Collection, self).delete_many(*args, **kwargs)
+
+    def count(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.count`."""
+        if self.aliases is not None:
+            args, kwargs = self._aliased(args, kwargs,
+                                         (0, ('filter', 'spec'),
+                                          self._query))
+        return super(Collection, self).count(*args, **kwargs)
+
+    def count_documents(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.count_documents`.
+        """
+        if self.aliases is not None:
+            args, kwargs = self._aliased(args, kwargs,
+                                         (0, ('filter', ), self._query))
+        return super(Collection, self).count_documents(*args, **kwargs)
+
+    def distinct(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.distinct`."""
+        if self.aliases is not None:
+            args, kwargs = self._aliased(args, kwargs,
+                                         (0, ('key', ), self.aliases.field),
+                                         (1, ('filter', ), self._query))
+        return super(Collection, self).distinct(*args, **kwargs)
+
+    def _find_one_and(self, method, second, args, kwargs):
+        # find_one_and_delete/replace/update(); the document returned is
+        # a plain dict, renamed back to field names and decompressed.
+        if not self._encodes:
+            return method(*args, **kwargs)
+        translations = [(0, ('filter', ), self._query)]
+        if self.aliases is not None:
+            translations += [
+                (None, ('projection', ), self.aliases.projection),
+                (None, ('sort', ), self.aliases.sort)]
+        if second is not None:
+            translations.append((1, ) + second)
+        args, kwargs = self._aliased(args, kwargs, *translations)
+        document = method(*args, **kwargs)
+        if document is not None and self.aliases is not None:
+            self.aliases.rename(document)
+        if document is not None and self.compression is not None:
+            inflate(document)
+        return document
+
+    def find_one_and_delete(self, *args, **kwargs):
+        """Same as
+        :meth:`pymongo.collection.Collection.find_one_and_delete`."""
+        return self._find_one_and(
+            super(Collection, self).find_one_and_delete, None, args, kwargs)
+
+    def find_one_and_replace(self, *args, **kwargs):
+        """Same as
+        :meth:`pymongo.collection.Collection.find_one_and_replace`."""
+        return self._find_one_and(
+            super(Collection, self).find_one_and_replace,
+            (('replacement', ), self._encode), args, kwargs)
+
+    def find_one_and_update(self, *args, **kwargs):
+        """Same as
+        :meth:`pymongo.collection.Collection.find_one_and_update`."""
+        return self._find_one_and(
+            super(Collection, self).find_one_and_update,
+            (('update', ), self._encode_update), args, kwargs)
+
+    def find_raw_batches(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.find_raw_batches`;
+        raw documents keep their stored keys."""
+        if self.aliases is not None:
+            args, kwargs = self._aliased_find(args, kwargs)
+        return super(Collection, self).find_raw_batches(*args, **kwargs)
+
+    def aggregate(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.aggregate`;
+        refused with ``Meta.aliases``."""
+        self._refuse_aliases('aggregate')
+        return super(Collection, self).aggregate(*args, **kwargs)
+
+    def aggregate_raw_batches(self, *args, **kwargs):
+        """Same as
+        :meth:`pymongo.collection.Collection.aggregate_raw_batches`;
+        refused with ``Meta.aliases``."""
+        self._refuse_aliases('aggregate_raw_batches')
+        return super(Collection, self).aggregate_raw_batches(*args,
+                                                             **kwargs)
+
+    def find_and_modify(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.find_and_modify`;
+        refused with ``Meta.aliases``, use :meth:`find_one_and_update`
+        and alike."""
+        self._refuse_aliases('find_and_modify')
+        return super(Collection, self).find_and_modify(*args, **kwargs)
+
+    def watch(self, *args, **kwargs):
+        """Same as :meth:`pymongo.collection.Collection.watch`; refused
+        with ``Meta.aliases``."""
+        self._refuse_aliases('watch')
+        return super(Collection, self).watch(*args, **kwargs)
+
+    def parallel_find(self, query=None, partitions=4, workers=None,
+                      ordered=True, buffer_size=1000, checkpoint=None,
+                      **kwargs):
+        """Scans documents matching `query` with several threads at once:
+        the ``_id`` key space is split into `partitions` ranges of about
+        equal size, and every range is fetched, decoded and wrapped by a
+        thread out of `workers` (one per range by default), with at most
+        `buffer_size` documents buffered per range.
+
+        Documents come in ``_id`` order unless `ordered` is ``False``, in
+        which case they come as soon as any thread has them.
+
+        `checkpoint` is a dict updated as documents are consumed; pass the
+        same dict again to resume an interrupted scan where it stopped (the
+        document which was being processed at that time comes again). Save
+        it with :mod:`bson.json_util`, as it holds ``_id`` values::
+
+            checkpoint = json_util.loads(load_checkpoint() or '{}')
+            for foo in Foo.collection.parallel_find(checkpoint=checkpoint):
+                process(foo)
+                save_checkpoint(json_util.dumps(checkpoint))
+
+        Threads start with the iteration; :meth:`~ParallelScan.close` the
+        returned :class:`~minimongo.parallel.ParallelScan` to stop them
+        before it's over. Any other arguments, but `sort`, are passed to
+        :meth:`find`.
+        """
+        return ParallelScan(self, query, partitions=partitions,
+                            workers=workers, ordered=ordered,
+                            buffer_size=buffer_size, checkpoint=checkpoint,
+                            **kwargs)
+
+    def map_reduce_local(self, query, mapper, reducer, workers=None,
+                         chunks=None, progress=None, **kwargs):
+        """Maps and reduces documents matching `query` in a pool of
+        `workers` processes (one per CPU by default), for CPU heavy
+        per-document Python code.
+
+        The ``_id`` key space is split into `chunks` ranges (four per
+        worker by default). Every worker process opens a client of its
+        own, wraps documents of a range in the model class, and reduces
+        ``mapper(model)`` results with ``reducer(accumulator, value)``,
+        starting from `initial` if given. Only reduced values are sent
+        back to this process, where they're combined with `combiner`
+        (`reducer` by default). `progress`, if given, is called with the
+        number of finished and all chunks as chunks finish::
+
+            def word_count(doc):
+                return len(doc.text.split())
+
+            total = Foo.collection.map_reduce_local({}, word_count,
+                                                    operator.add)
+
+        `mapper`, `reducer` and the model class have to be picklable, that
+        is defined at a module level. Any other arguments are passed to
+        :meth:`find`. Returns ``None`` if no documents matched.
+        """
+        return map_reduce_local(self, query, mapper, reducer,
+                                workers=workers, chunks=chunks,
+                                progress=progress, **kwargs)
 
+    @tracing.traced('from_dbref', query={'_id': 1})
     def from_dbref(self, dbref):
         """Given a :class:`pymongo.dbref.DBRef`, dereferences it and
         returns a corresponding document, wrapped in an appropriate model
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.columns
+    ~~~~~~~~~~~~~~~~~
+
+    Columnar export of query results, see
+    :meth:`minimongo.collection.Cursor.to_columns`. Columns are NumPy
+    arrays if NumPy is installed, :class:`array.array` otherwise. NumPy is
+    only imported once columns are built, as importing it takes longer
+    than importing the whole of minimongo.
+'''
+from __future__ import absolute_import
+
+import array
+import calendar
+import datetime
+
+import six
+from bson import ObjectId
+
+# The numpy module, once _import_numpy() imported it; None if it's not
+# installed.
+numpy = None
+_numpy_imported = False
+
+#: Column types: NumPy dtype and :mod:`array` typecode of each.
+#: Datetimes are stored as milliseconds since the epoch, ObjectIds as
+#: their 12 bytes (raw ``'V12'`` values, which keep trailing NUL bytes
+#: unlike ``'S12'`` strings; ``'B'`` arrays hold 12 items per row).
+DTYPES = {
+    'int64': ('i8', 'q'),
+    'float64': ('f8', 'd'),
+    'bool': ('?', 'b'),
+    'datetime': ('i8', 'q'),
+    'objectid': ('V12', 'B'),
+}
+
+#: Initial capacity of NumPy columns, doubled whenever they're full.
+INITIAL_CAPACITY = 1024
+
+
+def _import_numpy():
+    """Returns the numpy module, or ``None`` if it's not installed."""
+    global numpy, _numpy_imported
+    if not _numpy_imported:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy, _numpy_imported = module, True
+    return numpy
+
+
+def infer_dtype(value):
+    """Returns the column type for a `value`, or ``None`` if it has
+    none.
+
+    >>> infer_dtype(True), infer_dtype(1), infer_dtype(1.5)
+    ('bool', 'int64', 'float64')
+    """
+    if isinstance(value, bool):
+        return 'bool'
+    elif isinstance(value, six.integer_types):
+        return 'int64'
+    elif isinstance(value, float):
+        return 'float64'
+    elif isinstance(value, datetime.datetime):
+        return 'datetime'
+    elif isinstance(value, ObjectId):
+        return 'objectid'
+    return None
+
+
+def _milliseconds(value):
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return calendar.timegm(value.timetuple()) * 1000 + \
+        value.microsecond // 1000
+
+
+def _converter(dtype):
+    if dtype == 'bool':
+        return lambda value: value is True
+    elif dtype == 'int64':
+        return lambda value: int(value)
+    elif dtype == 'float64':
+        return lambda value: float(value)
+    elif dtype == 'datetime':
+        return _milliseconds
+    return lambda value: value.binary
+
+
+_EXPECTED = {
+    'bool': bool,
+    'int64': six.integer_types,
+    'float64': six.integer_types + (float, ),
+    'datetime': datetime.datetime,
+    'objectid': ObjectId,
+}
+
+
+class ColumnBuilder(object):
+    """Accumulates values of a single column, along with a null mask.
+
+    Columns of inferred type ``'int64'`` are widened to ``'float64'`` on
+    the first float (integers beyond 2 ** 53 lose precision then); other
+    values of the wrong type raise :exc:`TypeError`.
+    """
+
+    def __init__(self, name, dtype=None, use_numpy=True):
+        if dtype is not None and dtype not in DTYPES:
+            raise ValueError('Unknown column type %r of %r' % (dtype, name))
+        if use_numpy and _import_numpy() is None:
+            raise ImportError('NumPy is not installed')
+        self.name = name
+        self.dtype = dtype
+        self.inferred = dtype is None
+        self.use_numpy = use_numpy
+        self.size = 0
+        self._values = None
+        self._mask = None
+        if dtype is not None:
+            self._allocate()
+
+    def _allocate(self):
+        self._convert = _converter(self.dtype)
+        numpy_dtype, typecode = DTYPES[self.dtype]
+        if self.use_numpy:
+            capacity = max(INITIAL_CAPACITY, self.size)
+            self._values = numpy.zeros(capacity, numpy_dtype)
+            self._mask = numpy.zeros(capacity, bool)
+            self._mask[:self.size] = True
+            self._zero = numpy.zeros((), numpy_dtype)[()]
+        else:
+            width = 12 if self.dtype == 'objectid' else 1
+            self._values = array.array(typecode, [0] * self.size * width)
+            self._mask = array.array('b', [1] * self.size)
+
+    def _widen(self):
+        # int64 -> float64, once a float shows up.
+        self.dtype = 'float64'
+        self._convert = _converter(self.dtype)
+        if self.use_numpy:
+            self._values = self._values.astype('f8')
+            self._zero = self._values.dtype.type()
+        else:
+            self._values = array.array('d', self._values)
+
+    def _grow(self):
+        capacity = len(self._values) * 2
+        self._values = numpy.resize(self._values, capacity)
+        self._mask = numpy.resize(self._mask, capacity)
+
+    def append(self, value):
+        if value is None:
+            self._append_null()
+            return
+        if self.dtype is None:
+            self.dtype = infer_dtype(value)
+            if self.dtype is None:
+                raise TypeError('Field %r: no column type for %r'
+                                % (self.name, value))
+            self._allocate()
+        if self.dtype == 'int64' and self.inferred and \
+                isinstance(value, float):
+            self._widen()
+        if not isinstance(value, _EXPECTED[self.dtype]) or \
+                isinstance(value, bool) != (self.dtype == 'bool'):
+            raise TypeError('Field %r: %r is not %s' % (self.name, value,
+                                                        self.dtype))
+        value = self._convert(value)
+        if self.use_numpy:
+            if self.size == len(self._values):
+                self._grow()
+            self._values[self.size] = value
+            self._mask[self.size] = False
+        else:
+            if self.dtype == 'objectid':
+                self._values.extend(bytearray(value))
+            else:
+                self._values.append(value)
+            self._mask.append(0)
+        self.size += 1
+
+    def _append_null(self):
+        if self.dtype is None:
+            # Nothing allocated until the type is known.
+            self.size += 1
+            return
+        if self.use_numpy:
+            if self.size == len(self._values):
+                self._grow()
+            self._values[self.size] = self._zero
+            self._mask[self.size] = True
+        else:
+            width = 12 if self.dtype == 'objectid' else 1
+            self._values.extend([0] * width)
+            self._mask.append(1)
+        self.size += 1
+
+    def finish(self):
+        """Returns ``(values, mask)`` of the column, `mask` being true
+        for rows where the field was missing or ``None``."""
+        if self.dtype is None:
+            # Only nulls, if anything.
+            self.dtype = 'float64'
+            self._allocate()
+        values, mask = self._values, self._mask
+        if self.use_numpy:
+            values, mask = values[:self.size], mask[:self.size]
+            if self.dtype == 'datetime':
+                values = values.view('datetime64[ms]')
+        return values, mask
+
+
+class Columns(object):
+    """Result of :meth:`~minimongo.collection.Cursor.to_columns`: a
+    mapping of field names to columns, with :meth:`mask` telling which
+    rows are null."""
+
+    def __init__(self, names, builders):
+        self.names = names
+        self.dtypes = {}
+        self._values = {}
+        self._masks = {}
+        for name, builder in zip(names, builders):
+            self._values[name], self._masks[name] = builder.finish()
+            self.dtypes[name] = builder.dtype
+        self.size = builders[0].size if builders else 0
+
+    def __getitem__(self, name):
+        return self._values[name]
+
+    def __contains__(self, name):
+        return name in self._values
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return self.size
+
+    def mask(self, name):
+        """Returns the null mask of column `name`."""
+        return self._masks[name]
+
+    def masked(self, name):
+        """Returns column `name` as a :class:`numpy.ma.MaskedArray`."""
+        _import_numpy()
+        return numpy.ma.MaskedArray(self._values[name], self._masks[name])
+
+    def __repr__(self):
+        return '<Columns %d x %r>' % (self.size, self.names)
+
+
+def _lookup(document, path):
+    for key in path:
+        if not isinstance(document, dict):
+            return None
+        document = document.get(key)
+    return document
+
+
+def build_columns(batches, fields, dtypes=None, use_numpy=None):
+    """Returns :class:`Columns` of `fields` (which may be dotted paths)
+    out of `batches` of decoded documents. `dtypes` maps fields to keys
+    of :data:`DTYPES`; types of other fields are inferred from their
+    first non-null value."""
+    if use_numpy is None:
+        use_numpy = _import_numpy() is not None
+    dtypes = dtypes or {}
+    paths = [field.split('.') for field in fields]
+    builders = [ColumnBuilder(field, dtypes.get(field), use_numpy)
+                for field in fields]
+    columns = list(zip(paths, builders))
+    for batch in batches:
+        for document in batch:
+            for path, builder in columns:
+                if len(path) == 1:
+                    builder.append(document.get(path[0]))
+                else:
+                    builder.append(_lookup(document, path))
+    return Columns(list(fields), builders)
@@ -0,0 +1,513 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.compiled
+    ~~~~~~~~~~~~~~~~~~
+
+    Models with a fixed set of fields, declared with ``Meta.fields``::
+
+        class Point(Model):
+            class Meta:
+                database = 'test'
+                fields = {'x': 0, 'y': 0, 'label': None}
+
+    Declared fields are stored in ``__slots__`` rather than in the dict
+    every model is, which only holds ``_id`` -- BSON encoders look it up
+    in the dict itself -- and keys that weren't declared, if any. Access
+    works the same as with any other model, both as attributes and items.
+
+    ``__init__``, :meth:`~CompiledModel.to_bson` and
+    :meth:`~CompiledModel.from_bson` are generated per class: every field
+    is looked up, defaulted, run through ``field_map`` and converted in
+    straight-line code rather than through ``__setitem__``. Cursors use a
+    :func:`decoder` generated for their projection, so fields the query
+    leaves out aren't touched. Models defining their own ``__init__``
+    keep it -- the generated one is what ``super().__init__()`` calls --
+    and cursors create them by calling the class.
+
+    Fields can't be named after attributes of models (``save``,
+    ``items``, ``collection``, ...), which slots would hide.
+'''
+from __future__ import absolute_import
+
+import copy
+import keyword
+import re
+
+import six
+
+from . import metrics
+from .attrdict import AttrDict
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Attributes ModelBase sets on model classes.
+_CLASS_ATTRIBUTES = frozenset(['collection', 'connection', 'database',
+                               '_meta'])
+
+
+class _Missing(object):
+    def __repr__(self):
+        return '<MISSING>'
+
+
+#: Marks fields with no default value; they're unset until assigned.
+MISSING = _Missing()
+# Values, which don't need copying when used as defaults.
+_IMMUTABLE = six.integer_types + six.string_types + (
+    float, bool, type(None), tuple, frozenset, bytes)
+
+
+def normalize_fields(fields):
+    """Returns ``(name, default)`` pairs out of a ``Meta.fields``
+    declaration: either a dict mapping names to defaults, or a sequence
+    of names and ``(name, default)`` pairs.
+
+    >>> normalize_fields(['a', ('b', 1)])
+    [('a', <MISSING>), ('b', 1)]
+    """
+    if isinstance(fields, dict):
+        pairs = sorted(fields.items())
+    else:
+        pairs = [field if isinstance(field, tuple) else (field, MISSING)
+                 for field in fields]
+    # Imported here, as minimongo.model imports this module.
+    from .model import Model
+    for name, _ in pairs:
+        if not isinstance(name, six.string_types) or \
+                not _IDENTIFIER.match(name) or keyword.iskeyword(name) or \
+                name.startswith('__') or name == '_id':
+            raise ValueError('%r is not a valid field name' % (name, ))
+        if hasattr(Model, name) or hasattr(CompiledModel, name) or \
+                name in _CLASS_ATTRIBUTES:
+            raise ValueError('Field %r would hide Model.%s' % (name, name))
+    names = [name for name, _ in pairs]
+    if len(set(names)) != len(names):
+        raise ValueError('Duplicate fields in %r' % (names, ))
+    return pairs
+
+
+class CompiledModel(object):
+    """Mixin of models declaring ``Meta.fields``, overriding dict methods
+    so that they see both slots and the overflow dict."""
+
+    __slots__ = ()
+
+    #: Names of declared fields.
+    _fields = ()
+
+    # (name, default) pairs of declared fields, and field mappers.
+    _field_defaults = ()
+    _field_map = ()
+
+    # Field name -> slot descriptor.
+    _slots = {}
+
+    # Does the class define (or inherit) an __init__ of its own?
+    _custom_init = False
+
+    def __getitem__(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            return super(CompiledModel, self).__getitem__(key)
+        try:
+            return slot.__get__(self, None)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        slot = self._slots.get(key)
+        if slot is None:
+            return super(CompiledModel, self).__setitem__(key, value)
+        if self._meta and self._meta.field_map:
+            value = self._map_field(key, value)
+        slot.__set__(self, self._convert_value(value))
+
+    def __delitem__(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            return super(CompiledModel, self).__delitem__(key)
+        try:
+            slot.__delete__(self)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __delattr__(self, key):
+        try:
+            del self[key]
+        except KeyError as excn:
+            raise AttributeError(excn)
+
+    def __contains__(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            return dict.__contains__(self, key)
+        try:
+            slot.__get__(self, None)
+        except AttributeError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return list(self.to_bson())
+
+    def values(self):
+        return list(self.to_bson().values())
+
+    def items(self):
+        return list(self.to_bson().items())
+
+    iterkeys = __iter__
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return self[key]
+
+    _marker = object()
+
+    def pop(self, key, default=_marker):
+        try:
+            value = self[key]
+        except KeyError:
+            if default is CompiledModel._marker:
+                raise
+            return default
+        del self[key]
+        return value
+
+    def update(self, *args, **kwargs):
+        for key, value in six.iteritems(dict(*args, **kwargs)):
+            self[key] = value
+
+    def clear(self):
+        for slot in six.itervalues(self._slots):
+            try:
+                slot.__delete__(self)
+            except AttributeError:
+                pass
+        dict.clear(self)
+
+    def _refill(self, document):
+        self.clear()
+        self.__init__(document)
+
+    def copy(self):
+        return _restore(type(self), self.to_bson())
+
+    __copy__ = copy
+
+    def __reduce__(self):
+        return _restore, (type(self), self.to_bson())
+
+    def __eq__(self, other):
+        if isinstance(other, CompiledModel):
+            other = other.to_bson()
+        return self.to_bson() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.to_bson())
+
+    # The generic versions of methods finish() generates for every class.
+
+    def __init__(self, initial=None, **kwargs):
+        type(self)._compiled_init(self, initial, **kwargs)
+
+    def to_bson(self):
+        """Returns the model as a plain dict, ready to be encoded."""
+        document = {}
+        for name, slot in six.iteritems(self._slots):
+            try:
+                document[name] = slot.__get__(self, None)
+            except AttributeError:
+                pass
+        document.update(dict.items(self))
+        return document
+
+    @classmethod
+    def from_bson(cls, document):
+        """Creates a model out of a decoded `document`, applying
+        defaults."""
+        return decoder(cls)(document)
+
+
+def _restore(cls, document):
+    # Copies and unpickled models get exactly the fields of the original:
+    # no defaults, and values are already mapped and converted.
+    self = cls.__new__(cls)
+    slots = cls._slots
+    for key, value in six.iteritems(document):
+        slot = slots.get(key)
+        if slot is None:
+            dict.__setitem__(self, key, value)
+        else:
+            slot.__set__(self, value)
+    return self
+
+
+def prepare(bases, attrs, fields):
+    """Adjusts `bases` and `attrs` of a model class about to be created,
+    which declares `fields` (or ``None``); returns them along with the
+    ``(name, default)`` pairs of all the fields, or ``None`` if neither
+    the class nor its bases declare any."""
+    inherited = []
+    for base in bases:
+        if isinstance(base, type) and issubclass(base, CompiledModel):
+            inherited = list(base._field_defaults)
+            break
+    if fields is None:
+        if not inherited:
+            return bases, attrs, None
+        fields = ()
+    pairs = normalize_fields(fields)
+    known = set(name for name, _ in inherited)
+    new = [(name, default) for name, default in pairs
+           if name not in known]
+    for name, _ in new:
+        if name in attrs or any(hasattr(base, name) for base in bases):
+            raise ValueError('Field %r would hide attribute %s of the '
+                             'model' % (name, name))
+    if not inherited:
+        # The mixin's __init__ would come first, and skip theirs.
+        for base in bases:
+            if isinstance(base, type) and _is_user_init(base.__init__):
+                raise TypeError(
+                    '%s.__init__ would be skipped: declare Meta.fields on '
+                    'a model defining __init__, not on one inheriting it'
+                    % (base.__name__, ))
+    attrs = dict(attrs)
+    attrs['__slots__'] = tuple(str(name) for name, _ in new)
+    if not inherited:
+        bases = (CompiledModel, ) + tuple(bases)
+    defaults = dict(inherited)
+    defaults.update(pairs)
+    all_pairs = inherited + new
+    return bases, attrs, [(name, defaults[name]) for name, _ in all_pairs]
+
+
+def projected_fields(cls, projection):
+    """Returns the names of fields of `cls` a query with `projection`
+    returns, or ``None`` if it returns all of them."""
+    if not projection:
+        return None
+    if isinstance(projection, dict):
+        included = [key for key, value in six.iteritems(projection)
+                    if value and not isinstance(value, dict) and
+                    key != '_id']
+        if included:
+            names = set(key.split('.')[0] for key in included)
+        else:
+            # Fields excluded as a whole; excluding subfields still
+            # returns the field.
+            names = set(cls._fields) - set(
+                key for key, value in six.iteritems(projection)
+                if not value and not isinstance(value, dict))
+    else:
+        names = set(key.split('.')[0] for key in projection)
+    names = frozenset(name for name in names if name in cls._slots)
+    if names == frozenset(cls._fields):
+        return None
+    return names
+
+
+# Decoders, by (class, projected fields).
+_decoders = {}
+
+
+def decoder(cls, projection=None):
+    """Returns the (cached) function creating instances of `cls` out of
+    documents returned by queries with `projection`: declared fields left
+    out by the projection are neither looked up nor defaulted."""
+    if cls._custom_init:
+        return cls
+    key = (cls, projected_fields(cls, projection))
+    decode = _decoders.get(key)
+    if decode is None:
+        decode = _decoders[key] = _generate(cls, key[1])['decode']
+    return decode
+
+
+_TEMPLATE = '''
+def _fill(self, document):
+%(body)s
+
+def decode(document):
+    self = new(cls)
+%(body)s
+    return self
+
+def __init__(self, initial=None, **kwargs):
+    _fill(self, initial or EMPTY)
+    for key, value in iteritems(kwargs):
+        self[key] = value
+
+@classmethod
+def from_bson(cls, document):
+    return decode(document)
+
+def to_bson(self):
+    document = {}
+%(to_bson)s
+    if dict.__len__(self):
+        document.update(dict.items(self))
+    return document
+'''
+
+_BODY = '''
+    if metrics.hot_path_enabled:
+        _fill_generic(self, document, fields)
+    else:
+        get = document.get
+        found = 0%(fields)s
+        if len(document) > found:
+            for key, value in iteritems(document):
+                if key not in fields:
+                    self[key] = value'''
+
+_FILL_FIELD = '''
+        value = get(%(name)r, MISSING)
+        if value is MISSING:
+            value = %(default)s
+        else:
+            found += 1
+        if value is not MISSING:%(map)s
+            if isinstance(value, dict):
+                value = AttrDict(value)
+            set_%(name)s(self, value)'''
+
+_MAP_FIELD = '''
+            if matcher_%(index)d(%(name)r, value):
+                new_value = mogrify_%(index)d(value)
+                if type(new_value) == type(value):
+                    raise Exception("Field mapper didn't change field type!")
+                value = new_value'''
+
+_TO_BSON_FIELD = '''
+    try:
+        document[%(name)r] = get_%(name)s(self, None)
+    except AttributeError:
+        pass'''
+
+
+def _fill_generic(self, document, fields):
+    # Goes through __setitem__, so that metrics see field mappers and
+    # conversions.
+    for name, default in self._field_defaults:
+        if name in fields and name not in document and \
+                default is not MISSING:
+            self[name] = _default(default)
+    for key, value in six.iteritems(document):
+        self[key] = value
+
+
+def _default(default):
+    if callable(default):
+        return default()
+    if isinstance(default, _IMMUTABLE):
+        return default
+    return copy.deepcopy(default)
+
+
+def _generate(cls, fields=None):
+    # Returns the namespace of functions generated for `cls`, decoding
+    # `fields` (all of them if None): every field is looked up, defaulted,
+    # mapped and converted in straight-line code, without going through
+    # __setitem__.
+    if fields is None:
+        fields = frozenset(cls._fields)
+    namespace = {
+        # Converts subdocuments; interning keys, if the model does.
+        'AttrDict': AttrDict if cls._keys is None else cls._keys.attrdict,
+        'EMPTY': {},
+        'MISSING': MISSING,
+        'cls': cls,
+        'fields': fields,
+        'iteritems': six.iteritems,
+        'metrics': metrics,
+        'new': dict.__new__,
+        '_default': _default,
+        '_fill_generic': _fill_generic,
+    }
+    for index, (matcher, mogrify) in enumerate(cls._field_map):
+        namespace['matcher_%d' % index] = matcher
+        namespace['mogrify_%d' % index] = mogrify
+
+    fill, to_bson = [], []
+    for index, (name, default) in enumerate(cls._field_defaults):
+        slot = cls._slots[name]
+        namespace['set_' + name] = slot.__set__
+        namespace['get_' + name] = slot.__get__
+        to_bson.append(_TO_BSON_FIELD % {'name': name})
+        if name not in fields:
+            continue
+        if default is MISSING:
+            default_code = 'MISSING'
+        else:
+            namespace['default_%d' % index] = default
+            if isinstance(default, _IMMUTABLE):
+                default_code = 'default_%d' % index
+            else:
+                default_code = '_default(default_%d)' % index
+        mapping = ''.join(_MAP_FIELD % {'index': position, 'name': name}
+                          for position in range(len(cls._field_map)))
+        fill.append(_FILL_FIELD % {'name': name, 'default': default_code,
+                                   'map': mapping})
+
+    body = _BODY % {'fields': ''.join(fill)}
+    source = _TEMPLATE % {'body': body, 'to_bson': ''.join(to_bson)}
+    code = compile(source, '<minimongo.compiled %s>' % cls.__name__, 'exec')
+    six.exec_(code, namespace)
+    namespace['__init__'].generated = True
+    return namespace
+
+
+def _is_user_init(init):
+    # Is `init` an __init__ defined by a model, rather than generated or
+    # inherited from AttrDict or the mixin?
+    init = getattr(init, '__func__', init)
+    return init not in (AttrDict.__dict__['__init__'],
+                        CompiledModel.__dict__['__init__'],
+                        object.__init__) and \
+        not getattr(init, 'generated', False)
+
+
+def finish(cls, pairs, field_map=()):
+    """Generates ``__init__``, ``from_bson`` and ``to_bson`` of a newly
+    created model class `cls`, which has `field_map`; an ``__init__``
+    the class defines or inherits from a compiled base is kept."""
+    cls._field_defaults = tuple(pairs)
+    cls._field_map = tuple(field_map)
+    cls._fields = tuple(name for name, _ in pairs)
+    cls._slots = dict((name, getattr(cls, name)) for name in cls._fields)
+
+    namespace = _generate(cls)
+    cls.to_bson = namespace['to_bson']
+    cls._compiled_init = namespace['__init__']
+    cls._custom_init = _is_user_init(cls.__init__)
+    if cls._custom_init:
+        # Cursors and from_bson() go through it as well.
+        _decoders[(cls, None)] = cls
+        cls.from_bson = CompiledModel.__dict__['from_bson']
+    else:
+        cls.__init__ = namespace['__init__']
+        cls.from_bson = namespace['from_bson']
+        _decoders[(cls, None)] = namespace['decode']
+    return cls
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.compression
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Transparent compression of large fields, declared with
+    ``Meta.compressed_fields``::
+
+        class Page(Model):
+            class Meta:
+                database = 'test'
+                compressed_fields = ('html', 'headers')
+                # Optional: 'zlib', 'lzma' or 'zstd' (the default when the
+                # zstandard package is installed, zlib otherwise).
+                compression = 'zlib'
+                compression_threshold = 1024
+
+    Text, bytes, lists and subdocuments stored in those fields are saved
+    as :class:`bson.Binary` values (of subtype :data:`SUBTYPE`) made of a
+    two byte header -- codec and kind of value -- and the compressed
+    data. Values smaller than ``compression_threshold`` bytes, or that
+    wouldn't get any smaller, are stored as they are.
+
+    Loaded models keep the compressed values until they're accessed, as
+    an item or attribute; only then are they decompressed, and replaced
+    with the result. ``get()``, ``items()``, ``values()`` and comparisons
+    see the :class:`bson.Binary` values of fields that weren't accessed
+    yet -- :func:`inflate` decompresses all of them. Fields which aren't
+    accessed are saved back without being compressed again.
+'''
+from __future__ import absolute_import
+
+import struct
+import zlib
+
+import six
+from bson import BSON, Binary
+
+try:
+    import lzma
+except ImportError:  # Python 2
+    lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+#: :class:`bson.Binary` subtype of compressed values, from the user
+#: defined range.
+SUBTYPE = 0x80
+
+# Header of compressed values: codec and kind of value.
+_HEADER = struct.Struct('BB')
+
+# Kinds of values.
+_BYTES, _TEXT, _DOCUMENT = range(3)
+
+# Codec name -> (identifier, compress, decompress); identifiers are
+# stored, so they must never change.
+_CODECS = {
+    'zlib': (1, zlib.compress, zlib.decompress),
+}
+if lzma is not None:
+    _CODECS['lzma'] = (2, lzma.compress, lzma.decompress)
+if zstandard is not None:
+    _CODECS['zstd'] = (3, zstandard.ZstdCompressor().compress,
+                       zstandard.ZstdDecompressor().decompress)
+_NAMES = {1: 'zlib', 2: 'lzma', 3: 'zstd'}
+_DECOMPRESS = dict((identifier, decompress)
+                   for identifier, _, decompress in _CODECS.values())
+
+#: Codec used unless ``Meta.compression`` says otherwise.
+DEFAULT_CODEC = 'zstd' if zstandard is not None else 'zlib'
+
+
+def is_compressed(value):
+    """Is `value` compressed by :class:`Compression`?"""
+    return type(value) is Binary and value.subtype == SUBTYPE
+
+
+def decompress(value):
+    """Returns the original of the compressed `value`."""
+    identifier, kind = _HEADER.unpack_from(value)
+    try:
+        raw = _DECOMPRESS[identifier](bytes(value[_HEADER.size:]))
+    except KeyError:
+        raise ValueError('Value compressed with %s, which is not available'
+                         % (_NAMES.get(identifier, identifier), ))
+    if kind == _TEXT:
+        return raw.decode('utf-8')
+    if kind == _DOCUMENT:
+        return BSON(raw).decode()['v']
+    return raw
+
+
+def inflate(model):
+    """Decompresses all the compressed values of `model` in place, and
+    returns it."""
+    for key, value in list(dict.items(model)):
+        if is_compressed(value):
+            model[key] = decompress(value)
+    return model
+
+
+class Compression(object):
+    """Compresses `fields` of documents with `codec`, if they're at least
+    `threshold` bytes long.
+
+    >>> compression = Compression(['body'], 'zlib', threshold=10)
+    >>> body = u'spam' * 100
+    >>> stored = compression.encode({'body': body, 'x': 1})
+    >>> len(stored['body']) < len(body), decompress(stored['body']) == body
+    (True, True)
+    """
+
+    def __init__(self, fields, codec=None, threshold=1024):
+        codec = codec or DEFAULT_CODEC
+        if codec not in _CODECS:
+            raise ValueError('Unknown or unavailable compression codec %r'
+                             % (codec, ))
+        self.fields = tuple(fields)
+        self.codec = codec
+        self.threshold = threshold
+        identifier, self._compress, _ = _CODECS[codec]
+        self._headers = dict((kind, _HEADER.pack(identifier, kind))
+                             for kind in (_BYTES, _TEXT, _DOCUMENT))
+
+    def compress(self, value):
+        """Returns `value` compressed, or as it is if it's too small,
+        compressed already or of a type which isn't compressed."""
+        if isinstance(value, six.text_type):
+            kind, raw = _TEXT, value.encode('utf-8')
+        elif isinstance(value, bytes) and type(value) is not Binary:
+            kind, raw = _BYTES, value
+        elif isinstance(value, (dict, list, tuple)):
+            kind, raw = _DOCUMENT, BSON.encode({'v': value})
+        else:
+            return value
+        if len(raw) < self.threshold:
+            return value
+        data = self._headers[kind] + self._compress(raw)
+        if len(data) >= len(raw):
+            return value
+        return Binary(data, SUBTYPE)
+
+    def _compressed(self, fields):
+        # Compressed values of `fields`, by name. Looked up in the dict
+        # itself, not to decompress values models hold.
+        compressed = {}
+        for name in self.fields:
+            value = dict.get(fields, name)
+            if value is not None and not is_compressed(value):
+                stored = self.compress(value)
+                if stored is not value:
+                    compressed[name] = stored
+        return compressed
+
+    def encode(self, document):
+        """Returns `document` with compressed fields, a copy if any of
+        them had to be compressed."""
+        compressed = self._compressed(document)
+        if not compressed:
+            return document
+        encoded = dict(document.items())
+        encoded.update(compressed)
+        return encoded
+
+    def update(self, document):
+        """Compresses fields of an update `document`: either those set
+        with ``$set`` or ``$setOnInsert``, or a whole replacement
+        document."""
+        if not any(key.startswith('$') for key in document):
+            return self.encode(document)
+        update = dict(document)
+        for operator in ('$set', '$setOnInsert'):
+            if operator in update:
+                update[operator] = self.encode(update[operator])
+        return update
+
+
+class CompressedModel(object):
+    """Mixin of models declaring ``Meta.compressed_fields``, decompressing
+    values as they're accessed."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        value = super(CompressedModel, self).__getitem__(key)
+        if type(value) is Binary and value.subtype == SUBTYPE:
+            value = self._inflate(key, value)
+        return value
+
+    def __getattr__(self, attr):
+        value = super(CompressedModel, self).__getattr__(attr)
+        if type(value) is Binary and value.subtype == SUBTYPE:
+            value = self._inflate(attr, value)
+        return value
+
+    def _inflate(self, key, value):
+        # Goes through __setitem__, so field_map and AttrDict conversion
+        # apply to the original value.
+        self[key] = decompress(value)
+        return dict.__getitem__(self, key)
+
+
+def prepare(bases, compressed_fields, fields):
+    """Returns `bases` of a model class about to be created, declaring
+    `compressed_fields`, with :class:`CompressedModel` mixed in; `fields`
+    are the ``(name, default)`` pairs of its ``Meta.fields``, if any."""
+    if not compressed_fields:
+        return bases
+    slotted = set(compressed_fields) & set(name for name, _ in fields or ())
+    if slotted:
+        # Slots are read without going through __getitem__.
+        raise ValueError('Compressed fields %s cannot be declared in '
+                         'Meta.fields' % (sorted(slotted), ))
+    for base in bases:
+        if isinstance(base, type) and issubclass(base, CompressedModel):
+            return bases
+    return (CompressedModel, ) + tuple(bases)
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 
+import six
+
+
 class Index(object):
     """A simple wrapper for arguments to
     :meth:`pymongo.collection.Collection.ensure_index`."""
@@ -18,8 +21,64 @@ class Index(object):
         """
         return self.__dict__ == other.__dict__
 
+    def __repr__(self):
+        return 'Index(%s)' % ', '.join(
+            [repr(arg) for arg in self._args] +
+            ['%s=%r' % item for item in sorted(self._kwargs.items())])
+
+    @property
+    def keys(self):
+        """A list of ``(key, direction)`` pairs the index is built on.
+
+        >>> Index('foo').keys
+        [('foo', 1)]
+        >>> Index([('foo', 1), ('bar', -1)]).keys
+        [('foo', 1), ('bar', -1)]
+        """
+        key_or_list = self._args[0] if self._args else \
+            self._kwargs.get('key_or_list')
+        if isinstance(key_or_list, six.string_types):
+            return [(key_or_list, 1)]
+        return [tuple(pair) for pair in key_or_list]
+
+    @property
+    def name(self):
+        """The name MongoDB will give to the index, either the one
+        passed explicitly or the one generated by :mod:`pymongo`.
+
+        >>> Index([('foo', 1), ('bar', -1)]).name
+        'foo_1_bar_-1'
+        """
+        if 'name' in self._kwargs:
+            return self._kwargs['name']
+        return '_'.join('%s_%s' % pair for pair in self.keys)
+
+    @property
+    def options(self):
+        """Keyword arguments passed to the index, apart from its name."""
+        return dict((key, value) for key, value in self._kwargs.items()
+                    if key not in ('name', 'key_or_list', 'cache_for'))
+
+    def aliased(self, aliases):
+        """Returns the index on keys the fields are stored under, given
+        :class:`~minimongo.aliases.Aliases`.
+
+        >>> from minimongo.aliases import Aliases
+        >>> Index([('foo', 1), ('bar', -1)]).aliased(Aliases({'foo': 'f'}))
+        Index([('f', 1), ('bar', -1)])
+        """
+        args, kwargs = list(self._args), dict(self._kwargs)
+        if args:
+            args[0] = aliases.sort(args[0])
+        else:
+            kwargs['key_or_list'] = aliases.sort(kwargs['key_or_list'])
+        return Index(*args, **kwargs)
+
     def ensure(self, collection):
         """Calls :meth:`pymongo.collection.Collection.ensure_index`
-        on the given `collection` with the stored arguments.
+        on the given `collection` with the stored arguments, translating
+        field names if the collection has ``aliases``.
         """
-        return collection.ensure_index(*self._args, **self._kwargs)
+        aliases = getattr(collection, 'aliases', None)
+        index = self if aliases is None else self.aliased(aliases)
+        return collection.ensure_index(*index._args, **index._kwargs)
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.index_usage
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Reports on how the indices declared in ``Meta.indices`` are actually
+    used, based on the ``$indexStats`` aggregation stage (MongoDB 3.2+).
+
+    Every index slows down every write, so the report lists indices
+    which weren't used by any query during the observation window, and
+    indices which are redundant prefixes of other indices, together with
+    a rough estimate of the write cost their removal would save.
+
+    The module can be run from CI or cron::
+
+        python -m minimongo.index_usage myapp.models --window-days 14
+
+    and exits with a non-zero status when ``--fail-on-findings`` is given
+    and something worth dropping was found.
+'''
+from __future__ import absolute_import, print_function
+
+import argparse
+import datetime
+import importlib
+import json
+import sys
+
+import six
+from pymongo.collection import Collection as PyMongoCollection
+
+from .model import Model
+
+#: Default observation window -- indices with no accesses recorded over
+#: this period are reported as unused.
+DEFAULT_WINDOW = datetime.timedelta(days=7)
+
+# Index options which make an index semantically different from a plain
+# one, so it can't be dropped just because it prefixes another index.
+_SPECIAL_OPTIONS = ('unique', 'sparse', 'partialFilterExpression',
+                    'expireAfterSeconds', 'collation')
+
+
+def collect_index_stats(model):
+    """Returns the ``$indexStats`` output for the collection of a given
+    `model`, as a list of :class:`dict`.
+    """
+    # Collection.aggregate() refuses pipelines with Meta.aliases.
+    result = PyMongoCollection.aggregate(model.collection,
+                                         [{'$indexStats': {}}])
+    if isinstance(result, dict):
+        # pymongo < 3.0 returns the whole command response.
+        result = result['result']
+    return list(result)
+
+
+def _is_prefix(keys, other_keys):
+    return len(keys) <= len(other_keys) and \
+        list(keys) == list(other_keys[:len(keys)])
+
+
+def analyze_indices(declared, stats, window=DEFAULT_WINDOW, now=None):
+    """Joins declared :class:`~minimongo.Index` instances with
+    ``$indexStats`` entries and returns a report :class:`dict`.
+
+    Each entry of ``report['indices']`` describes a single index, as seen
+    either in the declarations or on the server; ``report['unused']`` and
+    ``report['redundant']`` hold names of the indices that can be dropped,
+    and ``report['estimated_write_saving']`` is the fraction of per-write
+    index maintenance work removing them would save, assuming every
+    index (including ``_id``) costs about as much as the document write
+    itself.
+    """
+    now = now or datetime.datetime.utcnow()
+    declared = dict((index.name, index) for index in declared)
+
+    indices = {}
+    for entry in stats:
+        name = entry['name']
+        accesses = entry.get('accesses', {})
+        spec = entry.get('spec', {})
+        keys = list(entry.get('key', {}).items())
+        indices[name] = {
+            'name': name,
+            'keys': keys,
+            'options': dict((option, spec[option])
+                            for option in _SPECIAL_OPTIONS if option in spec),
+            'declared': name in declared,
+            'exists': True,
+            'ops': accesses.get('ops', 0),
+            'since': accesses.get('since'),
+        }
+
+    for name, index in six.iteritems(declared):
+        if name in indices:
+            # Declaration is the source of truth for key order, since
+            # the server's key document may come back as a plain dict.
+            indices[name]['keys'] = index.keys
+            indices[name]['options'].update(
+                (option, value) for option, value in index.options.items()
+                if option in _SPECIAL_OPTIONS)
+        else:
+            indices[name] = {
+                'name': name,
+                'keys': index.keys,
+                'options': dict((option, value) for option, value
+                                in index.options.items()
+                                if option in _SPECIAL_OPTIONS),
+                'declared': True,
+                'exists': False,
+                'ops': None,
+                'since': None,
+            }
+
+    unused, redundant = [], []
+    for name, info in sorted(indices.items()):
+        info['unused'] = info['redundant_with'] = None
+        if name == '_id_' or not info['exists']:
+            continue
+
+        observed = info['since'] is not None and now - info['since'] >= window
+        info['unused'] = bool(observed and not info['ops'])
+        if info['unused']:
+            unused.append(name)
+
+        if info['options']:
+            continue
+        for other_name, other in sorted(indices.items()):
+            if other_name == name or not other['exists']:
+                continue
+            if other['options'].get('sparse') or \
+                    'partialFilterExpression' in other['options']:
+                continue
+            # For exact duplicates only report the one sorting last, so
+            # that the other one is kept.
+            if other['keys'] == info['keys'] and other_name > name:
+                continue
+            if _is_prefix(info['keys'], other['keys']):
+                info['redundant_with'] = other_name
+                if name not in unused:
+                    redundant.append(name)
+                break
+
+    existing = sum(1 for info in indices.values() if info['exists'])
+    droppable = len(unused) + len(redundant)
+    return {
+        'indices': [indices[name] for name in sorted(indices)],
+        'unused': unused,
+        'redundant': redundant,
+        'undeclared': sorted(name for name, info in indices.items()
+                             if name != '_id_' and not info['declared']),
+        'missing': sorted(name for name, info in indices.items()
+                          if not info['exists']),
+        'window_seconds': int(_total_seconds(window)),
+        'estimated_write_saving': (
+            float(droppable) / (1 + existing) if existing else 0.0),
+    }
+
+
+def _total_seconds(delta):
+    return delta.days * 86400 + delta.seconds + delta.microseconds / 1e6
+
+
+def model_report(model, window=DEFAULT_WINDOW, now=None):
+    """Collects index statistics for a single `model` and analyzes them
+    against its ``Meta.indices``."""
+    declared = model._meta.indices
+    aliases = getattr(model.collection, 'aliases', None)
+    if aliases is not None:
+        # Server side indices are on stored keys.
+        declared = [index.aliased(aliases) for index in declared]
+    report = analyze_indices(declared, collect_index_stats(model),
+                             window=window, now=now)
+    report['model'] = model.__name__
+    report['database'] = model._meta.database
+    report['collection'] = model._meta.collection
+    return report
+
+
+def find_models(module):
+    """Returns all concrete (non-interface) models defined in `module`."""
+    return [value for value in vars(module).values()
+            if isinstance(value, type) and issubclass(value, Model) and
+            value is not Model and value._meta is not None and
+            value.__module__ == module.__name__]
+
+
+def format_report(reports):
+    """Renders a list of reports as human readable text."""
+    lines = []
+    for report in reports:
+        lines.append('%(model)s (%(database)s.%(collection)s)' % report)
+        for info in report['indices']:
+            if not info['exists']:
+                status = 'MISSING'
+            elif info['unused']:
+                status = 'UNUSED'
+            elif info['redundant_with']:
+                status = 'REDUNDANT (prefix of %s)' % info['redundant_with']
+            else:
+                status = 'ok'
+            if not info['declared'] and info['name'] != '_id_':
+                status += ', undeclared'
+            lines.append('  %-40s ops=%-10s %s' % (
+                info['name'],
+                '-' if info['ops'] is None else info['ops'], status))
+        if report['unused'] or report['redundant']:
+            lines.append('  dropping %d index(es) would save ~%.0f%% of '
+                         'index maintenance per write' % (
+                             len(report['unused']) + len(report['redundant']),
+                             report['estimated_write_saving'] * 100))
+    return '\n'.join(lines)
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m minimongo.index_usage',
+        description='Report unused and redundant indices of minimongo '
+                    'models.')
+    parser.add_argument('modules', nargs='+',
+                        help='dotted names of modules defining models')
+    parser.add_argument('--window-days', type=float, default=7,
+                        help='observation window, in days (default: 7)')
+    parser.add_argument('--json', action='store_true',
+                        help='output machine readable JSON')
+    parser.add_argument('--fail-on-findings', action='store_true',
+                        help='exit with status 1 if anything can be dropped')
+    args = parser.parse_args(argv)
+
+    window = datetime.timedelta(days=args.window_days)
+    reports = []
+    for name in args.modules:
+        for model in find_models(importlib.import_module(name)):
+            reports.append(model_report(model, window=window))
+
+    if args.json:
+        print(json.dumps(reports, indent=2, default=_json_default))
+    else:
+        print(format_report(reports))
+
+    findings = any(report['unused'] or report['redundant']
+                   for report in reports)
+    return 1 if args.fail_on_findings and findings else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.interning
+    ~~~~~~~~~~~~~~~~~~~
+
+    Key interning, turned on with ``Meta.intern_keys``::
+
+        class Event(Model):
+            class Meta:
+                database = 'test'
+                intern_keys = True  # Or the size of the table.
+
+    Documents decoded from BSON come with their own copy of every key,
+    which models keep. Models interning keys look them up in a
+    :class:`KeyTable` of their own instead, so that all of them (and
+    their subdocuments) share a single copy of each key. The table is
+    bounded, unlike :func:`sys.intern`: once it's full, new keys -- user
+    generated ones, say -- are used as they are.
+'''
+from __future__ import absolute_import
+
+import six
+
+from .attrdict import AttrDict
+
+#: Size of the table of models declaring ``intern_keys = True``.
+DEFAULT_SIZE = 1024
+
+
+class KeyTable(object):
+    """Keeps the first `size` distinct keys it's given, and replaces keys
+    equal to those with the ones it keeps.
+
+    >>> table = KeyTable(1)
+    >>> key = ''.join(['na', 'me'])
+    >>> table.intern(key) is key
+    True
+    >>> table.intern(''.join(['na', 'me'])) is key
+    True
+    >>> other = ''.join(['ot', 'her'])
+    >>> table.intern(other) is other, len(table)
+    (True, 1)
+    """
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def intern(self, key):
+        """Returns the key kept equal to `key`, or `key` itself."""
+        keys = self._keys
+        interned = keys.get(key)
+        if interned is not None:
+            return interned
+        if len(keys) < self.size:
+            keys[key] = key
+        return key
+
+    def attrdict(self, document):
+        """Converts `document` and its subdocuments into
+        :class:`~minimongo.AttrDict` instances, with interned keys."""
+        intern = self.intern
+        result = AttrDict()
+        for key, value in six.iteritems(document):
+            if isinstance(value, dict):
+                value = self.attrdict(value)
+            dict.__setitem__(result, intern(key), value)
+        return result
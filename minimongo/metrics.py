@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.metrics
+    ~~~~~~~~~~~~~~~~~
+
+    Per-model, per-operation latency histograms and document / byte
+    counters for :class:`~minimongo.Collection` and its cursors.
+
+    Instrumentation is off by default and costs a single attribute check
+    per operation in that state::
+
+        from minimongo import metrics
+
+        metrics.enable()
+        ...
+        print(metrics.registry.to_prometheus())
+
+    ``metrics.enable(hot_path=True)`` additionally counts the work done in
+    minimongo's own per-document Python code: nested dicts converted to
+    :class:`~minimongo.AttrDict` (``convert`` operation and the
+    ``dicts_converted`` counter) and ``Meta.field_map`` matchers evaluated
+    and fired (``field_map`` operation and counters of the same names).
+    Document wrapping is always reported as the ``wrap`` operation. Cursors
+    report the round trip running their query (and fetching the first
+    batch) as ``find``, and every later one as ``batch``.
+'''
+from __future__ import absolute_import
+
+import threading
+import time
+
+#: Is instrumentation turned on? Checked on every instrumented call,
+#: use :func:`enable` and :func:`disable` to change it.
+enabled = False
+
+#: Are hot path counters on? Checked by :class:`~minimongo.AttrDict` and
+#: :class:`~minimongo.Model` on every nested dict / ``field_map`` lookup.
+hot_path_enabled = False
+
+# Class of the outermost dict being converted by the current thread, so
+# that nested conversions are attributed to it.
+_conversion = threading.local()
+
+# Model whose operation the current thread is running, see `attributed`.
+_operation = threading.local()
+
+#: Should document sizes be measured? This requires re-encoding every
+#: document read or written, so it's way more expensive than timing.
+measure_bytes = False
+
+clock = getattr(time, 'perf_counter', time.time)
+
+# Upper bounds (in seconds) of Prometheus histogram buckets.
+PROMETHEUS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                      0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(object):
+    """A log-linear histogram of integer values, in the spirit of
+    HdrHistogram: values are split into power-of-two ranges, each of
+    which has ``2 ** (precision - 1)`` linear sub-buckets, so the relative
+    error of any recorded value stays below ``2 ** (1 - precision)``
+    regardless of its magnitude. Buckets are allocated lazily.
+
+    >>> h = Histogram()
+    >>> for value in range(1, 101):
+    ...     h.record(value)
+    >>> h.count, h.min, h.max
+    (100, 1, 100)
+    >>> h.percentile(50)
+    51
+    """
+
+    def __init__(self, precision=5):
+        self.precision = precision
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        shift = value.bit_length() - self.precision
+        if shift <= 0:
+            return value
+        return (shift << (self.precision - 1)) + (value >> shift)
+
+    def _bounds(self, index):
+        """Returns the lowest and highest value of a bucket."""
+        if index < (1 << self.precision):
+            return index, index
+        shift = (index >> (self.precision - 1)) - 1
+        mantissa = index - (shift << (self.precision - 1))
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, value):
+        value = int(value)
+        index = self._index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Returns the (upper bound of the bucket holding the) value below
+        which `percent` of recorded values fall."""
+        if not self.count:
+            return None
+        threshold = self.count * percent / 100.0
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= threshold:
+                return min(self._bounds(index)[1], self.max)
+        return self.max
+
+    def cumulative(self, bounds):
+        """Returns the number of recorded values lower or equal to each
+        of the given (increasing) `bounds`."""
+        counts = []
+        items = sorted((self._bounds(index)[1], count)
+                       for index, count in self.buckets.items())
+        seen = position = 0
+        for bound in bounds:
+            while position < len(items) and items[position][0] <= bound:
+                seen += items[position][1]
+                position += 1
+            counts.append(seen)
+        return counts
+
+
+class OperationStats(object):
+    """Statistics for a single (model, operation) pair. Latencies are
+    stored in microseconds."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.documents = 0
+        self.bytes = 0
+
+    def as_dict(self):
+        latency = self.latency
+        return {
+            'count': latency.count,
+            'total_seconds': latency.total / 1e6,
+            'min_seconds': _seconds(latency.min),
+            'max_seconds': _seconds(latency.max),
+            'p50_seconds': _seconds(latency.percentile(50)),
+            'p90_seconds': _seconds(latency.percentile(90)),
+            'p99_seconds': _seconds(latency.percentile(99)),
+            'documents': self.documents,
+            'bytes': self.bytes,
+        }
+
+
+def _seconds(microseconds):
+    return None if microseconds is None else microseconds / 1e6
+
+
+class Registry(object):
+    """Holds :class:`OperationStats` for every model and operation."""
+
+    def __init__(self):
+        self._stats = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, model, operation, seconds, documents=0, nbytes=0):
+        """Records a single `operation`; `model` is either a model class or
+        a name to report the operation under."""
+        key = (getattr(model, '__name__', model), operation)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = OperationStats()
+            stats.latency.record(seconds * 1e6)
+            stats.documents += documents
+            stats.bytes += nbytes
+
+    def increment(self, model, counter, amount=1):
+        key = (getattr(model, '__name__', model), counter)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._counters.clear()
+
+    def get(self, model_name, operation):
+        """Returns :class:`OperationStats` for the given pair, if any."""
+        return self._stats.get((model_name, operation))
+
+    def as_dict(self):
+        """Returns collected stats as ``{model: {operation: stats}}``."""
+        result = {}
+        with self._lock:
+            for (model, operation), stats in sorted(self._stats.items()):
+                result.setdefault(model, {})[operation] = stats.as_dict()
+        return result
+
+    def counters(self):
+        """Returns collected counters as ``{model: {counter: value}}``."""
+        result = {}
+        with self._lock:
+            for (model, counter), value in sorted(self._counters.items()):
+                result.setdefault(model, {})[counter] = value
+        return result
+
+    def to_prometheus(self, prefix='minimongo'):
+        """Renders collected stats in Prometheus text exposition format."""
+        name = prefix + '_operation_duration_seconds'
+        lines = [
+            '# HELP %s Latency of minimongo operations.' % name,
+            '# TYPE %s histogram' % name,
+        ]
+        documents, nbytes = [], []
+        bounds = [int(bound * 1e6) for bound in PROMETHEUS_BUCKETS]
+        with self._lock:
+            for (model, operation), stats in sorted(self._stats.items()):
+                labels = 'model="%s",operation="%s"' % (model, operation)
+                counts = stats.latency.cumulative(bounds)
+                for bound, count in zip(PROMETHEUS_BUCKETS, counts):
+                    lines.append('%s_bucket{%s,le="%r"} %d' % (
+                        name, labels, bound, count))
+                lines.append('%s_bucket{%s,le="+Inf"} %d' % (
+                    name, labels, stats.latency.count))
+                lines.append('%s_sum{%s} %r' % (
+                    name, labels, stats.latency.total / 1e6))
+                lines.append('%s_count{%s} %d' % (
+                    name, labels, stats.latency.count))
+                documents.append('%s_documents_total{%s} %d' % (
+                    prefix, labels, stats.documents))
+                nbytes.append('%s_bytes_total{%s} %d' % (
+                    prefix, labels, stats.bytes))
+
+        lines.append('# HELP %s_documents_total Documents processed by '
+                     'minimongo operations.' % prefix)
+        lines.append('# TYPE %s_documents_total counter' % prefix)
+        lines.extend(documents)
+        lines.append('# HELP %s_bytes_total BSON bytes processed by '
+                     'minimongo operations.' % prefix)
+        lines.append('# TYPE %s_bytes_total counter' % prefix)
+        lines.extend(nbytes)
+
+        if self._counters:
+            lines.append('# HELP %s_hot_path_total Work done in minimongo\'s '
+                         'per-document code paths.' % prefix)
+            lines.append('# TYPE %s_hot_path_total counter' % prefix)
+            with self._lock:
+                for (model, counter), value in sorted(self._counters.items()):
+                    lines.append('%s_hot_path_total{model="%s",counter="%s"} '
+                                 '%d' % (prefix, model, counter, value))
+        return '\n'.join(lines) + '\n'
+
+
+#: The global registry all instrumented operations report to.
+registry = Registry()
+
+
+def enable(sizes=False, hot_path=False):
+    """Turns instrumentation on; if `sizes` is ``True``, BSON sizes of
+    documents are measured as well, if `hot_path` is ``True``, so are
+    dict conversions and ``field_map`` evaluations."""
+    global enabled, measure_bytes, hot_path_enabled
+    measure_bytes = sizes
+    hot_path_enabled = hot_path
+    enabled = True
+
+
+def disable():
+    """Turns instrumentation off, keeping whatever was collected."""
+    global enabled, hot_path_enabled
+    enabled = hot_path_enabled = False
+
+
+def document_size(document):
+    """Returns BSON size of a `document` if byte measurement is on."""
+    if not measure_bytes or document is None:
+        return 0
+    from bson import BSON
+    return len(BSON.encode(document))
+
+
+def record(model, operation, start, documents=0, nbytes=0):
+    """Records an `operation` on `model`, started at `start` (as returned
+    by :func:`clock`) into the global :data:`registry`."""
+    registry.record(model, operation, clock() - start, documents, nbytes)
+
+
+def convert(owner, factory, value):
+    """Converts a nested dict `value` with `factory`, counting it against
+    the class of the outermost dict being converted (`owner`, unless this
+    is a nested conversion)."""
+    outermost = getattr(_conversion, 'owner', None)
+    if outermost is not None:
+        registry.increment(outermost, 'dicts_converted')
+        return factory(value)
+
+    _conversion.owner = owner
+    start = clock()
+    try:
+        return factory(value)
+    finally:
+        _conversion.owner = None
+        registry.increment(owner, 'dicts_converted')
+        record(owner, 'convert', start, documents=1)
+
+
+def record_field_map(model, start, evaluated, fired):
+    """Records a single pass over `model`'s ``Meta.field_map``."""
+    registry.increment(model, 'field_map_evaluated', evaluated)
+    if fired:
+        registry.increment(model, 'field_map_fired', fired)
+    record(model, 'field_map', start)
+
+
+class attributed(object):
+    """Context manager marking `model` as the one the current thread
+    runs an operation for, so that events reported by pymongo (see
+    :mod:`minimongo.monitoring`) can be attributed to it."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def __enter__(self):
+        self.previous = getattr(_operation, 'model', None)
+        _operation.model = self.model
+
+    def __exit__(self, *exc_info):
+        _operation.model = self.previous
+
+
+def current_model():
+    """Returns the model the current thread runs an operation for."""
+    return getattr(_operation, 'model', None)
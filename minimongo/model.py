@@ -3,16 +3,24 @@ from __future__ import absolute_import
 
 import copy
 import re
+import sys
+import types
 
 import six
 from bson import DBRef, ObjectId
 from pymongo import MongoClient as Connection
 
+from . import compiled, compression, interning, metrics, monitoring, tracing
+from .attrdict import AttrDict
 from .collection import DummyCollection
 from .exceptions import DoesNotExist
 from .options import _Options
 
 
+# Shape of the queries, which look documents up by their ``_id``.
+ID_QUERY = {'_id': 1}
+
+
 class ModelBase(type):
     """Metaclass for all models.
 
@@ -24,6 +32,16 @@ class ModelBase(type):
     _connections = {}
 
     def __new__(mcs, name, bases, attrs):
+        # Models declaring Meta.fields (or inheriting them) store them in
+        # __slots__, which have to be there by the time the class is
+        # created.
+        bases, attrs, fields = compiled.prepare(
+            bases, attrs, getattr(attrs.get('Meta'), 'fields', None))
+        # Values of compressed fields are decompressed on access.
+        bases = compression.prepare(
+            bases, getattr(attrs.get('Meta'), 'compressed_fields', None),
+            fields)
+
         new_class = super(ModelBase,
                           mcs).__new__(mcs, name, bases, attrs)
         parents = [b for b in bases if isinstance(b, ModelBase)]
@@ -42,6 +60,14 @@ class ModelBase(type):
 
         options = _Options(meta)
         options.collection = options.collection or to_underscore(name)
+        # Every model has a table of its own, if any.
+        new_class._keys = None
+        if options.intern_keys:
+            new_class._keys = interning.KeyTable(
+                interning.DEFAULT_SIZE if options.intern_keys is True
+                else options.intern_keys)
+        if fields is not None:
+            compiled.finish(new_class, fields, options.field_map)
 
         if options.interface:
             new_class._meta = None
@@ -65,11 +91,18 @@ class ModelBase(type):
             # mongodb at this time but we want to create :class:`Model`.
             # False option doesn't work with pymongo 2.4 using master/slave
             # cluster
-            connection = Connection(*hostport)
+            # Listeners attribute pymongo's command and pool events to
+            # models if metrics are enabled, see minimongo.monitoring.
+            listeners = monitoring.listeners()
+            if listeners:
+                connection = Connection(*hostport, event_listeners=listeners)
+            else:
+                connection = Connection(*hostport)
             mcs._connections[hostport] = connection
 
         new_class._meta = options
         new_class.connection = connection
+        monitoring.register(new_class)
         new_class.database = connection[options.database]
         if options.username and options.password:
             new_class.database.authenticate(options.username, options.password)
@@ -99,55 +132,6 @@ class ModelBase(type):
             index.ensure(mcs.collection)
 
 
-class AttrDict(dict):
-    def __init__(self, initial=None, **kwargs):
-        # Make sure that during initialization, that we recursively apply
-        # AttrDict.  Maybe this could be better done with the builtin
-        # defaultdict?
-        if initial:
-            for key, value in six.iteritems(initial):
-                # Can't just say self[k] = v here b/c of recursion.
-                self.__setitem__(key, value)
-
-        # Process the other arguments (assume they are also default values).
-        # This is the same behavior as the regular dict constructor.
-        for key, value in six.iteritems(kwargs):
-            self.__setitem__(key, value)
-
-        super(AttrDict, self).__init__()
-
-    # These lines make this object behave both like a dict (x['y']) and like
-    # an object (x.y).  We have to translate from KeyError to AttributeError
-    # since model.undefined raises a KeyError and model['undefined'] raises
-    # a KeyError.  we don't ever want __getattr__ to raise a KeyError, so we
-    # 'translate' them below:
-    def __getattr__(self, attr):
-        try:
-            return super(AttrDict, self).__getitem__(attr)
-        except KeyError as excn:
-            raise AttributeError(excn)
-
-    def __setattr__(self, attr, value):
-        try:
-            # Okay to set directly here, because we're not recursing.
-            self[attr] = value
-        except KeyError as excn:
-            raise AttributeError(excn)
-
-    def __delattr__(self, key):
-        try:
-            return super(AttrDict, self).__delitem__(key)
-        except KeyError as excn:
-            raise AttributeError(excn)
-
-    def __setitem__(self, key, value):
-        # Coerce all nested dict-valued fields into AttrDicts
-        new_value = value
-        if isinstance(value, dict):
-            new_value = AttrDict(value)
-        return super(AttrDict, self).__setitem__(key, new_value)
-
-
 @six.python_2_unicode_compatible
 @six.add_metaclass(ModelBase)
 class Model(AttrDict):
@@ -174,21 +158,46 @@ class Model(AttrDict):
                            super(Model, self).__str__())
 
     def __setitem__(self, key, value):
+        if self._meta and self._meta.field_map:
+            value = self._map_field(key, value)
+        super(Model, self).__setitem__(key, value)
+
+    def _map_field(self, key, value):
         # Go through the defined list of field mappers.  If the fild
         # matches, then modify the field value by calling the function in
         # the mapper.  Mapped fields must have a different type than their
         # counterpart, otherwise they'll be mapped more than once as they
         # come back in from a find() or find_one() call.
-        if self._meta and self._meta.field_map:
-            for matcher, mogrify in self._meta.field_map:
-                if matcher(key, value):
-                    new_value = mogrify(value)
-                    if type(new_value) == type(value):
-                        raise Exception(
-                            "Field mapper didn't change field type!")
-                    value = new_value
-
-        super(Model, self).__setitem__(key, value)
+        start = metrics.clock() if metrics.hot_path_enabled else None
+        fired = 0
+        for matcher, mogrify in self._meta.field_map:
+            if matcher(key, value):
+                fired += 1
+                new_value = mogrify(value)
+                if type(new_value) == type(value):
+                    raise Exception(
+                        "Field mapper didn't change field type!")
+                value = new_value
+        if start is not None:
+            metrics.record_field_map(type(self), start,
+                                     len(self._meta.field_map), fired)
+        return value
+
+    def _refill(self, document):
+        cls = type(self)
+        if self._meta.field_map or metrics.hot_path_enabled or \
+                self._keys is not None or \
+                cls.__setitem__ is not Model.__setitem__ or \
+                cls.__init__ is not AttrDict.__init__:
+            return super(Model, self)._refill(document)
+
+        # Nothing but nested dicts to convert, so skip __setitem__ for
+        # every other field.
+        dict.clear(self)
+        dict.update(self, document)
+        for key, value in six.iteritems(document):
+            if isinstance(value, dict):
+                dict.__setitem__(self, key, AttrDict(value))
 
     def dbref(self, with_database=True, **kwargs):
         """Returns a DBRef for the current object.
@@ -205,10 +214,12 @@ class Model(AttrDict):
         database = self._meta.database if with_database else None
         return DBRef(self._meta.collection, self._id, database, **kwargs)
 
+    @tracing.traced('remove', query=ID_QUERY, returns_document=False)
     def remove(self):
         """Remove this object from the database."""
         return self.collection.remove(self._id)
 
+    @tracing.traced('mongo_update', query=ID_QUERY, returns_document=False)
     def mongo_update(self, values=None, **kwargs):
         """Update database data with object data."""
         # Allow to update external values as well as the model itself
@@ -221,11 +232,13 @@ class Model(AttrDict):
 
         return self
 
+    @tracing.traced('save', returns_document=False)
     def save(self, *args, **kwargs):
         """Save this object to it's mongo collection."""
         self.collection.save(self, *args, **kwargs)
         return self
 
+    @tracing.traced('load', query=ID_QUERY)
     def load(self, fields=None, **kwargs):
         """Allow partial loading of a document.
         :attr:fields is a dictionary as per the pymongo specs
@@ -240,6 +253,7 @@ class Model(AttrDict):
         return self
 
     @classmethod
+    @tracing.traced('get', query=lambda cls, **kwargs: kwargs)
     def get(cls, **kwargs):
         """
         Return a single instance of the Model.
@@ -263,3 +277,40 @@ def to_underscore(string):
     new_string = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1_\2', string)
     new_string = re.sub(r'([a-z\d])([A-Z])', r'\1_\2', new_string)
     return new_string.lower()
+
+
+def deep_sizeof(obj):
+    """Estimates the number of bytes taken by `obj` and everything it
+    references: keys and values of dicts, items of lists, tuples and sets,
+    and instance attributes (both ``__dict__`` and ``__slots__``). Every
+    object is counted once, even if it's referenced more than once; classes,
+    functions and modules are never counted.
+
+    >>> deep_sizeof({'foo': 'bar'}) > sys.getsizeof({'foo': 'bar'})
+    True
+    """
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(
+                current, (type, types.FunctionType, types.ModuleType)):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+
+        if hasattr(current, '__dict__') and not isinstance(current, dict):
+            stack.append(vars(current))
+        for cls in type(current).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if hasattr(current, slot) and slot not in ('__dict__',
+                                                           '__weakref__'):
+                    stack.append(getattr(current, slot))
+    return size
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.monitoring
+    ~~~~~~~~~~~~~~~~~~~~
+
+    :mod:`pymongo.monitoring` listeners for the clients minimongo creates,
+    which attribute server round-trip times, connection checkout waits and
+    pool exhaustion to models, and report them to
+    :data:`minimongo.metrics.registry` next to minimongo's own client-side
+    timings:
+
+    * ``server:<command>`` operations -- round-trip time of every command
+      as measured by pymongo, e.g. ``server:find`` or ``server:getMore``,
+      so that ``batch`` minus ``server:find`` is roughly decode time;
+    * ``checkout`` operation -- time spent waiting for a pooled connection;
+    * ``server_errors``, ``pool_exhausted`` and ``checkout_failed``
+      counters.
+
+    Listeners are registered automatically (pymongo 3.1+ for commands,
+    3.9+ for pools) with clients created while metrics are enabled, so
+    :func:`minimongo.metrics.enable` has to be called before models are
+    defined; models share a client per host and port. Listeners stop
+    recording once metrics are disabled again.
+'''
+from __future__ import absolute_import
+
+import threading
+
+import six
+
+from . import metrics
+
+try:
+    from pymongo import monitoring
+except ImportError:  # pymongo < 3.1
+    monitoring = None
+
+# (database, collection) -> model class.
+_models = {}
+
+_local = threading.local()
+
+
+def register(model):
+    """Makes commands run against `model`'s collection attributable to
+    it. Called for every model by :class:`~minimongo.model.ModelBase`."""
+    _models.setdefault((model._meta.database, model._meta.collection), model)
+
+
+def model_for(database, collection):
+    """Returns the model (or a ``database.collection`` name if there's
+    no such model) commands against `collection` are attributed to."""
+    model = _models.get((database, collection))
+    if model is None:
+        return '%s.%s' % (database, collection)
+    return model
+
+
+def _command_collection(event):
+    collection = event.command.get(event.command_name)
+    if event.command_name == 'getMore':
+        collection = event.command.get('collection')
+    if isinstance(collection, six.string_types):
+        return collection
+    return None
+
+
+def _pool_name(address):
+    return 'pool:%s:%s' % address
+
+
+def _current_model(default):
+    return metrics.current_model() or default
+
+
+if monitoring is not None:
+
+    class CommandMonitor(monitoring.CommandListener):
+        """Records round-trip times of commands, per model."""
+
+        def __init__(self):
+            # Events come from whichever threads run commands.
+            self._lock = threading.Lock()
+            self._started = {}
+
+        def started(self, event):
+            if not metrics.enabled:
+                return
+            collection = _command_collection(event)
+            if collection is not None:
+                model = model_for(event.database_name, collection)
+            else:
+                model = _current_model(event.database_name)
+            with self._lock:
+                self._started[event.request_id] = model
+
+        def _finished(self, event):
+            with self._lock:
+                model = self._started.pop(event.request_id, None)
+            if model is None or not metrics.enabled:
+                return None
+            metrics.registry.record(model, 'server:' + event.command_name,
+                                    event.duration_micros / 1e6)
+            return model
+
+        def succeeded(self, event):
+            self._finished(event)
+
+        def failed(self, event):
+            model = self._finished(event)
+            if model is not None:
+                metrics.registry.increment(model, 'server_errors')
+
+    if hasattr(monitoring, 'ConnectionPoolListener'):
+
+        class PoolMonitor(monitoring.ConnectionPoolListener):
+            """Records connection checkout waits and failures, attributed
+            to the model whose operation asked for a connection."""
+
+            def connection_check_out_started(self, event):
+                if metrics.enabled:
+                    _local.checkout_started = metrics.clock()
+
+            def _checkout_done(self, event):
+                start = getattr(_local, 'checkout_started', None)
+                _local.checkout_started = None
+                model = _current_model(_pool_name(event.address))
+                if start is not None and metrics.enabled:
+                    metrics.record(model, 'checkout', start)
+                return model
+
+            def connection_checked_out(self, event):
+                self._checkout_done(event)
+
+            def connection_check_out_failed(self, event):
+                model = self._checkout_done(event)
+                if not metrics.enabled:
+                    return
+                if event.reason == 'timeout':
+                    metrics.registry.increment(model, 'pool_exhausted')
+                else:
+                    metrics.registry.increment(model, 'checkout_failed')
+
+            def pool_created(self, event):
+                pass
+
+            def pool_cleared(self, event):
+                pass
+
+            def pool_closed(self, event):
+                pass
+
+            def connection_created(self, event):
+                pass
+
+            def connection_ready(self, event):
+                pass
+
+            def connection_closed(self, event):
+                pass
+
+            def connection_checked_in(self, event):
+                pass
+    else:
+        PoolMonitor = None
+
+
+def listeners():
+    """Returns listeners to be passed as ``event_listeners`` to new
+    clients, or an empty list if metrics are disabled or pymongo doesn't
+    support monitoring."""
+    if monitoring is None or not metrics.enabled:
+        return []
+    result = [CommandMonitor()]
+    if PoolMonitor is not None:
+        result.append(PoolMonitor())
+    return result
@@ -4,8 +4,6 @@ from __future__ import absolute_import
 
 import types
 
-from .collection import Collection
-
 
 def configure(module=None, prefix='MONGODB_', **kwargs):
     """Sets defaults for ``class Meta`` declarations.
@@ -35,6 +33,15 @@ def configure(module=None, prefix='MONGODB_', **kwargs):
         _Options._configure(**kwargs)
 
 
+class _DefaultCollectionClass(object):
+    """Stands for :class:`minimongo.Collection`, imported on first access
+    so that importing options doesn't pull in pymongo."""
+
+    def __get__(self, instance, owner):
+        from .collection import Collection
+        return Collection
+
+
 class _Options(object):
     """Container class for model metadata.
 
@@ -60,7 +67,7 @@ class _Options(object):
     auto_index = True
 
     # What is the base class for Collections.
-    collection_class = Collection
+    collection_class = _DefaultCollectionClass()
 
     # A list of tuples.  Each tuple's first element is function that will be
     # called for every __setitem__, and takes the key & value.  It should
@@ -70,6 +77,37 @@ class _Options(object):
     # or dbref's that are coming in from a loaded object, etc.
     field_map = ()
 
+    # Maps field names to (shorter) keys documents are stored under, see
+    # minimongo.aliases.
+    aliases = None
+
+    # Fields compressed when saved if they're at least compression_threshold
+    # bytes long, with the 'zlib', 'lzma' or 'zstd' compression codec (None
+    # for zstd if available, zlib otherwise); see minimongo.compression.
+    compressed_fields = ()
+    compression = None
+    compression_threshold = 1024
+
+    # Should models share a single copy of each key, out of a table holding
+    # up to this many of them?  True for the default size, see
+    # minimongo.interning.
+    intern_keys = None
+
+    # Fixed set of fields, stored in __slots__ rather than in the dict, see
+    # minimongo.compiled.  Either a dict mapping names to defaults, or a
+    # sequence of names and (name, default) pairs; None for schemaless
+    # models.
+    fields = None
+
+    # Queries (find, find_one and update) taking longer than this many
+    # milliseconds are logged to the 'minimongo.slow_query' logger, None
+    # turns the slow query log off.  The first time a query shape is seen,
+    # explain() is captured for it with slow_query_explain_rate probability;
+    # at most slow_query_rate_limit queries per second are logged.
+    slow_query_ms = None
+    slow_query_explain_rate = 1.0
+    slow_query_rate_limit = 10
+
     # Is this an interface (i.e. will we derive from it and declare Meta
     # properly in the subclasses.)
     interface = False
@@ -0,0 +1,498 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.parallel
+    ~~~~~~~~~~~~~~~~~~
+
+    Parallel collection scans, partitioned by ``_id`` ranges, and BSON
+    decoding in worker processes. See
+    :meth:`minimongo.Collection.parallel_find`,
+    :meth:`minimongo.Collection.map_reduce_local` and
+    :meth:`minimongo.collection.Cursor.decode_parallel`.
+'''
+from __future__ import absolute_import
+
+import multiprocessing
+import threading
+from collections import deque
+
+from bson import decode_all
+from pymongo import MongoClient
+from pymongo.collection import Collection as PyMongoCollection
+from pymongo.errors import OperationFailure
+from six.moves import queue
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+#: How many documents are sampled per partition, when boundaries can't
+#: be computed with ``$bucketAuto``.
+SAMPLES_PER_PARTITION = 20
+
+# Marks the end of a partition in result queues.
+_DONE = object()
+
+# Marks the lack of a value in map/reduce accumulators.
+_NOTHING = object()
+
+# Collections of worker processes, by model class; they're created after
+# the fork, never inherited from the parent.
+_worker_collections = {}
+
+
+class _Failure(object):
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def _aggregate(collection, pipeline):
+    # Pipelines are on stored keys, so they skip Collection.aggregate(),
+    # which refuses them with Meta.aliases.
+    result = PyMongoCollection.aggregate(collection, pipeline)
+    if isinstance(result, dict):
+        # pymongo < 3.0 returns the whole command response.
+        result = result['result']
+    return list(result)
+
+
+def split_points(collection, query, partitions):
+    """Returns up to ``partitions - 1`` increasing ``_id`` values, which
+    split documents matching `query` into ranges of about equal size.
+
+    ``$bucketAuto`` (MongoDB 3.4+) is tried first, then ``$sample``
+    (MongoDB 3.2+) and finally -- much slower -- skipping through the
+    ``_id`` index.
+    """
+    if partitions < 2:
+        return []
+    match = []
+    if query:
+        aliases = getattr(collection, 'aliases', None)
+        # The pipeline doesn't go through Collection.find().
+        match = [{'$match': query if aliases is None
+                  else aliases.query(query)}]
+
+    try:
+        buckets = _aggregate(collection, match + [
+            {'$bucketAuto': {'groupBy': '$_id', 'buckets': partitions}}])
+        return [bucket['_id']['min'] for bucket in buckets[1:]]
+    except OperationFailure:
+        pass
+
+    try:
+        samples = _aggregate(collection, match + [
+            {'$sample': {'size': partitions * SAMPLES_PER_PARTITION}},
+            {'$project': {'_id': 1}}])
+        return quantiles(sorted(sample['_id'] for sample in samples),
+                         partitions)
+    except OperationFailure:
+        pass
+
+    count = collection.find(query or {}).count()
+    points = []
+    for partition in range(1, partitions):
+        found = list(collection.find(query or {}, {'_id': 1})
+                     .sort('_id').skip(count * partition // partitions)
+                     .limit(1))
+        if found and (not points or found[0]['_id'] > points[-1]):
+            points.append(found[0]['_id'])
+    return points
+
+
+def quantiles(values, partitions):
+    """Picks boundaries splitting sorted `values` into `partitions`
+    ranges; duplicates are dropped, so fewer might be returned.
+
+    >>> quantiles(list(range(100)), 4)
+    [25, 50, 75]
+    """
+    points = []
+    for partition in range(1, partitions):
+        index = len(values) * partition // partitions
+        if index < len(values) and (not points or values[index] > points[-1]):
+            points.append(values[index])
+    return points
+
+
+def ranges(points):
+    """Turns split points into ``(lower, upper)`` pairs, with ``None``
+    standing for an open end.
+
+    >>> ranges([10, 20])
+    [(None, 10), (10, 20), (20, None)]
+    """
+    bounds = [None] + list(points) + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def range_query(query, lower, upper, exclusive=False):
+    """Restricts `query` to ``lower <= _id < upper``, or ``lower < _id``
+    if `exclusive` (used when resuming after `lower`).
+
+    >>> range_query({'x': 1}, 10, None, exclusive=True)
+    {'$and': [{'x': 1}, {'_id': {'$gt': 10}}]}
+    """
+    condition = {}
+    if lower is not None:
+        condition['$gt' if exclusive else '$gte'] = lower
+    if upper is not None:
+        condition['$lt'] = upper
+    if not condition:
+        return query or {}
+    if not query:
+        return {'_id': condition}
+    return {'$and': [query, {'_id': condition}]}
+
+
+def _put(queues, stop, index, item):
+    # Hands `item` of range `index` over, unless the scan is stopped.
+    while not stop.is_set():
+        try:
+            queues[index].put((index, item), timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _scan(collection, query, kwargs, ranges, positions, tasks, queues,
+          stop):
+    # Body of ParallelScan threads, which don't hold a reference to the
+    # scan itself: that way, an abandoned scan can be garbage collected
+    # -- and closed.
+    while not stop.is_set():
+        try:
+            index = tasks.get_nowait()
+        except queue.Empty:
+            return
+        lower, upper = ranges[index]
+        position = positions.get(str(index))
+        if position is not None:
+            lower = position
+        spec = range_query(query, lower, upper,
+                           exclusive=position is not None)
+        try:
+            cursor = collection.find(spec, **kwargs)
+            for document in cursor.sort('_id'):
+                if not _put(queues, stop, index, document):
+                    cursor.close()
+                    return
+        except Exception as exception:
+            _put(queues, stop, index, _Failure(exception))
+            return
+        _put(queues, stop, index, _DONE)
+
+
+class ParallelScan(object):
+    """Iterator over documents of several ``_id`` ranges, each of which
+    is fetched, decoded and wrapped by a thread of its own (out of
+    `workers`), and handed over through bounded queues. Threads start
+    with the iteration, and stop once it's over, on :meth:`close` or
+    when the scan is garbage collected.
+
+    In `ordered` mode, documents come in ``_id`` order, one range after
+    another, otherwise they come as soon as any range produces them; in
+    both cases, a `sort` is refused.
+
+    `checkpoint` is a dict updated with split points and the last
+    ``_id`` consumed from every range, so a scan interrupted for whatever
+    reason can be resumed by passing the same dict again. It's made of
+    JSON types (positions are keyed by the range number as a string)
+    and ``_id`` values, so :func:`bson.json_util.dumps` and
+    :func:`bson.json_util.loads` save and load it.
+    """
+
+    # Worker threads, once started.
+    _threads = ()
+
+    def __init__(self, collection, query=None, partitions=4, workers=None,
+                 ordered=True, buffer_size=1000, checkpoint=None, **kwargs):
+        if kwargs.get('sort') is not None:
+            raise ValueError('Parallel scans are sorted by _id ranges, '
+                             'they cannot be sorted by %r'
+                             % (kwargs['sort'], ))
+        kwargs.pop('sort', None)
+        self.collection = collection
+        self.query = query or {}
+        self.ordered = ordered
+        self.kwargs = kwargs
+        self.checkpoint = checkpoint if checkpoint is not None else {}
+
+        if 'points' not in self.checkpoint:
+            self.checkpoint['points'] = split_points(collection, self.query,
+                                                     partitions)
+            self.checkpoint['positions'] = {}
+            self.checkpoint['finished'] = []
+        self.ranges = ranges(self.checkpoint['points'])
+        self.pending = [index for index in range(len(self.ranges))
+                        if index not in self.checkpoint['finished']]
+
+        self._workers = min(workers or len(self.pending), len(self.pending))
+        self._buffer_size = buffer_size
+        self._stop = threading.Event()
+        self._documents = None
+
+    def _start(self):
+        tasks = queue.Queue()
+        for index in self.pending:
+            tasks.put(index)
+        if self.ordered:
+            # A queue per range, so that later ranges are buffered while
+            # an earlier one is being consumed.
+            self._queues = dict((index, queue.Queue(self._buffer_size))
+                                for index in self.pending)
+        else:
+            shared = queue.Queue(self._buffer_size)
+            self._queues = dict((index, shared) for index in self.pending)
+
+        args = (self.collection, self.query, self.kwargs, self.ranges,
+                dict(self.checkpoint['positions']), tasks, self._queues,
+                self._stop)
+        self._threads = [threading.Thread(target=_scan, args=args)
+                         for _ in range(self._workers)]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def _consume(self, source, remaining):
+        positions = self.checkpoint['positions']
+        while remaining:
+            index, item = source.get()
+            if item is _DONE:
+                remaining.discard(index)
+                self.checkpoint['finished'].append(index)
+                positions.pop(str(index), None)
+                continue
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+            positions[str(index)] = item['_id']
+
+    def _iterate(self):
+        try:
+            if self.ordered:
+                for index in self.pending:
+                    for document in self._consume(self._queues[index],
+                                                  set([index])):
+                        yield document
+            elif self.pending:
+                source = self._queues[self.pending[0]]
+                for document in self._consume(source, set(self.pending)):
+                    yield document
+        finally:
+            self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._stop.is_set():
+            # Closed: the threads feeding queues are gone.
+            raise StopIteration
+        if self._documents is None:
+            self._start()
+            self._documents = self._iterate()
+        return next(self._documents)
+
+    next = __next__
+
+    def close(self):
+        """Stops all the worker threads."""
+        self._stop.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+    def __del__(self):
+        if self._threads:
+            self.close()
+
+
+def _reduce(documents, mapper, reducer, has_initial, initial):
+    # Returns (has_value, value) pairs rather than _NOTHING, which is a
+    # different object once pickled across processes.
+    has_value, accumulator = has_initial, initial
+    for document in documents:
+        value = mapper(document)
+        if has_value:
+            accumulator = reducer(accumulator, value)
+        else:
+            has_value, accumulator = True, value
+    return has_value, accumulator
+
+
+def reduce_documents(documents, mapper, reducer, initial=_NOTHING):
+    """Returns `reducer` applied to `mapper` results of all `documents`,
+    starting from `initial` if given; ``None`` if there's nothing to
+    reduce and no `initial` value.
+
+    >>> reduce_documents([{'x': 1}, {'x': 2}], lambda d: d['x'],
+    ...                  lambda a, b: a + b)
+    3
+    """
+    has_initial = initial is not _NOTHING
+    return _reduce(documents, mapper, reducer, has_initial,
+                   initial if has_initial else None)[1]
+
+
+def _reset_worker():
+    _worker_collections.clear()
+
+
+def _worker_collection(model):
+    """Returns a collection of `model` using a client created by the
+    current (worker) process."""
+    collection = _worker_collections.get(model)
+    if collection is None:
+        options = model._meta
+        database = MongoClient(options.host, options.port)[options.database]
+        if options.username and options.password:
+            database.authenticate(options.username, options.password)
+        collection = options.collection_class(
+            database, options.collection, document_class=model)
+        _worker_collections[model] = collection
+    return collection
+
+
+def _map_reduce_chunk(task):
+    model, spec, mapper, reducer, has_initial, initial, kwargs = task
+    cursor = _worker_collection(model).find(spec, **kwargs)
+    return _reduce(cursor, mapper, reducer, has_initial, initial)
+
+
+def map_reduce_local(collection, query, mapper, reducer, workers=None,
+                     chunks=None, initial=_NOTHING, combiner=None,
+                     progress=None, **kwargs):
+    """See :meth:`minimongo.Collection.map_reduce_local`."""
+    workers = workers or multiprocessing.cpu_count()
+    chunks = chunks or workers * 4
+    combiner = combiner or reducer
+    model = collection.document_class
+    has_initial = initial is not _NOTHING
+    if not has_initial:
+        initial = None
+
+    tasks = [(model, range_query(query, lower, upper), mapper, reducer,
+              has_initial, initial, kwargs)
+             for lower, upper in ranges(split_points(collection, query,
+                                                     chunks))]
+    has_result, result = False, None
+    pool = multiprocessing.Pool(min(workers, len(tasks)),
+                                initializer=_reset_worker)
+    try:
+        for done, (has_value, partial) in enumerate(
+                pool.imap_unordered(_map_reduce_chunk, tasks), 1):
+            if has_value:
+                if has_result:
+                    result = combiner(result, partial)
+                else:
+                    has_result, result = True, partial
+            if progress is not None:
+                progress(done, len(tasks))
+    finally:
+        pool.terminate()
+        pool.join()
+    return result
+
+
+def _decode_batch(task):
+    model, transform, name, size, data = task
+    block = None
+    if name is not None:
+        block = shared_memory.SharedMemory(name=name)
+        data = block.buf[:size]
+    try:
+        documents = decode_all(data)
+    finally:
+        if block is not None:
+            data.release()
+            block.close()
+    aliases = getattr(model.collection, 'aliases', None)
+    if aliases is not None:
+        for document in documents:
+            aliases.rename(document)
+    models = [model(document) for document in documents]
+    if transform is not None:
+        models = [transform(model) for model in models]
+    return name, models
+
+
+class _SharedBatches(object):
+    """Raw batches copied into shared memory blocks, which are kept
+    until the worker decoding them is done."""
+
+    def __init__(self):
+        self.blocks = {}
+
+    def put(self, batch):
+        block = shared_memory.SharedMemory(create=True, size=max(len(batch),
+                                                                 1))
+        block.buf[:len(batch)] = batch
+        self.blocks[block.name] = block
+        return block.name
+
+    def release(self, name):
+        block = self.blocks.pop(name, None)
+        if block is not None:
+            block.close()
+            block.unlink()
+
+    def close(self):
+        for name in list(self.blocks):
+            self.release(name)
+
+
+def decode_batches(batches, model, workers=None, ordered=True,
+                   transform=None, shared=True):
+    """Yields documents of raw BSON `batches`, decoded and wrapped into
+    `model` -- and passed through `transform`, if given -- by a pool of
+    `workers` processes; at most two batches per worker are in flight.
+
+    If `shared` is ``True`` (and Python is 3.8+), batches are handed over
+    in :mod:`multiprocessing.shared_memory` blocks, rather than pickled
+    through a pipe.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    shared = shared and shared_memory is not None
+    blocks = None
+    if shared:
+        # Started before forking, so that workers attaching to blocks
+        # share it, rather than start trackers of their own, which would
+        # try to clean the blocks up once more when they exit.
+        resource_tracker.ensure_running()
+        blocks = _SharedBatches()
+    pending = deque()
+    pool = multiprocessing.Pool(workers)
+
+    def take():
+        if ordered:
+            result = pending.popleft()
+        else:
+            while not any(result.ready() for result in pending):
+                pending[0].wait(0.01)
+            result = next(result for result in pending if result.ready())
+            pending.remove(result)
+        name, documents = result.get()
+        if blocks is not None:
+            blocks.release(name)
+        return documents
+
+    try:
+        for batch in batches:
+            if blocks is not None:
+                task = (model, transform, blocks.put(batch), len(batch), None)
+            else:
+                task = (model, transform, None, len(batch), batch)
+            pending.append(pool.apply_async(_decode_batch, (task,)))
+            if len(pending) >= workers * 2:
+                for document in take():
+                    yield document
+        while pending:
+            for document in take():
+                yield document
+    finally:
+        pool.terminate()
+        pool.join()
+        if blocks is not None:
+            blocks.close()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.prefetch
+    ~~~~~~~~~~~~~~~~~~
+
+    Background fetching of cursor batches, see
+    :meth:`minimongo.collection.Cursor.prefetch`.
+'''
+from __future__ import absolute_import
+
+import threading
+from collections import deque
+
+from six.moves import queue
+
+from . import metrics
+
+# Marks the end of results in the batch queue.
+_DONE = object()
+
+
+class _Failure(object):
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def _put(batches, stop, item):
+    while not stop.is_set():
+        try:
+            batches.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _fetch(cursor, batches, stop, wrap, model):
+    # Runs in the background thread. It only ever sees the inner cursor,
+    # the queue and the stop flag -- never the Prefetcher or the cursor
+    # being iterated -- so those can be garbage collected, which stops
+    # the thread.
+    # Same operations as minimongo's own cursors report: the query, then
+    # later batches.
+    operation = 'find'
+    try:
+        while not stop.is_set():
+            start = metrics.clock()
+            count = cursor._refresh()
+            if not count:
+                _put(batches, stop, _DONE)
+                return
+            batch = cursor._Cursor__data
+            cursor._Cursor__data = deque()
+            if metrics.enabled and model is not None:
+                metrics.record(model, operation, start, documents=count)
+            operation = 'batch'
+            if wrap is not None:
+                batch = deque(wrap(document) for document in batch)
+            if not _put(batches, stop, batch):
+                return
+    except Exception as exception:
+        _put(batches, stop, _Failure(exception))
+    finally:
+        cursor.close()
+
+
+class Prefetcher(object):
+    """Iterates over a plain pymongo `cursor`, whose batches are fetched
+    and decoded -- and if `wrap` is given, wrapped -- by a background
+    thread, up to `depth` batches ahead of the consumer.
+
+    The thread stops and the server side cursor is killed on
+    :meth:`close`, or once the prefetcher is garbage collected.
+    """
+
+    def __init__(self, cursor, depth=2, wrap=None, model=None):
+        self._batch = deque()
+        self._batches = queue.Queue(depth)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=_fetch,
+            args=(cursor, self._batches, self._stop, wrap, model))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def next_batch(self):
+        """Returns the rest of the current batch, or the next one, as a
+        :class:`~collections.deque`; raises :exc:`StopIteration` when
+        there are no more."""
+        while not self._batch:
+            if self._batches is None:
+                raise StopIteration
+            item = self._batches.get()
+            if item is _DONE:
+                self._batches = None
+            elif isinstance(item, _Failure):
+                self._batches = None
+                raise item.exception
+            else:
+                self._batch = item
+        batch, self._batch = self._batch, deque()
+        return batch
+
+    def next(self):
+        """Returns the next document, or raises :exc:`StopIteration`."""
+        if not self._batch:
+            self._batch = self.next_batch()
+        return self._batch.popleft()
+
+    def close(self):
+        """Stops the background thread, dropping any prefetched batches."""
+        self._stop.set()
+        self._batch = deque()
+        self._batches = None
+
+    def __del__(self):
+        self._stop.set()
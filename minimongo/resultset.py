@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.resultset
+    ~~~~~~~~~~~~~~~~~~~
+
+    A compact, columnar container for lots of documents, see
+    :meth:`minimongo.collection.Cursor.to_result_set`::
+
+        results = Foo.collection.find().to_result_set()
+        for row in results.filter(status='active').sort('created'):
+            print(row.name)
+
+    Every field is stored once as a column -- an :class:`array.array` as
+    long as all its values are ints, floats or bools, a list otherwise --
+    instead of a dict per document. If NumPy is installed, typed columns
+    are filtered, sorted and grouped by as NumPy arrays sharing their
+    memory, without going through rows one by one.
+'''
+from __future__ import absolute_import
+
+import array
+from collections import OrderedDict
+
+import six
+from six.moves import intern
+
+from .attrdict import AttrDict
+from .columns import _import_numpy
+
+# Typecodes of columns holding nothing but values of a single type.
+_TYPECODES = (
+    (bool, 'b'),
+    (float, 'd'),
+) + tuple((integer, 'q') for integer in six.integer_types)
+
+
+# NumPy dtypes of typed columns, by typecode.
+_DTYPES = {'b': 'i1', 'd': 'f8', 'q': 'i8'}
+
+
+def _intern(key):
+    return intern(key) if isinstance(key, str) else key
+
+
+def _typecode(value):
+    for value_type, typecode in _TYPECODES:
+        if type(value) is value_type:
+            return typecode
+    return None
+
+
+def _sort_key(value):
+    # Values of different types don't compare on Python 3: numbers sort
+    # together, first, then other values grouped by type.
+    if isinstance(value, (bool, float) + six.integer_types):
+        return ('', value)
+    return (type(value).__name__, value)
+
+
+class _Column(object):
+    """Values of a single field; `present` tells which rows have it."""
+
+    __slots__ = ('typecode', 'values', 'present')
+
+    def __init__(self, rows=0, typecode=None):
+        self.typecode = typecode
+        if typecode is None:
+            self.values = [None] * rows
+        else:
+            self.values = array.array(typecode, [0] * rows)
+        self.present = bytearray(rows)
+
+    def _to_objects(self):
+        if self.typecode == 'b':
+            self.values = [bool(value) for value in self.values]
+        else:
+            self.values = list(self.values)
+        for index, present in enumerate(self.present):
+            if not present:
+                self.values[index] = None
+        self.typecode = None
+
+    def _check(self, value):
+        if self.typecode is not None and _typecode(value) != self.typecode:
+            self._to_objects()
+
+    def append(self, value):
+        self._check(value)
+        try:
+            self.values.append(value)
+        except OverflowError:
+            # Too big for a 64 bit array.
+            self._to_objects()
+            self.values.append(value)
+        self.present.append(1)
+
+    def append_missing(self):
+        self.values.append(None if self.typecode is None else 0)
+        self.present.append(0)
+
+    def get(self, index):
+        value = self.values[index]
+        if self.typecode == 'b':
+            return bool(value)
+        return value
+
+    def set(self, index, value):
+        self._check(value)
+        try:
+            self.values[index] = value
+        except OverflowError:
+            self._to_objects()
+            self.values[index] = value
+        self.present[index] = 1
+
+    def arrays(self, numpy):
+        """Returns values and presence of a typed column as NumPy arrays
+        sharing its memory; ``None`` for untyped columns or without
+        NumPy."""
+        if numpy is None or self.typecode is None or not self.present:
+            return None
+        return (numpy.frombuffer(self.values, _DTYPES[self.typecode]),
+                numpy.frombuffer(self.present, numpy.bool_))
+
+    def take(self, indices, numpy=None):
+        column = _Column(typecode=self.typecode)
+        arrays = self.arrays(numpy)
+        if arrays is not None:
+            # `indices` are a NumPy array too.
+            values, present = arrays
+            column.values = array.array(self.typecode,
+                                        values[indices].tobytes())
+            column.present = bytearray(present[indices].tobytes())
+            return column
+        if numpy is not None:
+            indices = indices.tolist()
+        values = self.values
+        if self.typecode is None:
+            column.values = [values[index] for index in indices]
+        else:
+            column.values = array.array(self.typecode,
+                                        (values[index] for index in indices))
+        present = self.present
+        column.present = bytearray(present[index] for index in indices)
+        return column
+
+
+class Row(object):
+    """A proxy to a single row of a :class:`ResultSet`, with the same
+    attribute and item access as a model."""
+
+    __slots__ = ('_results', '_index')
+
+    def __init__(self, results, index):
+        object.__setattr__(self, '_results', results)
+        object.__setattr__(self, '_index', index)
+
+    def __getitem__(self, key):
+        column = self._results._columns.get(key)
+        if column is None or not column.present[self._index]:
+            raise KeyError(key)
+        return column.get(self._index)
+
+    def __setitem__(self, key, value):
+        self._results._set(self._index, key, value)
+
+    def __getattr__(self, attr):
+        try:
+            return self[attr]
+        except KeyError as excn:
+            raise AttributeError(excn)
+
+    def __setattr__(self, attr, value):
+        self[attr] = value
+
+    def __contains__(self, key):
+        column = self._results._columns.get(key)
+        return column is not None and bool(column.present[self._index])
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        index = self._index
+        return [key for key, column in six.iteritems(self._results._columns)
+                if column.present[index]]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def to_model(self):
+        """Returns the row as an instance of the result set's model."""
+        return self._results.model(self.to_dict())
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<Row %d %r>' % (self._index, self.to_dict())
+
+
+class ResultSet(object):
+    """Documents stored column by column, handing out :class:`Row`
+    proxies; keys are interned and stored once per column. `model` is
+    the class :meth:`Row.to_model` creates."""
+
+    def __init__(self, documents=(), model=AttrDict):
+        self.model = model
+        self._columns = OrderedDict()
+        self._size = 0
+        self.extend(documents)
+
+    def append(self, document):
+        columns = self._columns
+        size = self._size
+        for key, value in six.iteritems(document):
+            column = columns.get(key)
+            if column is None:
+                column = columns[_intern(key)] = _Column(
+                    size, _typecode(value))
+            if isinstance(value, dict) and not isinstance(value, AttrDict):
+                value = AttrDict(value)
+            column.append(value)
+        self._size = size = size + 1
+        for column in six.itervalues(columns):
+            if len(column.present) < size:
+                column.append_missing()
+
+    def extend(self, documents):
+        for document in documents:
+            self.append(document)
+
+    def _set(self, index, key, value):
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[_intern(key)] = _Column(
+                self._size, _typecode(value))
+        if isinstance(value, dict) and not isinstance(value, AttrDict):
+            value = AttrDict(value)
+        column.set(index, value)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(self._size)))
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return Row(self, index)
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield Row(self, index)
+
+    @property
+    def fields(self):
+        return list(self._columns)
+
+    def column(self, field):
+        """Returns values of `field`, ``None`` where it's missing."""
+        column = self._columns.get(field)
+        if column is None:
+            return [None] * self._size
+        return [column.get(index) if present else None
+                for index, present in enumerate(column.present)]
+
+    def take(self, indices):
+        """Returns a new result set of rows at `indices`."""
+        numpy = _import_numpy()
+        if numpy is None:
+            indices = list(indices)
+        else:
+            indices = numpy.asarray(indices, numpy.intp)
+        result = ResultSet(model=self.model)
+        for key, column in six.iteritems(self._columns):
+            result._columns[key] = column.take(indices, numpy)
+        result._size = len(indices)
+        return result
+
+    def filter(self, **conditions):
+        """Returns rows whose every field of `conditions` equals the
+        given value or -- for callables, called with every value -- makes
+        it return true. Rows missing a field never match.
+
+        >>> results = ResultSet([{'x': 1}, {'x': 2}, {'y': 3}])
+        >>> [row.x for row in results.filter(x=lambda x: x > 1)]
+        [2]
+        """
+        numpy = _import_numpy()
+        if numpy is None:
+            indices = range(self._size)
+        else:
+            indices = numpy.arange(self._size)
+        for field, condition in six.iteritems(conditions):
+            column = self._columns.get(field)
+            if column is None:
+                return self.take([])
+            arrays = column.arrays(numpy)
+            if arrays is not None and _typecode(condition) is not None:
+                values, present = arrays
+                indices = numpy.asarray(indices)
+                try:
+                    matches = present & (values == condition)
+                except OverflowError:
+                    pass
+                else:
+                    indices = indices[matches[indices]]
+                    continue
+            if numpy is not None:
+                indices = numpy.asarray(indices).tolist()
+            get, present = column.get, column.present
+            if callable(condition):
+                indices = [index for index in indices
+                           if present[index] and condition(get(index))]
+            else:
+                indices = [index for index in indices
+                           if present[index] and get(index) == condition]
+        return self.take(indices)
+
+    def sort(self, field, reverse=False):
+        """Returns rows sorted by `field`, numbers first, then other
+        values grouped by type; rows where it's ``None`` or missing come
+        last."""
+        column = self._columns.get(field)
+        if column is None:
+            return self.take(range(self._size))
+        numpy = _import_numpy()
+        arrays = column.arrays(numpy)
+        if arrays is not None:
+            values, present = arrays
+            indices = numpy.flatnonzero(present)
+            if reverse:
+                # Descending, with equal values kept in order: sorted
+                # backwards, stable.
+                indices = indices[::-1][numpy.argsort(
+                    values[indices][::-1], kind='stable')][::-1]
+            else:
+                indices = indices[numpy.argsort(values[indices],
+                                                kind='stable')]
+            return self.take(numpy.concatenate(
+                [indices, numpy.flatnonzero(~present)]))
+        values, present = column.values, column.present
+        indices = [index for index in range(self._size)
+                   if present[index] and values[index] is not None]
+        indices.sort(key=lambda index: _sort_key(values[index]),
+                     reverse=reverse)
+        nones = [index for index in range(self._size)
+                 if present[index] and values[index] is None]
+        missing = [index for index in range(self._size)
+                   if not present[index]]
+        return self.take(indices + nones + missing)
+
+    def group_by(self, field):
+        """Returns a dict mapping values of `field` to result sets of rows
+        having that value, in order of their first rows; rows missing the
+        field are under ``None``."""
+        column = self._columns.get(field)
+        numpy = _import_numpy()
+        arrays = column.arrays(numpy) if column is not None else None
+        if arrays is not None:
+            return self._group_arrays(numpy, column, *arrays)
+        groups = OrderedDict()
+        for index in range(self._size):
+            if column is not None and column.present[index]:
+                value = column.get(index)
+            else:
+                value = None
+            groups.setdefault(value, []).append(index)
+        return OrderedDict((value, self.take(indices))
+                           for value, indices in six.iteritems(groups))
+
+    def _group_arrays(self, numpy, column, values, present):
+        indices = numpy.flatnonzero(present)
+        keys, first, inverse = numpy.unique(values[indices],
+                                            return_index=True,
+                                            return_inverse=True)
+        inverse = inverse.ravel()
+        # Rows of every key, in order.
+        grouped = numpy.split(
+            indices[numpy.argsort(inverse, kind='stable')],
+            numpy.cumsum(numpy.bincount(inverse))[:-1])
+        keys = keys.tolist()
+        if column.typecode == 'b':
+            keys = [bool(key) for key in keys]
+        groups = [(indices[first[number]], key, grouped[number])
+                  for number, key in enumerate(keys)]
+        missing = numpy.flatnonzero(~present)
+        if len(missing):
+            groups.append((missing[0], None, missing))
+        groups.sort(key=lambda group: group[0])
+        return OrderedDict((key, self.take(rows))
+                           for _, key, rows in groups)
+
+    def __repr__(self):
+        return '<ResultSet %d x %r>' % (self._size, self.fields)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.rows
+    ~~~~~~~~~~~~~~
+
+    Lightweight ``__slots__`` rows for projected queries, see
+    :meth:`minimongo.collection.Cursor.rows`::
+
+        for row in Foo.collection.find().rows(['name', 'score']):
+            print(row.name, row.score)
+'''
+from __future__ import absolute_import
+
+import keyword
+import re
+
+import six
+
+from .attrdict import AttrDict
+
+# Row classes, by (model, fields).
+_classes = {}
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_MISSING = object()
+
+
+class SlottedRow(object):
+    """Base class of generated row classes: a fixed set of fields stored
+    in ``__slots__``, with the same attribute and item access as a model.
+    Fields missing from a document are left unset, so accessing them
+    raises :exc:`AttributeError` (or :exc:`KeyError`), just like with
+    models."""
+
+    __slots__ = ()
+
+    #: Names of the fields, in order.
+    _fields = ()
+
+    #: Model class rows are converted to by :meth:`to_model`.
+    _model = AttrDict
+
+    # (name, slot setter) pairs.
+    _setters = ()
+
+    @classmethod
+    def from_document(cls, document):
+        row = cls.__new__(cls)
+        get = document.get
+        for name, setter in cls._setters:
+            value = get(name, _MISSING)
+            if value is not _MISSING:
+                if isinstance(value, dict) and \
+                        not isinstance(value, AttrDict):
+                    value = AttrDict(value)
+                setter(row, value)
+        return row
+
+    def __init__(self, *args, **kwargs):
+        for name, value in zip(self._fields, args):
+            setattr(self, name, value)
+        for name, value in six.iteritems(kwargs):
+            setattr(self, name, value)
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._fields and hasattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [name for name in self._fields if hasattr(self, name)]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def to_model(self):
+        """Returns the row as an instance of its model class."""
+        return self._model(self.to_dict())
+
+    def __eq__(self, other):
+        if isinstance(other, SlottedRow):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Generated classes can't be pickled by reference.
+        return _restore, (self._model, self._fields, self.to_dict())
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % item for item in self.items()))
+
+
+def _restore(model, fields, values):
+    return row_class(model, fields)(**values)
+
+
+def row_class(model, fields):
+    """Returns the (cached) row class for `fields` of `model`."""
+    fields = tuple(fields)
+    key = (model, fields)
+    cls = _classes.get(key)
+    if cls is not None:
+        return cls
+
+    for field in fields:
+        if not isinstance(field, six.string_types) or \
+                not _IDENTIFIER.match(field) or \
+                keyword.iskeyword(field) or field.startswith('__'):
+            raise ValueError('%r is not a valid row field name' % (field, ))
+        if hasattr(SlottedRow, field):
+            # The slot would replace the method (or class attribute).
+            raise ValueError('Row field %r would hide SlottedRow.%s'
+                             % (field, field))
+    if len(set(fields)) != len(fields):
+        raise ValueError('Duplicate row fields in %r' % (fields, ))
+
+    cls = type(str('%sRow' % model.__name__), (SlottedRow, ), {
+        '__slots__': tuple(str(field) for field in fields),
+        '_fields': fields,
+        '_model': model,
+        '__module__': model.__module__,
+    })
+    cls._setters = tuple((name, getattr(cls, name).__set__)
+                         for name in fields)
+    _classes[key] = cls
+    return cls
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.slow_query
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Slow query log, enabled per model with ``Meta.slow_query_ms``::
+
+        class Foo(Model):
+            class Meta:
+                database = 'test'
+                slow_query_ms = 100
+
+    Queries above the threshold are logged to the ``minimongo.slow_query``
+    logger along with their shape (the query with all the values
+    stripped), sort and projection. The first time a shape is seen, a
+    sampled ``explain()`` is captured, so collection scans and the number
+    of documents examined vs. returned show up in the log as well.
+'''
+from __future__ import absolute_import
+
+import json
+import logging
+import random
+import threading
+
+import six
+
+from . import metrics
+
+logger = logging.getLogger('minimongo.slow_query')
+
+#: Maximum number of distinct query shapes remembered per collection;
+#: once reached, no more ``explain()`` output is captured.
+MAX_SHAPES = 1000
+
+
+def query_shape(query):
+    """Returns a `query` with all the values replaced by ``1``, so
+    queries differing only in values have the same shape.
+
+    >>> query_shape({'x': 5, 'y': {'$in': [1, 2, 3]}})
+    {'x': 1, 'y': {'$in': [1]}}
+    """
+    if isinstance(query, dict):
+        return dict((key, query_shape(value))
+                    for key, value in six.iteritems(query))
+    elif isinstance(query, (list, tuple)):
+        shapes = []
+        for value in query:
+            shape = query_shape(value)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return 1
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def summarize_explain(explain):
+    """Extracts the interesting bits out of ``explain()`` output, for
+    both the legacy (MongoDB < 3.0) and the current format."""
+    if 'queryPlanner' in explain:
+        stages = []
+        _collect_stages(explain['queryPlanner'].get('winningPlan', {}),
+                        stages)
+        stats = explain.get('executionStats', {})
+        return {
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages,
+            'keys_examined': stats.get('totalKeysExamined'),
+            'docs_examined': stats.get('totalDocsExamined'),
+            'returned': stats.get('nReturned'),
+        }
+    cursor = explain.get('cursor', '')
+    return {
+        'stages': [cursor],
+        'collscan': cursor.startswith('BasicCursor'),
+        'keys_examined': explain.get('nscanned'),
+        'docs_examined': explain.get('nscannedObjects'),
+        'returned': explain.get('n'),
+    }
+
+
+def _collect_stages(plan, stages):
+    if 'stage' in plan:
+        stages.append(plan['stage'])
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            _collect_stages(plan[key], stages)
+    for child in plan.get('inputStages', ()):
+        _collect_stages(child, stages)
+
+
+class RateLimiter(object):
+    """A token bucket allowing `rate` events per second, with bursts of
+    up to `rate` events."""
+
+    def __init__(self, rate, clock=metrics.clock):
+        self.rate = float(rate)
+        self.clock = clock
+        self.tokens = self.rate
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.rate,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class SlowQueryLog(object):
+    """Slow query log of a single collection."""
+
+    def __init__(self, collection, threshold_ms, explain_rate=1.0,
+                 rate_limit=10):
+        self.collection = collection
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self.limiter = RateLimiter(rate_limit)
+        #: Number of slow queries dropped by the rate limiter.
+        self.suppressed = 0
+        self._explained = set()
+
+    def observe(self, operation, start, query, sort=None, projection=None,
+                explain=None):
+        """Logs an `operation` started at `start` (as returned by
+        :func:`minimongo.metrics.clock`) if it was too slow. `explain`
+        is a callable returning ``explain()`` output for the query."""
+        duration_ms = (metrics.clock() - start) * 1000
+        if duration_ms < self.threshold_ms:
+            return None
+
+        if not self.limiter.allow():
+            self.suppressed += 1
+            return None
+
+        shape = query_shape(query or {})
+        record = {
+            'model': self.collection.document_class.__name__,
+            'collection': self.collection.full_name,
+            'operation': operation,
+            'shape': shape,
+            'sort': sort,
+            'projection': projection,
+            'duration_ms': duration_ms,
+        }
+
+        key = _dumps((operation, shape, sort, projection))
+        if explain is not None and key not in self._explained and \
+                len(self._explained) < MAX_SHAPES and \
+                random.random() < self.explain_rate:
+            self._explained.add(key)
+            try:
+                record['explain'] = summarize_explain(explain())
+            except Exception:
+                logger.debug('Unable to explain %s', key, exc_info=True)
+
+        logger.warning('Slow %s on %s (%.1f ms): %s sort=%s projection=%s',
+                       operation, record['collection'], duration_ms,
+                       _dumps(shape), sort, projection,
+                       extra={'slow_query': record})
+        return record
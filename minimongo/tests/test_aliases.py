@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import pytest
+
+from ..aliases import Aliases
+from ..index import Index
+from ..model import Model
+
+
+class AliasedModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_aliased'
+        auto_index = False
+        aliases = {'description': 'd', 'count': 'n'}
+
+
+class AliasedCompiledModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_aliased'
+        auto_index = False
+        aliases = {'description': 'd'}
+        fields = {'description': '', 'count': 0}
+
+
+ALIASES = Aliases({'description': 'd', 'count': 'n'})
+
+
+def test_invalid_aliases():
+    for aliases in ({'a': 'b.c'}, {'a': '$b'}, {'_id': 'i'}, {'a': ''},
+                    {'a': 'x', 'b': 'x'}):
+        with pytest.raises(ValueError):
+            Aliases(aliases)
+
+
+def test_encode_rename():
+    document = {'_id': 1, 'description': 'foo', 'other': 2}
+    assert ALIASES.encode(document) == {'_id': 1, 'd': 'foo', 'other': 2}
+    assert ALIASES.rename(ALIASES.encode(document)) == document
+    with pytest.raises(ValueError):
+        ALIASES.encode({'description': 'x', 'd': 'y'})
+
+
+def test_query():
+    assert ALIASES.query({
+        '$or': [{'count': {'$gt': 1}}, {'description.x': 'a'}],
+        'other': 1,
+        '$where': 'this.count',
+    }) == {
+        '$or': [{'n': {'$gt': 1}}, {'d.x': 'a'}],
+        'other': 1,
+        '$where': 'this.count',
+    }
+    assert ALIASES.query(None) is None
+
+
+def test_update():
+    assert ALIASES.update({'$set': {'count': 1, 'description.x': 2},
+                           '$rename': {'count': 'total'}}) == {
+        '$set': {'n': 1, 'd.x': 2}, '$rename': {'n': 'total'}}
+    assert ALIASES.update({'count': 1}) == {'n': 1}
+
+
+def test_sort_and_projection():
+    assert ALIASES.sort('count') == 'n'
+    assert ALIASES.sort([('count', 1), ('x', -1)]) == [('n', 1), ('x', -1)]
+    assert ALIASES.projection({'count': 1, '_id': 0}) == {'n': 1, '_id': 0}
+    assert ALIASES.projection(['description']) == ['d']
+    assert ALIASES.projection({'n': 1}, logical=True) == {'count': 1}
+
+
+def test_index():
+    index = Index([('count', 1)], unique=True).aliased(ALIASES)
+    assert index == Index([('n', 1)], unique=True)
+    assert Index(key_or_list='count').aliased(ALIASES).keys == [('n', 1)]
+
+
+def test_find_arguments():
+    collection = AliasedModel.collection
+    assert collection.aliases.stored == {'description': 'd', 'count': 'n'}
+    cursor = collection.find({'count': 1}, {'description': 1},
+                             sort=[('count', -1)])
+    assert cursor._Cursor__spec == {'n': 1}
+    assert cursor._Cursor__projection == {'d': 1}
+    assert list(cursor._Cursor__ordering.items()) == [('n', -1)]
+    cursor = collection.find(filter={'description': 'a'}).sort('count')
+    assert cursor._Cursor__spec == {'d': 'a'}
+    assert list(cursor._Cursor__ordering.items()) == [('n', 1)]
+
+
+def preloaded(cursor, documents):
+    """Makes `cursor` serve `documents` without a server."""
+    cursor._Cursor__data.extend(documents)
+    cursor._Cursor__killed = True
+    # Runs the query step, picking the decoder of the projection.
+    cursor._refresh()
+    return cursor
+
+
+def test_cursor_decodes():
+    cursor = preloaded(AliasedModel.collection.find(),
+                       [{'_id': 1, 'd': 'foo', 'n': 2}])
+    models = list(cursor)
+    assert models == [{'_id': 1, 'description': 'foo', 'count': 2}]
+    assert isinstance(models[0], AliasedModel)
+
+    cursor = preloaded(AliasedCompiledModel.collection.find({}, ['d']),
+                       [{'_id': 1, 'd': 'foo'}])
+    # The projection is on stored keys, the decoder on field names.
+    assert list(cursor) == [{'_id': 1, 'description': 'foo'}]
+
+    cursor = preloaded(AliasedModel.collection.find(),
+                       [{'d': 'foo'}, {'n': 1}])
+    assert list(cursor.iter_batches()) == [[{'description': 'foo'},
+                                            {'count': 1}]]
+
+
+def test_refused():
+    collection = AliasedModel.collection
+    for method in (collection.aggregate, collection.watch,
+                   collection.find_and_modify):
+        with pytest.raises(NotImplementedError):
+            method([])
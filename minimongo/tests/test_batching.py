@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from bson import BSON
+
+from ..batching import BatchSizer
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_batch_sizer_bytes():
+    document = {'x': 'a' * 1000}
+    size = len(BSON.encode(document))
+    sizer = BatchSizer(target_bytes=size * 50, latency_ms=1000,
+                       clock=FakeClock())
+    assert sizer.next_size() == 101
+    assert sizer.reason == 'initial'
+
+    sizer.fetched([document] * 101, 0.001)
+    assert sizer.next_size() == 50
+    assert sizer.reason == 'bytes'
+    assert sizer.as_dict()['document_bytes'] == size
+
+
+def test_batch_sizer_latency():
+    clock = FakeClock()
+    sizer = BatchSizer(target_bytes=10 ** 9, latency_ms=100,
+                       max_size=1000, clock=clock)
+    sizer.fetched([{}] * 100, 0.05)
+    # The caller spends 1.5 ms per document, 2 ms with the fetch time.
+    clock.now += 0.15
+    assert sizer.next_size() == 50
+    assert sizer.reason == 'latency'
+
+    # Much faster consumers are capped by max_size.
+    for _ in range(10):
+        sizer.fetched([{}] * 100, 0.0)
+        assert sizer.next_size()
+    assert sizer.batch_size == 1000
+    assert sizer.reason == 'max'
+    assert list(sizer.history)[0] == (50, 'latency')
+
+    sizer = BatchSizer(target_bytes=1, min_size=10, clock=clock)
+    sizer.fetched([{'x': 1}], 0.0)
+    assert sizer.next_size() == 10
+    assert sizer.reason == 'min'
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import array
+import datetime
+import subprocess
+import sys
+
+import pytest
+from bson import ObjectId
+
+from ..columns import build_columns
+
+OID = ObjectId('5349b4ddd2781d08c09890f3')
+
+BATCHES = [
+    [{'n': 1, 'x': 1.5, 'ok': True, 'at': datetime.datetime(1970, 1, 2),
+      'a': {'b': 7}, '_id': OID},
+     {'n': None, 'x': 2, 'ok': False}],
+    [{'n': 3, 'x': None, 'a': 'flat'}],
+]
+
+FIELDS = ['n', 'x', 'ok', 'at', 'a.b', '_id']
+
+
+def test_build_columns_array():
+    columns = build_columns(BATCHES, FIELDS, use_numpy=False)
+    assert len(columns) == 3
+    assert list(columns) == FIELDS
+    assert columns.dtypes == {'n': 'int64', 'x': 'float64', 'ok': 'bool',
+                              'at': 'datetime', 'a.b': 'int64',
+                              '_id': 'objectid'}
+    assert isinstance(columns['n'], array.array)
+    assert list(columns['n']) == [1, 0, 3]
+    assert list(columns.mask('n')) == [0, 1, 0]
+    assert list(columns['x']) == [1.5, 2.0, 0.0]
+    assert list(columns['ok']) == [1, 0, 0]
+    assert list(columns.mask('ok')) == [0, 0, 1]
+    assert list(columns['at']) == [86400000, 0, 0]
+    assert list(columns['a.b']) == [7, 0, 0]
+    assert bytes(bytearray(columns['_id'][:12])) == OID.binary
+    assert len(columns['_id']) == 36
+
+
+def test_build_columns_dtypes():
+    columns = build_columns(BATCHES, ['n', 'missing'],
+                            dtypes={'n': 'float64'}, use_numpy=False)
+    assert columns['n'].typecode == 'd'
+    assert list(columns.mask('missing')) == [1, 1, 1]
+
+    with pytest.raises(ValueError):
+        build_columns(BATCHES, ['n'], dtypes={'n': 'complex'},
+                      use_numpy=False)
+    with pytest.raises(TypeError):
+        build_columns(BATCHES, ['ok'], dtypes={'ok': 'int64'},
+                      use_numpy=False)
+    with pytest.raises(TypeError):
+        build_columns([[{'s': 'text'}]], ['s'], use_numpy=False)
+
+
+def test_build_columns_numpy(monkeypatch):
+    numpy = pytest.importorskip('numpy')
+    monkeypatch.setattr('minimongo.columns.INITIAL_CAPACITY', 2)
+
+    columns = build_columns(BATCHES, FIELDS)
+    assert columns['n'].tolist() == [1, 0, 3]
+    assert columns.mask('n').tolist() == [False, True, False]
+    assert columns.masked('n').sum() == 4
+    assert columns['x'].dtype == numpy.float64
+    assert columns['at'][0] == numpy.datetime64('1970-01-02')
+    assert columns['_id'][0].tobytes() == OID.binary
+    assert columns.masked('a.b').count() == 1
+
+
+def test_objectid_trailing_nul():
+    oid = ObjectId(b'\x00' * 8 + b'ab\x00\x00')
+    columns = build_columns([[{'_id': oid}, {}]], ['_id'], use_numpy=False)
+    assert bytes(bytearray(columns['_id'][:12])) == oid.binary
+
+    pytest.importorskip('numpy')
+    columns = build_columns([[{'_id': oid}, {}]], ['_id'], use_numpy=True)
+    assert columns['_id'][0].tobytes() == oid.binary
+    assert columns['_id'][1].tobytes() == b'\x00' * 12
+
+
+def test_widen_to_float():
+    batches = [[{'n': 1}, {'n': None}, {'n': 2.5}, {'n': 3}]]
+    columns = build_columns(batches, ['n'], use_numpy=False)
+    assert columns.dtypes['n'] == 'float64'
+    assert list(columns['n']) == [1.0, 0.0, 2.5, 3.0]
+    assert list(columns.mask('n')) == [0, 1, 0, 0]
+    # Explicitly typed columns don't change type.
+    with pytest.raises(TypeError):
+        build_columns(batches, ['n'], dtypes={'n': 'int64'},
+                      use_numpy=False)
+
+    pytest.importorskip('numpy')
+    columns = build_columns(batches, ['n'], use_numpy=True)
+    assert columns['n'].tolist() == [1.0, 0.0, 2.5, 3.0]
+    assert columns['n'].dtype.kind == 'f'
+
+
+def test_numpy_imported_lazily():
+    code = ('import sys; import minimongo.collection; '
+            'assert "numpy" not in sys.modules')
+    subprocess.check_call([sys.executable, '-c', code])
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import copy
+import pickle
+
+import pytest
+from bson import BSON
+
+from .. import metrics
+from ..attrdict import AttrDict
+from ..compiled import (MISSING, CompiledModel, decoder, normalize_fields,
+                        projected_fields)
+from ..model import Model, deep_sizeof
+
+
+class Point(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compiled'
+        auto_index = False
+        fields = {'x': 0, 'y': 0, 'tags': list, 'label': None}
+
+
+class LabeledPoint(Point):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compiled'
+        auto_index = False
+        fields = ['color', ('x', 1)]
+
+
+class PlainPoint(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compiled'
+        auto_index = False
+
+
+class MappedPoint(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compiled'
+        auto_index = False
+        field_map = ((lambda key, value: key == 'x' and
+                      isinstance(value, int), str), )
+        fields = ['x']
+
+
+def test_normalize_fields():
+    assert normalize_fields(['a', ('b', 1)]) == [('a', MISSING), ('b', 1)]
+    assert normalize_fields({'b': 1, 'a': None}) == [('a', None), ('b', 1)]
+    for fields in (['a.b'], ['class'], ['__x'], ['a', 'a'], [1], ['_id'],
+                   ['save'], ['items'], ['keys'], ['get'], ['update'],
+                   ['remove'], ['load'], ['collection'], ['to_bson']):
+        with pytest.raises(ValueError):
+            normalize_fields(fields)
+
+
+def test_field_hiding_attributes():
+    class Base(Model):
+        class Meta:
+            interface = True
+
+        def summary(self):
+            return 'summary'
+
+    with pytest.raises(ValueError):
+        class Summarized(Base):
+            class Meta:
+                database = 'minimongo_test'
+                auto_index = False
+                fields = ['summary']
+
+
+def test_compiled_access():
+    point = Point({'x': 1, 'nested': {'a': 1}})
+    assert isinstance(point, CompiledModel)
+    assert point.x == point['x'] == 1
+    assert point.y == 0
+    assert point.tags == [] and point.tags is not Point().tags
+    assert point.label is None
+    assert isinstance(point.nested, AttrDict)
+    assert '_id' not in point
+    with pytest.raises(AttributeError):
+        point._id
+    with pytest.raises(KeyError):
+        point['_id']
+
+    point.y = 2
+    point['z'] = {'b': 2}
+    assert point.z.b == 2
+    point._id = 1
+    assert dict(point) == {'_id': 1, 'nested': {'a': 1}, 'z': {'b': 2},
+                           'x': 1, 'y': 2, 'tags': [], 'label': None}
+    assert dict.__len__(point) == 3  # Only _id and undeclared keys.
+    assert len(point) == 7
+    # Model.get() is still the classmethod looking models up.
+    assert Point.get.__self__ is Point
+
+    del point.label
+    assert 'label' not in point
+    assert point.pop('y') == 2
+    assert point.pop('y', None) is None
+    assert point.setdefault('y', 5) == 5
+    point.update({'x': 3}, label='a')
+    assert point.to_bson() == {'_id': 1, 'x': 3, 'y': 5, 'label': 'a',
+                               'tags': [], 'nested': {'a': 1},
+                               'z': {'b': 2}}
+
+    point.clear()
+    assert point == {}
+
+
+def test_compiled_kwargs():
+    assert Point(x=2, w=1) == {'x': 2, 'y': 0, 'tags': [], 'label': None,
+                               'w': 1}
+    assert Point.from_bson({'_id': 1}) == {'_id': 1, 'x': 0, 'y': 0,
+                                           'tags': [], 'label': None}
+
+
+def test_compiled_equality_copy_pickle():
+    point = Point({'x': 1, 'extra': 2})
+    del point.label
+    assert point == {'x': 1, 'y': 0, 'tags': [], 'extra': 2}
+    assert {'x': 1, 'y': 0, 'tags': [], 'extra': 2} == point
+    assert point != Point()
+
+    for other in (copy.copy(point), copy.deepcopy(point), point.copy(),
+                  pickle.loads(pickle.dumps(point))):
+        assert type(other) is Point
+        # Defaults aren't applied again to removed fields.
+        assert other == point
+        assert 'label' not in other
+
+
+def test_compiled_bson():
+    point = Point({'_id': 1, 'x': 1, 'nested': {'a': 1}})
+    assert BSON(BSON.encode(point)).decode() == {
+        '_id': 1, 'x': 1, 'y': 0, 'tags': [], 'label': None,
+        'nested': {'a': 1}}
+
+
+def test_compiled_inheritance():
+    assert LabeledPoint._fields == ('label', 'tags', 'x', 'y', 'color')
+    assert LabeledPoint.__slots__ == ('color', )
+    point = LabeledPoint({'color': 'red'})
+    assert point == {'x': 1, 'y': 0, 'tags': [], 'label': None,
+                     'color': 'red'}
+
+
+def test_compiled_field_map():
+    point = MappedPoint({'x': 1})
+    assert point.x == '1'
+    point.x = 2
+    assert point.x == '2'
+
+
+def test_compiled_refill():
+    point = Point({'x': 1, 'extra': 1})
+    point._refill({'y': 2})
+    assert point == {'x': 0, 'y': 2, 'tags': [], 'label': None}
+
+
+def test_compiled_size():
+    document = dict(('field_%d' % index, index) for index in range(20))
+
+    class Compiled(Model):
+        class Meta:
+            database = 'minimongo_test'
+            collection = 'minimongo_compiled'
+            auto_index = False
+            fields = sorted(document)
+
+    assert deep_sizeof(Compiled(document)) < \
+        deep_sizeof(PlainPoint(document))
+
+
+class MappedDefault(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compiled'
+        auto_index = False
+        field_map = ((lambda key, value: isinstance(value, int), str), )
+        fields = {'x': 1, 'y': 2}
+
+
+class SameTypeMapper(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compiled'
+        auto_index = False
+        field_map = ((lambda key, value: key == 'x', lambda value: value), )
+        fields = ['x']
+
+
+class InheritedPoint(Point):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compiled'
+        auto_index = False
+
+
+def test_generated_field_map():
+    assert MappedDefault({'y': 3, 'z': 4}) == {'x': '1', 'y': '3', 'z': '4'}
+    with pytest.raises(Exception):
+        SameTypeMapper({'x': 1})
+
+
+def test_generated_inherited():
+    point = InheritedPoint.from_bson({'x': 2})
+    assert type(point) is InheritedPoint
+    assert point == {'x': 2, 'y': 0, 'tags': [], 'label': None}
+    assert InheritedPoint.__slots__ == ()
+
+
+def test_projected_fields():
+    assert projected_fields(Point, None) is None
+    assert projected_fields(Point, {'x': 1, 'tags.a': 1, 'other': 1}) == \
+        frozenset(['x', 'tags'])
+    assert projected_fields(Point, ['x', '_id']) == frozenset(['x'])
+    assert projected_fields(Point, {'x': 0, 'tags.a': 0}) == \
+        frozenset(['y', 'tags', 'label'])
+    assert projected_fields(Point, {'_id': 0}) is None
+
+
+def test_decoder():
+    assert decoder(Point) is decoder(Point, {'_id': 0})
+    assert decoder(Point, {'x': 1}) is decoder(Point, ['x'])
+    # Projected out fields aren't defaulted.
+    point = decoder(Point, {'x': 1})({'_id': 1, 'x': 2})
+    assert type(point) is Point
+    assert point == {'_id': 1, 'x': 2}
+    point.y = 3
+    assert point.to_bson() == {'_id': 1, 'x': 2, 'y': 3}
+    # Declared fields show up anyway, if the server returns them.
+    assert decoder(Point, {'x': 1})({'y': 1}) == {'x': 0, 'y': 1}
+
+
+def test_decoder_hot_path():
+    metrics.enable(hot_path=True)
+    try:
+        assert decoder(MappedDefault, {'x': 1})({'z': 2}) == {'x': '1',
+                                                             'z': '2'}
+        assert Point({'x': 1}) == {'x': 1, 'y': 0, 'tags': [],
+                                   'label': None}
+    finally:
+        metrics.disable()
+
+
+class InitPoint(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compiled'
+        auto_index = False
+        fields = {'x': 0, 'y': 0}
+
+    def __init__(self, initial=None, **kwargs):
+        super(InitPoint, self).__init__(initial, **kwargs)
+        self.y = self.x * 2
+
+
+class InitPointChild(InitPoint):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compiled'
+        auto_index = False
+        fields = ['z']
+
+
+def test_custom_init():
+    assert InitPoint({'x': 2}) == {'x': 2, 'y': 4}
+    assert InitPoint.from_bson({'x': 3}) == {'x': 3, 'y': 6}
+    assert decoder(InitPoint, {'x': 1}) is InitPoint
+    child = InitPointChild({'x': 1, 'z': 5})
+    assert child == {'x': 1, 'y': 2, 'z': 5}
+    assert decoder(InitPointChild)({'x': 2}) == {'x': 2, 'y': 4}
+
+
+def test_inherited_init_refused():
+    class Initialized(Model):
+        class Meta:
+            interface = True
+
+        def __init__(self, *args, **kwargs):
+            super(Initialized, self).__init__(*args, **kwargs)
+
+    with pytest.raises(TypeError):
+        class Compiled(Initialized):
+            class Meta:
+                database = 'minimongo_test'
+                auto_index = False
+                fields = ['x']
+
+
+def test_generic_methods():
+    # What the generated methods do, without code generation.
+    point = Point({'_id': 1, 'x': 1, 'extra': 2})
+    del point.label
+    assert CompiledModel.to_bson(point) == point.to_bson()
+    created = CompiledModel.from_bson.__func__(Point, {'x': 1})
+    assert type(created) is Point
+    assert created == Point({'x': 1})
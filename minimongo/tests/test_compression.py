@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import pytest
+from bson import Binary
+
+from ..attrdict import AttrDict
+from ..compression import (DEFAULT_CODEC, SUBTYPE, Compression,
+                           CompressedModel, _CODECS, decompress, inflate,
+                           is_compressed)
+from ..model import Model
+
+TEXT = u'All work and no play makes Jack a dull boy. ' * 100
+
+
+class CompressedPage(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compressed'
+        auto_index = False
+        aliases = {'body': 'b'}
+        compressed_fields = ('body', 'data')
+        compression = 'zlib'
+
+
+def test_compress():
+    compression = Compression(['body'], 'zlib', threshold=100)
+    assert compression.codec == 'zlib'
+    for value in (TEXT, TEXT.encode('utf-8'),
+                  {'lines': TEXT.split('.'), 'n': 1},
+                  TEXT.split('.')):
+        stored = compression.compress(value)
+        assert is_compressed(stored)
+        assert len(stored) < len(TEXT)
+        assert decompress(stored) == value
+    # Too small, not compressible or of other types: stored as they are.
+    assert compression.compress(u'short') == u'short'
+    random = bytes(bytearray(range(256)))
+    assert compression.compress(random) is random
+    assert compression.compress(10 ** 6) == 10 ** 6
+    uuid = Binary(b'x' * 200, 4)
+    assert compression.compress(uuid) is uuid
+
+
+@pytest.mark.parametrize('codec', sorted(_CODECS))
+def test_codecs(codec):
+    stored = Compression(['body'], codec).compress(TEXT)
+    assert decompress(stored) == TEXT
+
+
+def test_invalid_codec():
+    with pytest.raises(ValueError):
+        Compression(['body'], 'snappy')
+    assert Compression(['body']).codec == DEFAULT_CODEC
+
+
+def test_encode_and_update():
+    compression = Compression(['body'], 'zlib')
+    document = {'body': TEXT, 'x': 1}
+    stored = compression.encode(document)
+    assert stored is not document and document['body'] == TEXT
+    assert stored['x'] == 1 and is_compressed(stored['body'])
+    # Compressed already, or nothing to compress.
+    assert compression.encode(stored) is stored
+    small = {'body': u'a'}
+    assert compression.encode(small) is small
+
+    update = compression.update({'$set': {'body': TEXT},
+                                 '$inc': {'x': 1}})
+    assert is_compressed(update['$set']['body'])
+    assert update['$inc'] == {'x': 1}
+    assert is_compressed(compression.update({'body': TEXT})['body'])
+
+
+def test_lazy_model():
+    assert issubclass(CompressedPage, CompressedModel)
+    stored = CompressedPage.collection.compression.compress(TEXT)
+    page = CompressedPage({'body': stored, 'x': 1})
+    assert dict.__getitem__(page, 'body') is stored
+    assert page.body == TEXT
+    assert dict.__getitem__(page, 'body') == TEXT
+
+    page = CompressedPage({'body': stored,
+                           'data': Compression(['data']).compress(
+                               {'text': TEXT})})
+    assert isinstance(page['data'], AttrDict)
+    assert page.data.text == TEXT
+    assert inflate(page) == {'body': TEXT, 'data': {'text': TEXT}}
+
+
+def test_collection_encode():
+    collection = CompressedPage.collection
+    page = CompressedPage({'body': TEXT, 'x': 1})
+    stored = collection._encode(page)
+    assert set(stored) == set(['b', 'x'])
+    assert stored['b'].subtype == SUBTYPE
+    # Models keep their uncompressed values.
+    assert page.body == TEXT
+
+    update = collection._encode_update({'$set': {'body': TEXT}})
+    assert list(update['$set']) == ['b']
+
+
+def test_compressed_slots():
+    with pytest.raises(ValueError):
+        class CompiledPage(Model):
+            class Meta:
+                database = 'minimongo_test'
+                collection = 'minimongo_compressed'
+                auto_index = False
+                fields = ['body']
+                compressed_fields = ['body']
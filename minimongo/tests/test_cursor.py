@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import gc
+
+from pymongo.cursor import Cursor as PyMongoCursor
+
+from .. import tracing
+from ..collection import Cursor
+from ..model import Model
+
+
+class CursorModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_cursor'
+        auto_index = False
+
+
+def preloaded(documents):
+    """Returns a cursor serving `documents` without a server."""
+    cursor = Cursor(CursorModel.collection, wrap=CursorModel)
+    cursor._Cursor__data.extend(documents)
+    # A killed cursor never goes back to the server for more data.
+    cursor._Cursor__killed = True
+    return cursor
+
+
+def test_iter_batches():
+    batches = list(preloaded([{'x': 1}, {'x': 2}]).iter_batches())
+    assert batches == [[{'x': 1}, {'x': 2}]]
+    assert isinstance(batches[0][0], CursorModel)
+
+    cursor = preloaded([{'x': 1}])
+    assert list(cursor.iter_batches(size=10)) == [[{'x': 1}]]
+    assert cursor._Cursor__batch_size == 10
+
+
+def test_reuse():
+    documents = [{'x': x, 'nested': {'y': x}} for x in range(5)]
+    models = list(preloaded(documents).reuse())
+    assert len(set(id(model) for model in models)) == 1
+    assert models[0] == documents[-1]
+    assert models[0].nested.y == 4
+
+    seen = []
+    for model in preloaded([{'x': 1, 'gone': True}, {'x': 2}]).reuse():
+        assert isinstance(model, CursorModel)
+        seen.append(dict(model))
+    # Nothing's left over from previous documents.
+    assert seen == [{'x': 1, 'gone': True}, {'x': 2}]
+
+    models = list(preloaded(documents).reuse(ring=2))
+    assert len(set(id(model) for model in models)) == 2
+    assert models[-2:] == [documents[3], documents[4]]
+
+
+def test_spans_finished():
+    exporter = tracing.InMemoryExporter()
+    tracing.add_exporter(exporter)
+    try:
+        cursor = preloaded([{'x': 1}, {'x': 2}])
+        cursor._refresh()
+        next(cursor)
+        cursor.close()
+        assert [span.documents for span in exporter.spans] == [2]
+
+        # Abandoned before running out of results.
+        cursor = preloaded([{'x': 1}, {'x': 2}])
+        cursor._refresh()
+        next(cursor)
+        del cursor
+        gc.collect()
+        assert len(exporter.spans) == 2
+        assert exporter.spans[1].duration is not None
+    finally:
+        tracing.remove_exporter(exporter)
+
+
+class CompiledCursorModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_cursor'
+        auto_index = False
+        fields = {'x': 0, 'y': 0}
+
+
+def test_projected_decoder():
+    cursor = Cursor(CompiledCursorModel.collection, {}, {'x': 1},
+                    wrap=CompiledCursorModel)
+    cursor._Cursor__data.extend([{'_id': 1, 'x': 1}])
+    cursor._Cursor__killed = True
+    cursor._refresh()
+    assert list(cursor) == [{'_id': 1, 'x': 1}]
+
+    cursor = Cursor(CompiledCursorModel.collection, {}, {'x': 1},
+                    wrap=CompiledCursorModel)
+    cursor._Cursor__data.extend([{'x': 1}])
+    cursor._Cursor__killed = True
+    assert list(cursor.iter_batches()) == [[{'x': 1}]]
+
+
+class CountingModel(CursorModel):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_cursor'
+        auto_index = False
+
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        type(self).created += 1
+        super(CountingModel, self).__init__(*args, **kwargs)
+
+
+def test_reuse_prefetched():
+    documents = [{'x': x} for x in range(5)]
+    plain = PyMongoCursor(CountingModel.collection)
+    plain._Cursor__data.extend(documents)
+    plain._Cursor__killed = True
+    cursor = Cursor(CountingModel.collection, wrap=CountingModel)
+    cursor._plain_clone = lambda: plain
+    models = list(cursor.prefetch().reuse(ring=2))
+    assert [dict(model) for model in models[-2:]] == documents[-2:]
+    # Documents are only wrapped by the ring, not by the prefetcher too.
+    assert CountingModel.created == len(documents)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import datetime
+
+from .. import Index
+from ..index_usage import analyze_indices
+
+NOW = datetime.datetime(2020, 1, 31)
+LONG_AGO = datetime.datetime(2020, 1, 1)
+
+
+def stat(name, key, ops, since=LONG_AGO, **spec):
+    return {'name': name, 'key': dict(key), 'spec': spec,
+            'accesses': {'ops': ops, 'since': since}}
+
+
+def test_index_keys_and_name():
+    assert Index('x').keys == [('x', 1)]
+    assert Index('x').name == 'x_1'
+    assert Index([('x', 1), ('y', -1)]).name == 'x_1_y_-1'
+    assert Index('x', name='custom').name == 'custom'
+
+
+def test_unused_indices():
+    report = analyze_indices(
+        [Index('x'), Index('y')],
+        [stat('_id_', [('_id', 1)], 0),
+         stat('x_1', [('x', 1)], 10),
+         stat('y_1', [('y', 1)], 0)],
+        now=NOW)
+    assert report['unused'] == ['y_1']
+    assert report['redundant'] == []
+    assert report['estimated_write_saving'] == 1.0 / 4
+
+
+def test_unused_needs_full_window():
+    report = analyze_indices(
+        [Index('x')],
+        [stat('x_1', [('x', 1)], 0, since=NOW - datetime.timedelta(days=1))],
+        now=NOW)
+    assert report['unused'] == []
+
+
+def test_redundant_prefix():
+    report = analyze_indices(
+        [Index('x'), Index([('x', 1), ('y', 1)]), Index('z', unique=True),
+         Index([('z', 1), ('y', 1)])],
+        [stat('x_1', [('x', 1)], 5),
+         stat('x_1_y_1', [('x', 1), ('y', 1)], 5),
+         stat('z_1', [('z', 1)], 5, unique=True),
+         stat('z_1_y_1', [('z', 1), ('y', 1)], 5)],
+        now=NOW)
+    assert report['redundant'] == ['x_1']
+    by_name = dict((info['name'], info) for info in report['indices'])
+    assert by_name['x_1']['redundant_with'] == 'x_1_y_1'
+    # Unique indices enforce a constraint, so they are never redundant.
+    assert by_name['z_1']['redundant_with'] is None
+
+
+def test_undeclared_and_missing():
+    report = analyze_indices(
+        [Index('x')],
+        [stat('_id_', [('_id', 1)], 3), stat('legacy_1', [('legacy', 1)], 3)],
+        now=NOW)
+    assert report['undeclared'] == ['legacy_1']
+    assert report['missing'] == ['x_1']
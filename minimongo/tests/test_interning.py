@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from bson import BSON
+
+from ..attrdict import AttrDict
+from ..collection import Cursor
+from ..interning import DEFAULT_SIZE, KeyTable
+from ..model import Model
+
+
+class InternedModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_interned'
+        auto_index = False
+        intern_keys = True
+
+
+class InternedCompiledModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_interned'
+        auto_index = False
+        intern_keys = 2
+        fields = ['nested']
+
+
+class InternedChild(InternedModel):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_interned'
+        auto_index = False
+
+
+def decoded(document):
+    # As it comes from the server: with its own copy of every key.
+    return BSON(BSON.encode(document)).decode()
+
+
+def keys(document):
+    return dict((key, key) for key in dict.keys(document))
+
+
+def test_key_table():
+    table = KeyTable(2)
+    first = table.attrdict(decoded({'field_a': {'field_b': 1}}))
+    second = table.attrdict(decoded({'field_a': {'field_b': 2}}))
+    assert isinstance(second, AttrDict)
+    assert isinstance(second.field_a, AttrDict)
+    assert second == {'field_a': {'field_b': 2}}
+    assert keys(first)['field_a'] is keys(second)['field_a']
+    assert keys(first.field_a)['field_b'] is \
+        keys(second.field_a)['field_b']
+    # Bounded.
+    table.attrdict(decoded({'field_c': 1}))
+    assert len(table) == 2
+
+
+def test_models_share_keys():
+    assert InternedModel._keys.size == DEFAULT_SIZE
+    assert InternedChild._keys is not InternedModel._keys
+    assert Model._keys is None
+
+    first = InternedModel(decoded({'long_field_name': {'nested_name': 1}}))
+    second = InternedModel(decoded({'long_field_name': {'nested_name': 2}}))
+    assert keys(first)['long_field_name'] is \
+        keys(second)['long_field_name']
+    assert keys(first.long_field_name)['nested_name'] is \
+        keys(second.long_field_name)['nested_name']
+
+    second['other_field'] = 1
+    second._refill(decoded({'other_field': 2}))
+    assert keys(second)['other_field'] is \
+        keys(InternedModel(decoded({'other_field': 3})))['other_field']
+
+
+def test_cursor_interns():
+    cursor = Cursor(InternedModel.collection, wrap=InternedModel)
+    cursor._Cursor__data.extend(decoded({'long_field_name': index})
+                                for index in range(3))
+    cursor._Cursor__killed = True
+    models = list(cursor.reuse(ring=3))
+    assert len(set(id(keys(model)['long_field_name'])
+                   for model in models)) == 1
+
+
+def test_compiled_interns():
+    first = InternedCompiledModel(decoded({'nested': {'nested_key': 1},
+                                           'undeclared': 1}))
+    second = InternedCompiledModel.from_bson(
+        decoded({'nested': {'nested_key': 2}, 'undeclared': 2}))
+    assert keys(first.nested)['nested_key'] is \
+        keys(second.nested)['nested_key']
+    assert keys(first)['undeclared'] is keys(second)['undeclared']
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from .. import AttrDict, Model, metrics
+from ..metrics import Histogram, Registry
+
+
+class FakeModel(object):
+    pass
+
+
+def test_histogram_precision():
+    histogram = Histogram()
+    for value in (0, 1, 31, 1000, 123456789):
+        histogram.record(value)
+        low, high = histogram._bounds(histogram._index(value))
+        assert low <= value <= high
+        assert high - low <= max(value, 1) / 16.0
+
+    assert histogram.count == 5
+    assert histogram.min == 0
+    assert histogram.max == 123456789
+    assert histogram.percentile(100) == 123456789
+
+
+def test_histogram_buckets_are_contiguous():
+    histogram = Histogram(precision=3)
+    previous = -1
+    for index in range(64):
+        low, high = histogram._bounds(index)
+        assert low == previous + 1
+        assert histogram._index(low) == histogram._index(high) == index
+        previous = high
+
+
+def test_registry_as_dict():
+    registry = Registry()
+    registry.record(FakeModel, 'find_one', 0.002, documents=1, nbytes=10)
+    registry.record(FakeModel, 'find_one', 0.004, documents=0)
+
+    stats = registry.as_dict()['FakeModel']['find_one']
+    assert stats['count'] == 2
+    assert stats['documents'] == 1
+    assert stats['bytes'] == 10
+    assert 0.0039 < stats['max_seconds'] <= 0.004
+
+    registry.reset()
+    assert registry.as_dict() == {}
+
+
+def test_registry_to_prometheus():
+    registry = Registry()
+    registry.record(FakeModel, 'save', 0.003, documents=1)
+    text = registry.to_prometheus()
+    labels = 'model="FakeModel",operation="save"'
+
+    assert '# TYPE minimongo_operation_duration_seconds histogram' in text
+    assert ('minimongo_operation_duration_seconds_bucket{%s,le="0.001"} 0'
+            % labels) in text
+    assert ('minimongo_operation_duration_seconds_bucket{%s,le="0.005"} 1'
+            % labels) in text
+    assert ('minimongo_operation_duration_seconds_count{%s} 1'
+            % labels) in text
+    assert 'minimongo_documents_total{%s} 1' % labels in text
+
+
+def test_registry_counters():
+    registry = Registry()
+    registry.increment(FakeModel, 'dicts_converted')
+    registry.increment(FakeModel, 'dicts_converted', 2)
+    assert registry.counters() == {'FakeModel': {'dicts_converted': 3}}
+    assert ('minimongo_hot_path_total{model="FakeModel",'
+            'counter="dicts_converted"} 3') in registry.to_prometheus()
+
+
+def test_hot_path():
+    class HotPathModel(Model):
+        class Meta:
+            database = 'minimongo_test'
+            auto_index = False
+            field_map = (
+                (lambda k, v: k == 'x', str),
+                (lambda k, v: k == 'never', str),
+            )
+
+    metrics.registry.reset()
+    metrics.enable(hot_path=True)
+    try:
+        HotPathModel({'x': 1, 'y': {'z': {}}})
+        AttrDict({'a': {}})
+    finally:
+        metrics.disable()
+
+    counters = metrics.registry.counters()
+    # Nested conversions are attributed to the outermost object.
+    assert counters['HotPathModel']['dicts_converted'] == 2
+    assert counters['AttrDict']['dicts_converted'] == 1
+    assert counters['HotPathModel']['field_map_evaluated'] == 4
+    assert counters['HotPathModel']['field_map_fired'] == 1
+
+    stats = metrics.registry.as_dict()['HotPathModel']
+    assert stats['convert']['count'] == 1
+    assert stats['field_map']['count'] == 2
+
+    metrics.registry.reset()
+    AttrDict({'a': {}})
+    assert metrics.registry.counters() == {}
@@ -2,11 +2,15 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import logging
+
 import pytest
-from bson import DBRef
+from bson import DBRef, decode_all
+from pymongo.collection import Collection as PyMongoCollection
 from pymongo.errors import DuplicateKeyError
 
-from .. import Collection, Index, Model
+from .. import Collection, Index, Model, metrics, tracing
+from ..compression import SUBTYPE
 
 
 class TestCollection(Collection):
@@ -83,6 +87,38 @@ class TestFieldMapper(Model):
         )
 
 
+class TestSlowQueryModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_slow'
+        # Every single query is "slow".
+        slow_query_ms = 0
+        slow_query_rate_limit = 1000
+
+
+class TestParallelModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_parallel'
+
+
+class TestAliasedModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_aliased'
+        aliases = {'description': 'd', 'count': 'n'}
+        indices = (Index([('description', 1), ('count', -1)]), )
+        auto_index = False
+
+
+class TestCompressedModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_compressed'
+        compressed_fields = ('body', )
+        compression = 'zlib'
+
+
 def setup():
     # Make sure we start with a clean, empty DB.
     TestModel.connection.drop_database(TestModel.database)
@@ -574,3 +610,289 @@ def test_slicing():
     assert type(obj_list[0] == TestModel)
     assert type(obj_list[1] == TestModel)
     assert type(obj_list[2] == TestModel)
+
+
+def test_metrics():
+    metrics.registry.reset()
+    metrics.enable(sizes=True)
+    try:
+        TestModel({'x': 1}).save()
+        TestModel.collection.find_one({'x': 1})
+        list(TestModel.collection.find({'x': 1}))
+    finally:
+        metrics.disable()
+
+    stats = metrics.registry.as_dict()['TestModel']
+    assert stats['save']['count'] == 1
+    assert stats['save']['bytes'] > 0
+    assert stats['find_one']['documents'] == 1
+    assert stats['find']['count'] == 2  # find_one() goes through find().
+    assert stats['find']['documents'] >= 1
+    assert stats['wrap']['count'] >= 1
+
+    # Nothing is recorded, while instrumentation is off.
+    TestModel.collection.find_one({'x': 1})
+    assert metrics.registry.as_dict()['TestModel'] == stats
+
+
+def test_slow_query_log(caplog):
+    TestSlowQueryModel({'x': 1}).save()
+
+    with caplog.at_level(logging.WARNING, logger='minimongo.slow_query'):
+        list(TestSlowQueryModel.collection.find({'x': 1}).sort('x'))
+        TestSlowQueryModel.collection.update({'x': 1}, {'$set': {'y': 2}})
+
+    records = [record.slow_query for record in caplog.records]
+    assert [record['operation'] for record in records] == ['find', 'update']
+    assert records[0]['shape'] == {'x': 1}
+    assert records[0]['sort'] == [('x', 1)]
+    assert records[0]['explain']['collscan']
+
+    # Models without slow_query_ms don't pay for it at all.
+    assert TestModel.collection.slow_query_log is None
+
+
+def test_tracing():
+    exporter = tracing.InMemoryExporter()
+    tracing.add_exporter(exporter)
+    try:
+        with tracing.span('request') as request:
+            model = TestModel({'x': 1}).save()
+            for found in TestModel.collection.find({'_id': model._id}):
+                TestModel.get(_id=found._id)
+            TestModel.collection.from_dbref(model.dbref())
+            model.remove()
+    finally:
+        tracing.remove_exporter(exporter)
+
+    spans = dict((span.name, span) for span in exporter.spans)
+    assert set(spans) >= set(['request', 'minimongo.save', 'minimongo.find',
+                              'minimongo.get', 'minimongo.from_dbref',
+                              'minimongo.remove'])
+    assert spans['minimongo.find'].documents == 1
+    assert spans['minimongo.find'].attributes['query_shape'] == {'_id': 1}
+    assert spans['minimongo.get'].attributes['collection'] == 'minimongo_test'
+    for name, span in spans.items():
+        if name != 'request':
+            assert span.trace_id == request.trace_id
+
+
+def test_parallel_find():
+    for x in range(100):
+        TestParallelModel({'x': x}).save()
+    expected = list(TestParallelModel.collection.find().sort('_id'))
+
+    found = list(TestParallelModel.collection.parallel_find(partitions=4))
+    assert found == expected
+    assert all(isinstance(model, TestParallelModel) for model in found)
+
+    found = TestParallelModel.collection.parallel_find(
+        {'x': {'$gte': 50}}, partitions=3, workers=2, ordered=False)
+    assert sorted(model.x for model in found) == list(range(50, 100))
+
+
+def test_parallel_find_resume():
+    for x in range(100):
+        TestParallelModel({'x': x}).save()
+    expected = list(TestParallelModel.collection.find().sort('_id'))
+
+    checkpoint = {}
+    scan = TestParallelModel.collection.parallel_find(
+        partitions=4, checkpoint=checkpoint, buffer_size=5)
+    first = [next(scan) for _ in range(30)]
+    scan.close()
+
+    rest = list(TestParallelModel.collection.parallel_find(
+        checkpoint=checkpoint))
+    # The document being processed when the scan was interrupted is
+    # delivered once again.
+    assert rest[0] == first[-1]
+    assert first + rest[1:] == expected
+
+
+def _parallel_x(model):
+    assert isinstance(model, TestParallelModel)
+    return model.x
+
+
+def _add(first, second):
+    return first + second
+
+
+def test_map_reduce_local():
+    for x in range(100):
+        TestParallelModel({'x': x}).save()
+
+    progress = []
+    total = TestParallelModel.collection.map_reduce_local(
+        {}, _parallel_x, _add, workers=2, chunks=4,
+        progress=lambda done, chunks: progress.append((done, chunks)))
+    assert total == sum(range(100))
+    assert progress[-1][0] == progress[-1][1] == len(progress)
+
+    assert TestParallelModel.collection.map_reduce_local(
+        {'x': {'$lt': 10}}, _parallel_x, _add, workers=2) == sum(range(10))
+    assert TestParallelModel.collection.map_reduce_local(
+        {'x': -1}, _parallel_x, _add, workers=2) is None
+
+
+def test_prefetch():
+    for x in range(50):
+        TestParallelModel({'x': x}).save()
+    expected = list(TestParallelModel.collection.find().sort('_id'))
+
+    cursor = TestParallelModel.collection.find().sort('_id').batch_size(7)
+    found = list(cursor.prefetch(depth=2))
+    assert found == expected
+    assert all(isinstance(model, TestParallelModel) for model in found)
+
+    found = list(TestParallelModel.collection.find().sort('_id').limit(10)
+                 .prefetch(wrap=False))
+    assert found == expected[:10]
+    assert all(isinstance(model, TestParallelModel) for model in found)
+
+    cursor = TestParallelModel.collection.find().batch_size(5).prefetch()
+    next(cursor)
+    cursor.close()
+    assert list(cursor) == []
+
+
+def test_adaptive_batch_size():
+    for x in range(200):
+        TestParallelModel({'x': x, 'padding': 'a' * 1000}).save()
+
+    cursor = TestParallelModel.collection.find().adaptive_batch_size(
+        target_bytes=20000, min_size=5)
+    assert len(list(cursor)) == 200
+    stats = cursor.batch_stats
+    assert stats.documents == 200
+    assert stats.batch_size < 20
+    assert stats.reason == 'bytes'
+
+
+def test_iter_batches():
+    for x in range(25):
+        TestParallelModel({'x': x}).save()
+    expected = list(TestParallelModel.collection.find().sort('_id'))
+
+    batches = list(TestParallelModel.collection.find().sort('_id')
+                   .iter_batches(10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert all(isinstance(model, TestParallelModel)
+               for batch in batches for model in batch)
+    assert sum(batches, []) == expected
+
+    batches = list(TestParallelModel.collection.find().sort('_id')
+                   .prefetch().iter_batches(10))
+    assert sum(batches, []) == expected
+
+    raw = list(TestParallelModel.collection.find().sort('_id')
+               .iter_batches(10, raw=True))
+    assert all(isinstance(batch, bytes) for batch in raw)
+    assert sum((decode_all(batch) for batch in raw), []) == expected
+
+
+def test_decode_parallel():
+    for x in range(50):
+        TestParallelModel({'x': x}).save()
+    expected = list(TestParallelModel.collection.find().sort('_id'))
+
+    found = list(TestParallelModel.collection.find().sort('_id')
+                 .batch_size(10).decode_parallel(workers=2))
+    assert found == expected
+    assert all(isinstance(model, TestParallelModel) for model in found)
+
+    found = TestParallelModel.collection.find().batch_size(10) \
+        .decode_parallel(workers=2, ordered=False, transform=_parallel_x)
+    assert sorted(found) == list(range(50))
+
+
+def test_to_columns():
+    for x in range(30):
+        TestParallelModel({'x': x, 'y': x % 2 == 0 or None}).save()
+
+    cursor = TestParallelModel.collection.find().sort('x').batch_size(7)
+    columns = cursor.to_columns(['x', 'y'], use_numpy=False)
+    assert len(columns) == 30
+    assert list(columns['x']) == list(range(30))
+    assert list(columns.mask('y')) == [x % 2 for x in range(30)]
+
+
+def test_to_result_set():
+    for x in range(30):
+        TestParallelModel({'x': x, 'even': x % 2 == 0}).save()
+
+    results = TestParallelModel.collection.find().batch_size(7) \
+        .to_result_set()
+    assert len(results) == 30
+    assert results.model is TestParallelModel
+    assert sorted(results.column('x')) == list(range(30))
+    assert len(results.filter(even=True)) == 15
+    model = results.sort('x', reverse=True)[0].to_model()
+    assert isinstance(model, TestParallelModel)
+    assert model.x == 29
+
+
+def test_rows():
+    for x in range(10):
+        TestParallelModel({'x': x, 'y': -x, 'z': 'unused'}).save()
+
+    rows = list(TestParallelModel.collection.find().sort('x').rows(['x', 'y']))
+    assert len(rows) == 10
+    assert [row.x for row in rows] == list(range(10))
+    assert rows[3] == {'x': 3, 'y': -3}
+    assert isinstance(rows[0].to_model(), TestParallelModel)
+
+
+def test_aliases():
+    model = TestAliasedModel({'description': 'foo', 'count': 1}).save()
+    stored = PyMongoCollection.find_one(TestAliasedModel.collection,
+                                        {'_id': model._id})
+    assert stored == {'_id': model._id, 'd': 'foo', 'n': 1}
+
+    found = TestAliasedModel.collection.find_one({'description': 'foo'})
+    assert found == {'_id': model._id, 'description': 'foo', 'count': 1}
+
+    model.mongo_update({'$inc': {'count': 2}})
+    TestAliasedModel({'description': 'bar', 'count': 5}).save()
+    found = list(TestAliasedModel.collection.find(
+        {'count': {'$gt': 0}}, {'count': 1, '_id': 0}).sort('count', -1))
+    assert found == [{'count': 5}, {'count': 3}]
+    found = TestAliasedModel.collection.find(sort=[('description', 1)])
+    assert [model.description for model in found] == ['bar', 'foo']
+
+    TestAliasedModel.auto_index()
+    assert 'd_1_n_-1' in TestAliasedModel.collection.index_information()
+
+    collection = TestAliasedModel.collection
+    document = {'description': 'baz', 'count': 7}
+    collection.insert_one(document)
+    assert '_id' in document
+    assert collection.count_documents({'count': 7}) == 1
+    collection.update_many({'count': 7}, {'$set': {'description': 'qux'}})
+    assert collection.distinct('description', {'count': 7}) == ['qux']
+    found = collection.find_one_and_update(
+        {'description': 'qux'}, {'$inc': {'count': 1}},
+        projection={'count': 1, '_id': 0})
+    assert found == {'count': 7}
+    collection.delete_one({'count': 8})
+    assert collection.count_documents({'description': 'qux'}) == 0
+    with pytest.raises(NotImplementedError):
+        collection.aggregate([])
+
+
+def test_compressed_fields():
+    body = u'Lorem ipsum dolor sit amet. ' * 200
+    model = TestCompressedModel({'body': body, 'title': 'x'}).save()
+    assert model.body == body
+    stored = PyMongoCollection.find_one(TestCompressedModel.collection,
+                                        {'_id': model._id})
+    assert stored['body'].subtype == SUBTYPE
+    assert len(stored['body']) < len(body) // 10
+
+    found = TestCompressedModel.collection.find_one({'_id': model._id})
+    assert found.body == body
+    found.title = 'y'
+    found.mongo_update()
+    assert TestCompressedModel.collection.find_one(
+        {'_id': model._id}).body == body
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import pytest
+
+from .. import metrics, monitoring
+
+pytestmark = pytest.mark.skipif(monitoring.monitoring is None,
+                                reason='pymongo.monitoring is unavailable')
+
+
+class FakeModel(object):
+    class _meta:
+        database = 'db'
+        collection = 'fake'
+
+
+class Event(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def setup_function(function):
+    metrics.registry.reset()
+    metrics.enable()
+
+
+def teardown_function(function):
+    metrics.disable()
+
+
+def test_commands_are_attributed_to_models():
+    monitoring.register(FakeModel)
+    monitor = monitoring.CommandMonitor()
+
+    monitor.started(Event(request_id=1, command_name='find',
+                          command={'find': 'fake'}, database_name='db'))
+    monitor.succeeded(Event(request_id=1, command_name='find',
+                            duration_micros=1500))
+    monitor.started(Event(request_id=2, command_name='getMore',
+                          command={'getMore': 42, 'collection': 'other'},
+                          database_name='db'))
+    monitor.failed(Event(request_id=2, command_name='getMore',
+                         duration_micros=10))
+
+    stats = metrics.registry.as_dict()
+    assert stats['FakeModel']['server:find']['count'] == 1
+    assert stats['FakeModel']['server:find']['max_seconds'] == 0.0015
+    # Collections without a model are reported by their full name.
+    assert stats['db.other']['server:getMore']['count'] == 1
+    assert metrics.registry.counters()['db.other'] == {'server_errors': 1}
+
+
+@pytest.mark.skipif(getattr(monitoring, 'PoolMonitor', None) is None,
+                    reason='pymongo has no pool monitoring')
+def test_checkouts_are_attributed_to_current_model():
+    monitor = monitoring.PoolMonitor()
+    address = ('localhost', 27017)
+
+    with metrics.attributed(FakeModel):
+        monitor.connection_check_out_started(Event(address=address))
+        monitor.connection_checked_out(Event(address=address))
+        monitor.connection_check_out_started(Event(address=address))
+        monitor.connection_check_out_failed(Event(address=address,
+                                                  reason='timeout'))
+    monitor.connection_check_out_started(Event(address=address))
+    monitor.connection_checked_out(Event(address=address))
+
+    stats = metrics.registry.as_dict()
+    assert stats['FakeModel']['checkout']['count'] == 2
+    assert stats['pool:localhost:27017']['checkout']['count'] == 1
+    assert metrics.registry.counters()['FakeModel'] == {'pool_exhausted': 1}
+
+
+def test_listeners_only_when_enabled():
+    assert monitoring.listeners()
+    metrics.disable()
+    assert monitoring.listeners() == []
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import gc
+import pickle
+import threading
+
+import pytest
+from bson import BSON, ObjectId, json_util
+
+from ..model import Model
+from ..parallel import (ParallelScan, _reduce, decode_batches, quantiles,
+                        range_query, ranges, reduce_documents)
+
+
+class DecodeModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_decode'
+        auto_index = False
+
+
+def _x(model):
+    assert isinstance(model, DecodeModel)
+    return model.x
+
+
+def test_quantiles():
+    assert quantiles(list(range(10)), 2) == [5]
+    assert quantiles(list(range(10)), 1) == []
+    # Duplicate boundaries are dropped.
+    assert quantiles([1, 1, 1, 1, 2], 4) == [1]
+    assert quantiles([], 4) == []
+
+
+def test_ranges():
+    assert ranges([]) == [(None, None)]
+    assert ranges([5]) == [(None, 5), (5, None)]
+
+
+def test_range_query():
+    assert range_query({}, None, None) == {}
+    assert range_query(None, 1, 2) == {'_id': {'$gte': 1, '$lt': 2}}
+    assert range_query({'x': 1}, None, 2) == \
+        {'$and': [{'x': 1}, {'_id': {'$lt': 2}}]}
+    assert range_query({}, 1, None, exclusive=True) == {'_id': {'$gt': 1}}
+
+
+def test_reduce_documents():
+    documents = [{'x': 1}, {'x': 2}, {'x': 3}]
+    assert reduce_documents(documents, lambda d: d['x'], max) == 3
+    assert reduce_documents(documents, lambda d: [d['x']],
+                            lambda a, b: a + b, []) == [1, 2, 3]
+    assert reduce_documents([], lambda d: d['x'], max, 0) == 0
+    assert reduce_documents([], lambda d: d['x'], max) is None
+    # What workers send back has to survive pickling.
+    assert pickle.loads(pickle.dumps(
+        _reduce([], lambda d: d['x'], max, False, None))) == (False, None)
+    assert _reduce(documents, lambda d: d['x'], max, True, 5) == (True, 5)
+
+
+def test_decode_batches():
+    batches = [b''.join(BSON.encode({'x': batch * 10 + x})
+                        for x in range(10))
+               for batch in range(10)]
+    found = list(decode_batches(iter(batches), DecodeModel, workers=2))
+    assert found == [{'x': x} for x in range(100)]
+    assert all(isinstance(model, DecodeModel) for model in found)
+
+    found = decode_batches(iter(batches), DecodeModel, workers=2,
+                           ordered=False, transform=_x)
+    assert sorted(found) == list(range(100))
+
+    found = decode_batches(iter(batches), DecodeModel, workers=2,
+                           transform=_x, shared=False)
+    assert list(found) == list(range(100))
+
+
+class _Found(list):
+    def sort(self, key):
+        return _Found(sorted(self, key=lambda document: document[key]))
+
+    def close(self):
+        pass
+
+
+class _Collection(object):
+    """Serves `documents` to ParallelScan threads, without a server."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, spec, **kwargs):
+        condition = spec.get('_id', {})
+        return _Found(
+            document for document in self.documents
+            if document['_id'] >= condition.get('$gte', document['_id'])
+            and document['_id'] > condition.get('$gt', ObjectId('0' * 24))
+            and document['_id'] < condition.get('$lt', ObjectId('f' * 24)))
+
+
+def _scan_threads():
+    return [thread for thread in threading.enumerate()
+            if getattr(thread, '_target', None) is not None and
+            thread._target.__name__ == '_scan']
+
+
+def test_parallel_scan_threads():
+    documents = [{'_id': ObjectId(), 'x': x} for x in range(20)]
+    checkpoint = {'points': [documents[10]['_id']], 'positions': {},
+                  'finished': []}
+    scan = ParallelScan(_Collection(documents), checkpoint=checkpoint,
+                        buffer_size=2)
+    # Nothing runs until the iteration starts.
+    assert scan._threads == ()
+    assert [next(scan)['x'] for _ in range(12)] == list(range(12))
+    assert len(scan._threads) == 2
+
+    # Resumable from a checkpoint saved as JSON.
+    saved = json_util.loads(json_util.dumps(checkpoint))
+    # The document being processed (x = 11) isn't done with yet.
+    assert saved['positions'] == {'1': documents[10]['_id']}
+    scan.close()
+    assert not any(thread.is_alive() for thread in scan._threads)
+    assert list(scan) == []
+    rest = ParallelScan(_Collection(documents), checkpoint=saved)
+    assert [document['x'] for document in rest] == list(range(11, 20))
+    assert saved['finished'] == [0, 1]
+
+
+def test_parallel_scan_abandoned():
+    documents = [{'_id': ObjectId(), 'x': x} for x in range(20)]
+    scan = ParallelScan(_Collection(documents), buffer_size=1,
+                        checkpoint={'points': [], 'positions': {},
+                                    'finished': []})
+    next(scan)
+    threads = scan._threads
+    del scan
+    gc.collect()
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive()
+
+
+def test_parallel_scan_sort():
+    with pytest.raises(ValueError):
+        ParallelScan(_Collection([]), sort=[('x', 1)],
+                     checkpoint={'points': [], 'positions': {},
+                                 'finished': []})
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import gc
+from collections import deque
+
+import pytest
+
+from ..prefetch import Prefetcher
+
+
+class FakeCursor(object):
+    """Serves the given batches the way pymongo's cursor does."""
+
+    def __init__(self, batches, error=None):
+        self.batches = deque(batches)
+        self.error = error
+        self.closed = False
+        self._Cursor__data = deque()
+
+    def _refresh(self):
+        if not self._Cursor__data and self.batches:
+            self._Cursor__data = deque(self.batches.popleft())
+        elif not self._Cursor__data and self.error is not None:
+            raise self.error
+        return len(self._Cursor__data)
+
+    def close(self):
+        self.closed = True
+
+
+def drain(prefetcher):
+    documents = []
+    while True:
+        try:
+            documents.append(prefetcher.next())
+        except StopIteration:
+            return documents
+
+
+def test_prefetcher():
+    cursor = FakeCursor([[{'x': 1}, {'x': 2}], [{'x': 3}]])
+    prefetcher = Prefetcher(cursor, depth=1, wrap=lambda d: d['x'])
+    assert drain(prefetcher) == [1, 2, 3]
+    # Exhausted prefetchers keep raising StopIteration.
+    assert drain(prefetcher) == []
+    prefetcher._thread.join(1)
+    assert cursor.closed
+
+
+def test_prefetcher_batches():
+    cursor = FakeCursor([[{'x': 1}, {'x': 2}], [{'x': 3}]])
+    prefetcher = Prefetcher(cursor)
+    assert prefetcher.next() == {'x': 1}
+    # The rest of the current batch comes first.
+    assert list(prefetcher.next_batch()) == [{'x': 2}]
+    assert list(prefetcher.next_batch()) == [{'x': 3}]
+    with pytest.raises(StopIteration):
+        prefetcher.next_batch()
+
+
+def test_prefetcher_error():
+    cursor = FakeCursor([[{'x': 1}]], error=ValueError('boom'))
+    prefetcher = Prefetcher(cursor)
+    assert prefetcher.next() == {'x': 1}
+    with pytest.raises(ValueError):
+        prefetcher.next()
+
+
+def test_prefetcher_cancel():
+    cursor = FakeCursor([[{'x': x}] for x in range(100)])
+    prefetcher = Prefetcher(cursor, depth=1)
+    assert prefetcher.next() == {'x': 0}
+    prefetcher.close()
+    prefetcher._thread.join(1)
+    assert not prefetcher._thread.is_alive()
+    assert cursor.closed
+    assert drain(prefetcher) == []
+
+    # Garbage collecting the prefetcher stops the thread as well.
+    cursor = FakeCursor([[{'x': x}] for x in range(100)])
+    prefetcher = Prefetcher(cursor, depth=1)
+    thread = prefetcher._thread
+    del prefetcher
+    gc.collect()
+    thread.join(1)
+    assert not thread.is_alive()
+    assert cursor.closed
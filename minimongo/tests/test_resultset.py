@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import array
+
+import pytest
+
+from .. import resultset
+from ..attrdict import AttrDict
+from ..resultset import ResultSet
+
+DOCUMENTS = [
+    {'name': 'a', 'n': 3, 'ok': True, 'nested': {'x': 1}},
+    {'name': 'b', 'n': 1, 'ok': False},
+    {'name': 'c', 'n': 2, 'score': 0.5},
+    {'name': 'd', 'ok': True},
+]
+
+
+def test_result_set_storage():
+    results = ResultSet(DOCUMENTS)
+    assert len(results) == 4
+    assert results.fields == ['name', 'n', 'ok', 'nested', 'score']
+    assert isinstance(results._columns['n'].values, array.array)
+    assert isinstance(results._columns['ok'].values, array.array)
+    assert isinstance(results._columns['name'].values, list)
+    assert results.column('n') == [3, 1, 2, None]
+    assert results.column('ok') == [True, False, None, True]
+    assert results.column('missing') == [None] * 4
+
+    # Values of other types turn typed columns into plain lists.
+    results.append({'n': 'many'})
+    results.append({'score': 2 ** 70})
+    assert results.column('n') == [3, 1, 2, None, 'many', None]
+    assert results.column('score')[-1] == 2 ** 70
+
+
+def test_row():
+    results = ResultSet(DOCUMENTS)
+    row = results[0]
+    assert row.name == 'a'
+    assert row['n'] == 3
+    assert row.ok is True
+    assert isinstance(row.nested, AttrDict)
+    assert row.nested.x == 1
+    assert row == DOCUMENTS[0]
+    assert results[-1].to_dict() == DOCUMENTS[-1]
+    assert 'score' not in row
+    assert row.get('score', 0) == 0
+    with pytest.raises(AttributeError):
+        row.score
+    with pytest.raises(KeyError):
+        row['score']
+    with pytest.raises(IndexError):
+        results[4]
+
+    row.score = 1.5
+    row['n'] = 4
+    assert results[0].score == 1.5
+    assert results.column('n') == [4, 1, 2, None]
+    assert results[1].keys() == ['name', 'n', 'ok']
+    assert isinstance(row.to_model(), AttrDict)
+
+
+def test_filter_sort_group_by():
+    results = ResultSet(DOCUMENTS)
+    assert [row.name for row in results.filter(ok=True)] == ['a', 'd']
+    assert [row.name for row in results.filter(ok=True, n=3)] == ['a']
+    assert [row.name for row in results.filter(n=lambda n: n < 3)] == \
+        ['b', 'c']
+    assert len(results.filter(missing=1)) == 0
+
+    assert [row.name for row in results.sort('n')] == ['b', 'c', 'a', 'd']
+    assert [row.name for row in results.sort('n', reverse=True)] == \
+        ['a', 'c', 'b', 'd']
+    assert results.sort('n')[0] == DOCUMENTS[1]
+    assert [row.name for row in results[1:3]] == ['b', 'c']
+
+    groups = results.group_by('ok')
+    assert list(groups) == [True, False, None]
+    assert [row.name for row in groups[True]] == ['a', 'd']
+    assert [row.name for row in groups[None]] == ['c']
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def vectorized(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(resultset, '_import_numpy', lambda: None)
+    return request.param == 'numpy'
+
+
+def test_filter_sort_group_by_columns(vectorized):
+    results = ResultSet([{'n': n % 3, 'f': n / 2.0, 'ok': n % 2 == 0}
+                         for n in range(10)] + [{'name': 'none'}])
+    assert results.filter(n=1, ok=True).column('f') == [2.0]
+    assert results.filter(n=2 ** 70).column('n') == []
+    assert results.filter(f=lambda f: f > 4).column('f') == [4.5]
+
+    assert results.sort('n').column('f')[:4] == [0.0, 1.5, 3.0, 4.5]
+    assert results.sort('n', reverse=True).column('f')[:3] == \
+        [1.0, 2.5, 4.0]
+    assert results.sort('n')[-1].name == 'none'
+
+    groups = results.group_by('n')
+    assert list(groups) == [0, 1, 2, None]
+    assert groups[1].column('f') == [0.5, 2.0, 3.5]
+    assert list(results.group_by('ok')) == [True, False, None]
+    assert results[2:0].sort('n').column('n') == []
+
+
+def test_sort_mixed(vectorized):
+    results = ResultSet([{'v': value} for value in
+                         ('b', None, 2, 1.5, 'a', True)] + [{}])
+    assert results.sort('v').column('v') == \
+        [True, 1.5, 2, 'a', 'b', None, None]
+    assert results.sort('v', reverse=True).column('v') == \
+        ['b', 'a', 2, 1.5, True, None, None]
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import pickle
+
+import pytest
+
+from ..attrdict import AttrDict
+from ..model import Model
+from ..rows import row_class
+
+
+class RowModel(Model):
+    class Meta:
+        database = 'minimongo_test'
+        collection = 'minimongo_rows'
+        auto_index = False
+
+
+def test_row_class():
+    cls = row_class(RowModel, ['name', 'score'])
+    assert cls is row_class(RowModel, ('name', 'score'))
+    assert cls is not row_class(RowModel, ['score', 'name'])
+    assert cls.__name__ == 'RowModelRow'
+
+    row = cls.from_document({'name': 'a', 'score': 3, 'other': 1})
+    assert not hasattr(row, '__dict__')
+    assert row.name == 'a'
+    assert row['score'] == 3
+    assert row == {'name': 'a', 'score': 3}
+    assert row == cls('a', 3)
+    assert repr(row) == "RowModelRow(name='a', score=3)"
+    with pytest.raises(KeyError):
+        row['other']
+
+    model = row.to_model()
+    assert isinstance(model, RowModel)
+    assert model == {'name': 'a', 'score': 3}
+
+    row.score = 4
+    assert row.get('score') == 4
+    assert pickle.loads(pickle.dumps(row)) == row
+
+
+def test_row_missing_and_nested():
+    cls = row_class(RowModel, ['name', 'nested'])
+    row = cls.from_document({'nested': {'x': 1}})
+    assert isinstance(row.nested, AttrDict)
+    assert row.nested.x == 1
+    assert 'name' not in row
+    assert row.keys() == ['nested']
+    assert row.get('name') is None
+    with pytest.raises(AttributeError):
+        row.name
+
+
+def test_row_class_invalid_fields():
+    for fields in (['a.b'], ['class'], ['__x'], ['a', 'a'], ['keys'],
+                   ['items'], ['get'], ['to_dict'], ['to_model'],
+                   ['_fields'], ['_model'], ['_setters'],
+                   ['from_document']):
+        with pytest.raises(ValueError):
+            row_class(RowModel, fields)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import logging
+
+from .. import metrics
+from ..slow_query import (RateLimiter, SlowQueryLog, query_shape,
+                          summarize_explain)
+
+
+class FakeCollection(object):
+    full_name = 'db.fake'
+
+    class document_class(object):
+        pass
+
+
+def test_query_shape():
+    assert query_shape({'x': 1}) == query_shape({'x': 2})
+    assert query_shape({'x': {'$gt': 1}}) != query_shape({'x': 1})
+    assert query_shape({'$or': [{'x': 1}, {'x': 2}, {'y': 3}]}) == \
+        {'$or': [{'x': 1}, {'y': 1}]}
+
+
+def test_summarize_explain():
+    summary = summarize_explain({
+        'queryPlanner': {'winningPlan': {
+            'stage': 'LIMIT', 'inputStage': {'stage': 'COLLSCAN'}}},
+        'executionStats': {'nReturned': 1, 'totalDocsExamined': 1000,
+                           'totalKeysExamined': 0},
+    })
+    assert summary['stages'] == ['LIMIT', 'COLLSCAN']
+    assert summary['collscan']
+    assert summary['docs_examined'] == 1000
+    assert summary['returned'] == 1
+
+    legacy = summarize_explain({'cursor': 'BtreeCursor x_1', 'n': 3,
+                                'nscanned': 3, 'nscannedObjects': 3})
+    assert not legacy['collscan']
+    assert legacy['docs_examined'] == 3
+
+
+def test_rate_limiter():
+    now = [0.0]
+    limiter = RateLimiter(2, clock=lambda: now[0])
+    assert limiter.allow()
+    assert limiter.allow()
+    assert not limiter.allow()
+    now[0] += 0.5
+    assert limiter.allow()
+    assert not limiter.allow()
+
+
+def test_slow_query_log(caplog):
+    log = SlowQueryLog(FakeCollection(), 100, rate_limit=100)
+    explains = []
+
+    def explain():
+        explains.append(1)
+        return {'cursor': 'BasicCursor', 'n': 1, 'nscannedObjects': 10}
+
+    # Fast queries are ignored.
+    assert log.observe('find', metrics.clock(), {'x': 1},
+                       explain=explain) is None
+
+    with caplog.at_level(logging.WARNING, logger='minimongo.slow_query'):
+        slow = metrics.clock() - 1
+        record = log.observe('find', slow, {'x': 1}, explain=explain)
+        assert record['shape'] == {'x': 1}
+        assert record['duration_ms'] >= 1000
+        assert record['explain']['collscan']
+
+        # explain() is captured only the first time a shape is seen.
+        record = log.observe('find', slow, {'x': 2}, explain=explain)
+        assert 'explain' not in record
+        assert len(explains) == 1
+
+    assert len(caplog.records) == 2
+    assert caplog.records[0].slow_query['operation'] == 'find'
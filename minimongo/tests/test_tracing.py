@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import json
+import threading
+
+from .. import tracing
+
+
+class FakeModel(dict):
+    @tracing.traced('get', query=lambda self, **kwargs: kwargs)
+    def get(self, **kwargs):
+        return {'x': 1}
+
+    @tracing.traced('fail')
+    def fail(self):
+        raise ValueError('boom')
+
+
+def test_disabled():
+    assert not tracing.enabled
+    assert FakeModel().get(x=1) == {'x': 1}
+    assert tracing.current_span() is None
+
+
+def test_nesting_and_attributes():
+    exporter = tracing.InMemoryExporter()
+    tracing.add_exporter(exporter)
+    try:
+        with tracing.span('request', route='/foo') as request:
+            assert tracing.current_span() is request
+            FakeModel().get(x=5)
+            FakeModel().get(x=6)
+        assert tracing.current_span() is None
+    finally:
+        tracing.remove_exporter(exporter)
+    assert not tracing.enabled
+
+    first, second, outer = exporter.spans
+    assert outer is request
+    assert outer.attributes == {'route': '/foo'}
+    assert first.name == 'minimongo.get'
+    assert first.parent is request
+    assert first.trace_id == second.trace_id == request.trace_id
+    assert first.attributes['model'] == 'FakeModel'
+    assert first.attributes['query_shape'] == {'x': 1}
+    assert first.documents == 1
+    assert first.duration >= 0
+
+
+def test_errors_are_recorded():
+    exporter = tracing.InMemoryExporter()
+    tracing.add_exporter(exporter)
+    try:
+        FakeModel().fail()
+    except ValueError:
+        pass
+    finally:
+        tracing.remove_exporter(exporter)
+
+    assert exporter.spans[0].error == "ValueError('boom')"
+
+
+def test_spans_dont_leak_between_threads():
+    exporter = tracing.InMemoryExporter()
+    tracing.add_exporter(exporter)
+    seen = []
+    try:
+        with tracing.span('request'):
+            thread = threading.Thread(
+                target=lambda: seen.append(tracing.current_span()))
+            thread.start()
+            thread.join()
+    finally:
+        tracing.remove_exporter(exporter)
+    assert seen == [None]
+
+
+def test_exporters(tmpdir):
+    path = str(tmpdir.join('spans.jsonl'))
+    file_exporter = tracing.JSONLinesExporter(path)
+    called = []
+    callback_exporter = tracing.CallbackExporter(called.append)
+    tracing.add_exporter(file_exporter)
+    tracing.add_exporter(callback_exporter)
+    try:
+        FakeModel().get(x=1)
+    finally:
+        tracing.remove_exporter(file_exporter)
+        tracing.remove_exporter(callback_exporter)
+        file_exporter.close()
+
+    assert len(called) == 1
+    with open(path) as spans:
+        exported = [json.loads(line) for line in spans]
+    assert exported[0]['name'] == 'minimongo.get'
+    assert exported[0]['span_id'] == called[0].span_id
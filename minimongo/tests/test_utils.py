@@ -2,11 +2,14 @@
 
 from __future__ import absolute_import
 
+import subprocess
+import sys
 from types import ModuleType
 
 import pytest
 
-from .. import Model, configure, AttrDict
+from .. import Model, configure, AttrDict, deep_sizeof
+from ..collection import Collection
 from ..model import to_underscore
 from ..options import _Options
 
@@ -65,6 +68,8 @@ def test_options_init():
 
     options = _Options(Meta)
     assert options.foo, 'bar'
+    assert options.collection_class is Collection
+    assert _Options.collection_class is Collection
 
 
 def test_optoins_configure():
@@ -244,3 +249,43 @@ class test_attr_dict_derived():
     assert test_derived_too['old_items'] == set(['x', 'y', 'z'])
     assert test_derived_too.old_attrs == set(['f'])
     assert test_derived_too['old_attrs'] == set(['f'])
+
+
+class Slotted(object):
+    __slots__ = ('value', )
+
+    def __init__(self, value):
+        self.value = value
+
+
+def test_deep_sizeof():
+    nested = {'x': [1, 2, 3]}
+    assert deep_sizeof(nested) > sys.getsizeof(nested)
+    assert deep_sizeof(AttrDict(nested)) >= deep_sizeof(nested)
+
+    # Shared objects are only counted once.
+    shared = 'x' * 1000
+    assert deep_sizeof([shared, shared]) < 2 * sys.getsizeof(shared)
+
+    # Slots and instance dicts are followed.
+    assert deep_sizeof(Slotted(shared)) > sys.getsizeof(shared)
+
+    class Plain(object):
+        pass
+    plain = Plain()
+    plain.value = shared
+    assert deep_sizeof(plain) > sys.getsizeof(shared)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='lazy imports need module level __getattr__')
+def test_lazy_imports():
+    # Has to run in a fresh interpreter, pymongo is imported already here.
+    output = subprocess.check_output([sys.executable, '-c', (
+        'import sys\n'
+        'from minimongo import AttrDict, configure\n'
+        'print("pymongo" in sys.modules)\n'
+        'from minimongo import Model\n'
+        'print("pymongo" in sys.modules)\n'
+    )])
+    assert output.split() == [b'False', b'True']
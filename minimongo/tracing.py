@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+'''
+    minimongo.tracing
+    ~~~~~~~~~~~~~~~~~
+
+    Spans for minimongo operations, with pluggable exporters::
+
+        from minimongo import tracing
+
+        exporter = tracing.InMemoryExporter()
+        tracing.add_exporter(exporter)
+
+        with tracing.span('handle_request'):
+            for foo in Foo.collection.find():
+                Bar.get(foo_id=foo._id)    # N+1 shows up here
+
+    Spans nest under the caller's current span (tracked with
+    :mod:`contextvars`, so it works across threads and asyncio tasks), and
+    record model name, collection, query shape, number of documents
+    returned and -- if turned on with ``add_exporter(..., sizes=True)`` --
+    their BSON size. Tracing is off until an exporter is added.
+'''
+from __future__ import absolute_import
+
+import functools
+import json
+import random
+import threading
+import time
+
+from bson import BSON
+
+from .slow_query import query_shape
+
+try:
+    import contextvars
+except ImportError:  # Python < 3.7
+    contextvars = None
+
+#: Is tracing turned on? True as long as there's at least one exporter.
+enabled = False
+
+#: Should BSON sizes of returned documents be recorded?
+measure_bytes = False
+
+_exporters = []
+
+if contextvars is not None:
+    _current = contextvars.ContextVar('minimongo_span', default=None)
+
+    def current_span():
+        """Returns the innermost active :class:`Span`, if any."""
+        return _current.get()
+
+    def _activate(span):
+        return _current.set(span)
+
+    def _deactivate(token):
+        _current.reset(token)
+else:
+    _local = threading.local()
+
+    def current_span():
+        """Returns the innermost active :class:`Span`, if any."""
+        return getattr(_local, 'span', None)
+
+    def _activate(span):
+        previous, _local.span = current_span(), span
+        return previous
+
+    def _deactivate(previous):
+        _local.span = previous
+
+
+class Span(object):
+    """A single timed operation."""
+
+    def __init__(self, name, model=None, collection=None, query=None,
+                 parent=None):
+        self.name = name
+        self.parent = parent if parent is not None else current_span()
+        self.trace_id = self.parent.trace_id if self.parent else \
+            '%032x' % random.getrandbits(128)
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.attributes = {}
+        if model is not None:
+            meta = getattr(model, '_meta', None)
+            self.attributes['model'] = model.__name__
+            self.attributes['collection'] = collection or \
+                (meta.collection if meta is not None else None)
+        if query is not None:
+            self.attributes['query_shape'] = query_shape(query)
+        self.documents = 0
+        self.bytes = 0
+        self.error = None
+        self.start_time = time.time()
+        self.end_time = None
+        self._token = None
+
+    @property
+    def duration(self):
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def add_documents(self, documents):
+        """Accounts for the given returned `documents`."""
+        self.documents += len(documents)
+        if measure_bytes:
+            self.bytes += sum(len(BSON.encode(document))
+                              for document in documents)
+
+    def finish(self):
+        """Ends the span and hands it over to the exporters; finishing a
+        span more than once is a no-op."""
+        if self.end_time is not None:
+            return
+        self.end_time = time.time()
+        for exporter in list(_exporters):
+            exporter.export(self)
+
+    def __enter__(self):
+        self._token = _activate(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _deactivate(self._token)
+        if exc_value is not None:
+            self.error = repr(exc_value)
+        self.finish()
+
+    def as_dict(self):
+        result = {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'duration': self.duration,
+            'documents': self.documents,
+            'bytes': self.bytes,
+            'error': self.error,
+        }
+        result.update(self.attributes)
+        return result
+
+    def __repr__(self):
+        return '<Span %s %r>' % (self.name, self.attributes)
+
+
+def span(name, **attributes):
+    """Starts a user-defined span, to be used as a context manager, that
+    all the minimongo operations run inside of nest under."""
+    new_span = Span(name)
+    new_span.attributes.update(attributes)
+    return new_span
+
+
+def _model_of(obj):
+    if isinstance(obj, type):
+        return obj
+    elif isinstance(obj, dict):
+        return type(obj)
+    return obj.document_class
+
+
+def traced(operation, query=None, returns_document=True):
+    """Decorates a model or collection method, so that every call to it
+    is wrapped in a span. `query` is either the query (a dict) to record
+    the shape of, or a callable taking the same arguments as the method
+    and returning one."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not enabled:
+                return method(self, *args, **kwargs)
+
+            spec = query(self, *args, **kwargs) if callable(query) else query
+            with Span('minimongo.' + operation, model=_model_of(self),
+                      query=spec) as current:
+                result = method(self, *args, **kwargs)
+                if returns_document and result is not None:
+                    current.add_documents([result])
+                return result
+        return wrapper
+    return decorator
+
+
+def add_exporter(exporter, sizes=False):
+    """Starts sending finished spans to `exporter`; if `sizes` is ``True``
+    BSON sizes of documents are recorded as well."""
+    global enabled, measure_bytes
+    _exporters.append(exporter)
+    measure_bytes = measure_bytes or sizes
+    enabled = True
+
+
+def remove_exporter(exporter):
+    """Stops sending spans to `exporter`; tracing is turned off once the
+    last one is removed."""
+    global enabled, measure_bytes
+    _exporters.remove(exporter)
+    if not _exporters:
+        enabled = measure_bytes = False
+
+
+class InMemoryExporter(object):
+    """Collects finished spans in a list, handy for tests."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, finished):
+        self.spans.append(finished)
+
+    def clear(self):
+        del self.spans[:]
+
+
+class JSONLinesExporter(object):
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path):
+        self.path = path
+        self._output = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def export(self, finished):
+        line = json.dumps(finished.as_dict(), sort_keys=True, default=str)
+        with self._lock:
+            self._output.write(line + '\n')
+            self._output.flush()
+
+    def close(self):
+        with self._lock:
+            self._output.close()
+
+
+class CallbackExporter(object):
+    """Calls `callback` with every finished span."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def export(self, finished):
+        self.callback(finished)